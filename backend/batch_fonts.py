@@ -0,0 +1,243 @@
+"""
+יצירת פונטים במרוכז מדפי כתב יד בארכיון (בלי השרת):
+
+    python batch_fonts.py <תיקיית_דפים|manifest.json|manifest.csv> <תיקיית_פלט> [--workers N]
+
+כל דף עובר חלוקה → מעקב → בנייה בתהליך נפרד, ומקבל שם משפחה משלו.
+התקדמות נרשמת ל-batch_state.jsonl בתיקיית הפלט, כך שהרצה חוזרת ממשיכה מאיפה שנעצרה
+(דפים שהצליחו ולא השתנו מדולגים). בסוף נכתב סיכום ל-batch_summary.json.
+"""
+import os
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+import contextlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from font_info import FAMILY_NAME
+
+SHEET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp")
+STATE_FILE = "batch_state.jsonl"
+SUMMARY_FILE = "batch_summary.json"
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+
+
+def _entry(sheet, output_dir, family=None, output=None, family_prefix=FAMILY_NAME, profile=None, stem=None):
+    stem = stem or os.path.splitext(os.path.basename(sheet))[0]
+    return {
+        "sheet": os.path.abspath(sheet),
+        "family": family or f"{family_prefix} {stem}",
+        "output": os.path.abspath(os.path.join(output_dir, output or f"{stem}.ttf")),
+        "profile": profile,
+    }
+
+
+def load_sheets(source, output_dir, family_prefix=FAMILY_NAME, profile=None):
+    """
+    רשימת דפים לעיבוד: מתיקייה (כל התמונות בה) או מ-manifest
+    (JSON: רשימת {"sheet", "family"?, "output"?, "profile"?}; CSV עם אותן עמודות).
+    נתיבים יחסיים ב-manifest נפתרים ביחס לתיקייה שלו. profile הוא פרופיל המדדים לדפים שלא מציינים אחד.
+    """
+    if os.path.isdir(source):
+        files = [f for f in sorted(os.listdir(source)) if f.lower().endswith(SHEET_EXTENSIONS)]
+        # a.png ו-a.jpg באותה תיקייה: הסיומת נכנסת לשם הפונט, אחרת שניהם נכתבים ל-a.ttf
+        stems = Counter(os.path.splitext(f)[0] for f in files)
+        return _check_outputs([
+            _entry(os.path.join(source, f), output_dir, family_prefix=family_prefix, profile=profile,
+                   stem=f.replace(".", "_") if stems[os.path.splitext(f)[0]] > 1 else None)
+            for f in files])
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding='utf-8', newline='') as f:
+        if source.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+            rows = rows.get("sheets", []) if isinstance(rows, dict) else rows
+    entries = []
+    for row in rows:
+        row = {"sheet": row} if isinstance(row, str) else row
+        entries.append(_entry(os.path.join(base, row["sheet"]), output_dir, row.get("family") or None,
+                              row.get("output") or None, family_prefix, row.get("profile") or profile))
+    return _check_outputs(entries)
+
+
+def _check_outputs(entries):
+    """
+    שני דפים שנכתבים לאותו קובץ פונט היו דורסים זה את זה (ואת הקובץ הזמני) - ValueError.
+    """
+    counts = Counter(entry["output"] for entry in entries)
+    duplicates = sorted(path for path, n in counts.items() if n > 1)
+    if duplicates:
+        raise ValueError("several sheets write the same font: " + ", ".join(duplicates))
+    return entries
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_state(output_dir):
+    """
+    הרשומה האחרונה לכל דף מקובץ ההתקדמות. שורה חתוכה (הפסקה באמצע כתיבה) מדולגת.
+    """
+    state = {}
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return state
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            state[record["sheet"]] = record
+    return state
+
+
+def _is_done(entry, record):
+    if not record or record.get("status") != "ok":
+        return False
+    if any(record.get(key) != entry[key] for key in ("family", "output", "profile")):
+        return False
+    try:
+        return record.get("stamp") == _stamp(entry["sheet"]) and os.path.exists(entry["output"])
+    except OSError:
+        return False
+
+
+def build_sheet(entry):
+    """
+    רץ בתהליך עובד: דף אחד → TTF. הפונט נכתב לקובץ זמני ומוחלף רק בהצלחה,
+    כך שהפסקה לא משאירה פונט חלקי. מחזיר רשומה לקובץ ההתקדמות.
+    """
+    # ייבוא בתוך העובד: התהליך הראשי לא טוען את cv2/ufo2ft
+    from sheet_pipeline import sheet_to_font
+
+    start = time.perf_counter()
+    record = dict(entry)
+    tmp = entry["output"] + ".tmp"
+    try:
+        record["stamp"] = _stamp(entry["sheet"])
+        os.makedirs(os.path.dirname(entry["output"]), exist_ok=True)
+        # ההדפסות של הצינור (שורה לכל אות) נאספות ב-logs ולא מוצפות למסוף
+        with contextlib.redirect_stdout(io.StringIO()):
+            # האותיות הסופיות נחתכות מהדף עצמו, לא מקבצי final_svgs של הפרופיל
+            success, logs = sheet_to_font(entry["sheet"], tmp, workers=1, family_name=entry["family"],
+                                          final_svgs={}, profile=entry["profile"])
+        if success:
+            os.replace(tmp, entry["output"])
+            record["status"] = "ok"
+            record["glyphs"] = sum(1 for line in logs if line.startswith("✅"))
+        else:
+            record["status"] = "failed"
+            # השגיאה האחרונה היא הסיבה לכישלון הבנייה (הקודמות הן אותיות בודדות)
+            record["error"] = next((line for line in reversed(logs) if line.startswith("❌")), "build failed")
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(entries, output_dir, workers=None, retry_failed=True):
+    """
+    מעבד את הדפים במאגר תהליכים ומחזיר סיכום. כל תוצאה נרשמת לקובץ ההתקדמות מיד כשהיא מגיעה.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_state(output_dir)
+    pending, skipped = [], 0
+    for entry in entries:
+        record = state.get(entry["sheet"])
+        if _is_done(entry, record) or (not retry_failed and record and record.get("status") == "failed"):
+            skipped += 1
+        else:
+            pending.append(entry)
+
+    workers = max(1, min(workers or BATCH_WORKERS, len(pending) or 1))
+    print(f"📚 {len(entries)} דפים: {len(pending)} לעיבוד, {skipped} דולגו ({workers} תהליכים)")
+
+    start = time.perf_counter()
+    ok, failures, sheet_seconds = 0, [], 0.0
+    with open(os.path.join(output_dir, STATE_FILE), "a", encoding='utf-8') as state_file, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(build_sheet, entry): entry for entry in pending}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # עובד שקרס (למשל נהרג בגלל זיכרון) שובר את המאגר: BrokenProcessPool לכל הדפים
+                    # שעוד לא הסתיימו. הם נרשמים כנכשלים, והסיכום נכתב כרגיל
+                    record = dict(futures[future], status="failed", error=f"{type(e).__name__}: {e}",
+                                  seconds=0.0)
+                state_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                state_file.flush()
+                sheet_seconds += record["seconds"]
+                name = os.path.basename(record["sheet"])
+                if record["status"] == "ok":
+                    ok += 1
+                    print(f"✅ [{done}/{len(pending)}] {name} → {record['family']} ({record['seconds']:.1f}s)")
+                else:
+                    failures.append({"sheet": record["sheet"], "error": record["error"]})
+                    print(f"❌ [{done}/{len(pending)}] {name}: {record['error']}")
+        except KeyboardInterrupt:
+            # מה שכבר הסתיים נשמר בקובץ ההתקדמות; הרצה חוזרת תמשיך משם
+            pool.shutdown(wait=False, cancel_futures=True)
+            print("⏸️ הופסק - הרצה חוזרת תמשיך מהדף הבא")
+            raise
+
+    elapsed = time.perf_counter() - start
+    processed = ok + len(failures)
+    summary = {
+        "total": len(entries),
+        "processed": processed,
+        "succeeded": ok,
+        "failed": len(failures),
+        "skipped": skipped,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "sheets_per_minute": round(processed * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_sheet_seconds": round(sheet_seconds / processed, 3) if processed else 0.0,
+        "failures": failures,
+    }
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w", encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"\n📊 {ok} הצליחו, {len(failures)} נכשלו, {skipped} דולגו תוך {elapsed:.1f}s "
+          f"({summary['sheets_per_minute']} דפים לדקה)")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build one font per handwriting sheet")
+    parser.add_argument("source", help="directory of sheet images, or a .json/.csv manifest")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--family-prefix", default=FAMILY_NAME,
+                        help="family name prefix for sheets without an explicit family")
+    parser.add_argument("--profile", default=None,
+                        help="glyph metrics profile name (see glyph_profile.py) for sheets without one")
+    parser.add_argument("--skip-failed", action="store_true",
+                        help="do not retry sheets that failed in a previous run")
+    args = parser.parse_args(argv)
+
+    try:
+        entries = load_sheets(args.source, args.output_dir, args.family_prefix, args.profile)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    summary = run_batch(entries, args.output_dir, args.workers, retry_failed=not args.skip_failed)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
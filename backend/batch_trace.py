@@ -0,0 +1,187 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from bw_converter import image_to_bw
+from generate_font import letter_map
+from tracer import trace_bitmap, trace_params, write_svg
+import glyph_cache
+import metrics
+from process_pool import new_pool
+
+# מספר התהליכים למעקב אחרי אותיות במקביל
+TRACE_WORKERS = int(os.environ.get('TRACE_WORKERS', os.cpu_count() or 1))
+
+LETTERS_ORDER = list(letter_map)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = new_pool(TRACE_WORKERS)
+        return _pool
+
+
+@metrics.timed("upload_decode")
+def decode_image(source):
+    """
+    מקבל נתיב לקובץ, bytes של PNG/JPG או מערך NumPy ומחזיר מערך אפור.
+    """
+    if isinstance(source, np.ndarray):
+        gray = source
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        gray = cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_GRAYSCALE)
+    else:
+        gray = cv2.imread(source, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Cannot decode image")
+    return gray
+
+
+@metrics.timed("normalize")
+def normalize_bw(bw, scale, margin=0):
+    """
+    משנה את גודל תמונת השחור-לבן ביחס scale ומוסיף שוליים לבנים.
+    """
+    w = max(1, int(round(bw.shape[1] * scale)))
+    h = max(1, int(round(bw.shape[0] * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    resized = cv2.resize(bw, (w, h), interpolation=interpolation)
+    if margin:
+        resized = cv2.copyMakeBorder(resized, margin, margin, margin, margin, cv2.BORDER_CONSTANT, value=255)
+    return resized
+
+
+def trace_image(gray, scale=None, margin=0, binarized=False):
+    """
+    הצינור המאוחד: חוצץ אפור אחד עובר סף → נרמול → מעקב בזיכרון, בלי קבצי ביניים.
+    binarized=True מדלג על הסף (חיתוך ממסכה של דף שכבר עבר סף). מחזיר (תמונת שחור-לבן, קווי מתאר).
+    """
+    bw = gray if binarized else image_to_bw(gray)
+    if scale is not None:
+        bw = normalize_bw(bw, scale, margin)
+    return bw, trace_bitmap(bw)
+
+
+def trace_source(source, bw_path=None, scale=None, margin=0, binarized=False):
+    """
+    מפענח ועוקב אחרי אות אחת ממקור כלשהו. מחזיר (קווי מתאר, (רוחב, גובה), האם_מהמטמון).
+    כשהמקור הוא bytes או מערך, חיתוך זהה שכבר נעקב נלקח מהמטמון בלי מעקב מחדש.
+    """
+    def trace():
+        bw, contours = trace_image(decode_image(source), scale, margin, binarized)
+        if bw_path:
+            os.makedirs(os.path.dirname(bw_path), exist_ok=True)
+            cv2.imwrite(bw_path, bw)
+        return contours, (bw.shape[1], bw.shape[0])
+
+    norm = {} if scale is None else {"norm_scale": scale, "norm_margin": margin}
+    if isinstance(source, (bytes, bytearray)):
+        return glyph_cache.trace_cached(bytes(source), trace, "bw" if binarized else "otsu", **norm, **trace_params())
+    if isinstance(source, np.ndarray):
+        data = np.ascontiguousarray(source).tobytes()
+        return glyph_cache.trace_cached(data, trace, "bw-array" if binarized else "otsu-array",
+                                        shape=list(source.shape),
+                                        **norm, **trace_params())
+    contours, size = trace()
+    return contours, size, False
+
+
+def process_glyph(name, source, bw_path=None, svg_path=None, scale=None, margin=0, binarized=False):
+    """
+    שחור-לבן + מעקב לאות אחת. רץ בתהליך עובד ומחזיר (שם, קווי מתאר).
+    רק ה-SVG (קלט בניית הפונט) נכתב לדיסק; bw_path אופציונלי לדיבוג.
+    """
+    contours, size, _ = trace_source(source, bw_path, scale, margin, binarized)
+    if svg_path:
+        write_svg(contours, svg_path, *size)
+    return name, contours
+
+
+def _out_path(folder, name, ext):
+    return os.path.join(folder, f"{name}.{ext}") if folder else None
+
+
+def submit_glyph(name, source, bw_dir=None, svg_dir=None):
+    """
+    שולח אות אחת למאגר התהליכים המשותף ומחזיר Future (לאיסוף עם collect_results).
+    """
+    return _get_pool().submit(metrics.call_with_spans, process_glyph, name, source,
+                              _out_path(bw_dir, name, "png"), _out_path(svg_dir, name, "svg"))
+
+
+def _future_contours(future):
+    # זמני השלבים נמדדו בתהליך העובד - רושמים אותם כאן כדי שיופיעו ב-/metrics
+    (_, contours), spans = future.result()
+    metrics.record_spans(spans)
+    return contours
+
+
+def collect_results(futures):
+    """
+    אוסף {שם: Future} לרשימת (שם, קווי מתאר או שגיאה) לפי LETTERS_ORDER.
+    """
+    names = [n for n in LETTERS_ORDER if n in futures]
+    names += [n for n in futures if n not in letter_map]
+    results = []
+    for name in names:
+        try:
+            results.append((name, _future_contours(futures[name])))
+        except Exception as e:
+            results.append((name, e))
+    return results
+
+
+def process_glyphs(sources, bw_dir=None, svg_dir=None, workers=None, scale=None, margin=0, binarized=False):
+    """
+    מעבד כמה אותיות במקביל. sources הוא מילון {שם_אות: נתיב/bytes/מערך}.
+    scale/margin מנרמלים את כל האותיות באותו יחס (ראו sheet_pipeline).
+    מחזיר רשימת (שם, קווי מתאר או שגיאה) לפי LETTERS_ORDER.
+    """
+    names = [n for n in LETTERS_ORDER if n in sources]
+    names += [n for n in sources if n not in letter_map]
+
+    args = [(n, sources[n], _out_path(bw_dir, n, "png"), _out_path(svg_dir, n, "svg"), scale, margin, binarized)
+            for n in names]
+
+    workers = TRACE_WORKERS if workers is None else workers
+    results = {}
+    if workers <= 1 or len(args) <= 1:
+        for a in args:
+            try:
+                results[a[0]] = process_glyph(*a)[1]
+            except Exception as e:
+                results[a[0]] = e
+    else:
+        if workers == TRACE_WORKERS:
+            pool, owned = _get_pool(), False
+        else:
+            pool, owned = new_pool(workers), True
+        try:
+            futures = {a[0]: pool.submit(metrics.call_with_spans, process_glyph, *a) for a in args}
+            for name, future in futures.items():
+                try:
+                    results[name] = _future_contours(future)
+                except Exception as e:
+                    results[name] = e
+        finally:
+            if owned:
+                pool.shutdown()
+
+    return [(n, results[n]) for n in names]
+
+
+def shutdown(wait=True):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
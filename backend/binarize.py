@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+
+import metrics
+
+OTSU = "otsu"
+ADAPTIVE = "adaptive"
+
+# גודל אריח לסף מקומי: חלק מהצלע הקצרה של הדף, לא פחות מ-MIN_TILE פיקסלים
+TILE_FRACTION = 8
+MIN_TILE = 32
+# אריח שההפרדה בו קטנה מזה (ללא דיו, רק רקע) מסווג כולו כרקע
+MIN_TILE_CONTRAST = 0.002
+# מרחק הסף מממוצע אריח רקע, ברמות אפור
+BACKGROUND_MARGIN = 40
+# מספר שורות בכל רצועה - מגביל את הזיכרון הזמני בסריקות גדולות
+BAND_ROWS = 512
+
+
+def otsu_from_hist(hist):
+    """
+    סף Otsu מהיסטוגרמות (..., 256) בבת אחת. מחזיר (סף, הפרדה יחסית בין המחלקות).
+    פיקסל <= סף שייך למחלקה הכהה, כמו ב-cv2.THRESH_OTSU.
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    bins = np.arange(256, dtype=np.float64)
+    total = hist.sum(axis=-1, keepdims=True)
+    w0 = np.cumsum(hist, axis=-1)
+    w1 = total - w0
+    m0 = np.cumsum(hist * bins, axis=-1)
+    mean_total = m0[..., -1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mean_total * w0 - m0 * total) ** 2 / (w0 * w1)
+    between = np.nan_to_num(between, nan=0.0, posinf=0.0)
+    thresh = np.argmax(between, axis=-1)
+    contrast = np.take_along_axis(between, thresh[..., None], axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        contrast = np.nan_to_num(contrast / (total[..., 0] ** 2 * 255.0 ** 2))
+    return thresh, contrast
+
+
+def polarity(hist, thresh):
+    """
+    True אם הדיו בהיר על רקע כהה (רוב הפיקסלים בצד הכהה של הסף), מתוך ההיסטוגרמה בלבד.
+    """
+    dark = hist[:thresh + 1].sum()
+    return dark > hist.sum() - dark
+
+
+def _tile_size(shape):
+    return max(MIN_TILE, min(shape[:2]) // TILE_FRACTION)
+
+
+def _tile_histograms(gray, tile, band_rows=BAND_ROWS):
+    """
+    היסטוגרמה לכל אריח (gh, gw, 256), ברצועות ובלי לולאה על אריחים.
+    """
+    h, w = gray.shape
+    gh, gw = -(-h // tile), -(-w // tile)
+    hists = np.zeros((gh, gw, 256), dtype=np.int64)
+    col_bins = (np.arange(w) // tile).astype(np.int32) * 256
+    band_rows = max(tile, band_rows - band_rows % tile)
+    for y0 in range(0, h, band_rows):
+        band = gray[y0:y0 + band_rows]
+        # כל רצועה מכילה שורות אריחים שלמות; bincount אחד לכל שורת אריחים
+        for ty in range(0, band.shape[0], tile):
+            rows = band[ty:ty + tile]
+            idx = (rows.astype(np.int32) + col_bins).ravel()
+            hists[(y0 + ty) // tile] = np.bincount(idx, minlength=gw * 256).reshape(gw, 256)
+    return hists
+
+
+def _band_thresholds(grid, y0, y1, tile, width):
+    """
+    מפת סף לרצועת שורות, באינטרפולציה בילינארית בין מרכזי האריחים.
+    """
+    gh = grid.shape[0]
+    fy = np.clip((np.arange(y0, y1) + 0.5) / tile - 0.5, 0, gh - 1)
+    i0 = np.floor(fy).astype(np.int64)
+    i1 = np.minimum(i0 + 1, gh - 1)
+    wy = (fy - i0)[:, None]
+    rows = grid[i0] * (1 - wy) + grid[i1] * wy
+    gw = grid.shape[1]
+    # cv2.resize ממפה מרכזי תאים למרכזי תאים, כמו האינטרפולציה האנכית
+    return cv2.resize(rows.astype(np.float32), (width, y1 - y0), interpolation=cv2.INTER_LINEAR) \
+        if gw > 1 else np.repeat(rows.astype(np.float32), width, axis=1)
+
+
+def iter_bands(gray, method=OTSU, denoise=False, ink=0, band_rows=BAND_ROWS, tile=None):
+    """
+    מחזיר (y0, רצועה בינארית) לאורך הדף. הקיטוב נקבע פעם אחת מההיסטוגרמה של כל הדף,
+    וכל רצועה מחושבת בנפרד כך שהזיכרון הזמני תלוי רק בגודל הרצועה.
+    """
+    h, w = gray.shape
+    background = 255 - ink
+    if method == ADAPTIVE:
+        tile = tile or _tile_size(gray.shape)
+        hists = _tile_histograms(gray, tile, band_rows)
+        global_hist = hists.sum(axis=(0, 1))
+    else:
+        # calcHist לא מעתיק את התמונה (bincount היה ממיר כל פיקסל ל-int64)
+        global_hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+    global_t, _ = otsu_from_hist(global_hist)
+    light_ink = polarity(global_hist, int(global_t))
+
+    grid = None
+    if method == ADAPTIVE:
+        grid, contrast = otsu_from_hist(hists)
+        # בתאורה לא אחידה הסף הגלובלי נופל בתוך הרקע; הקיטוב נקבע בהצבעה של אריחים עם דיו,
+        # שבכל אחד מהם הדיו הוא המחלקה הקטנה
+        inked = contrast >= MIN_TILE_CONTRAST
+        if inked.any():
+            dark = np.take_along_axis(np.cumsum(hists[inked], axis=-1), grid[inked][:, None], axis=-1)[:, 0]
+            light_ink = bool(dark.sum() * 2 > hists[inked].sum())
+        # אריח רקע בלבד: הסף מתחת לממוצע שלו (מעליו לדיו בהיר), כך שתאורה כהה לא נהפכת לדיו
+        counts = np.maximum(hists.sum(axis=-1), 1)
+        means = (hists * np.arange(256)).sum(axis=-1) / counts
+        fallback = means + (BACKGROUND_MARGIN if light_ink else -BACKGROUND_MARGIN)
+        grid = np.where(contrast < MIN_TILE_CONTRAST, fallback, grid).astype(np.float32)
+
+    # פתיחה מורפולוגית צריכה שורות שכנות: כל רצועה נקראת עם שוליים ונחתכת בחזרה
+    halo = 2 if denoise else 0
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    for y0 in range(0, h, band_rows):
+        y1 = min(h, y0 + band_rows)
+        a0, a1 = max(0, y0 - halo), min(h, y1 + halo)
+        band = gray[a0:a1]
+        if grid is None:
+            is_ink = band > global_t if light_ink else band <= global_t
+        else:
+            t = _band_thresholds(grid, a0, a1, tile, w)
+            is_ink = band > t if light_ink else band <= t
+        out = np.where(is_ink, np.uint8(ink), np.uint8(background))
+        if denoise:
+            # פתיחה על הדיו (ולא על הרקע) מסירה נקודות רעש קטנות
+            op = cv2.MORPH_OPEN if ink == 255 else cv2.MORPH_CLOSE
+            out = cv2.morphologyEx(out, op, kernel, iterations=1, borderType=cv2.BORDER_REPLICATE)
+        yield y0, out[y0 - a0:y0 - a0 + (y1 - y0)]
+
+
+@metrics.timed("binarize")
+def binarize(gray, method=OTSU, denoise=False, ink=0, band_rows=BAND_ROWS, tile=None):
+    """
+    תמונה אפורה → שחור-לבן. ink הוא ערך פיקסלי הדיו בפלט (0 = דיו שחור על לבן,
+    255 = מסכה לרכיבים קשירים). method=ADAPTIVE מחשב סף לכל אריח, לצילומי טלפון עם תאורה לא אחידה.
+    """
+    bw = np.empty(gray.shape, dtype=np.uint8)
+    for y0, band in iter_bands(gray, method, denoise, ink, band_rows, tile):
+        bw[y0:y0 + band.shape[0]] = band
+    return bw
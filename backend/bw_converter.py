@@ -1,7 +1,15 @@
 import os
 import sys
 import cv2
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from binarize import binarize
+
+def image_to_bw(gray):
+    """
+    סף Otsu על מערך אפור; מחזיר דיו שחור על רקע לבן (הקיטוב נקבע מההיסטוגרמה - ראו binarize.py).
+    """
+    return binarize(gray)
 
 def convert_image_to_bw(input_path, output_path):
     gray = cv2.imread(input_path, cv2.IMREAD_GRAYSCALE)
@@ -9,33 +17,36 @@ def convert_image_to_bw(input_path, output_path):
         print(f"❌ לא ניתן לטעון את התמונה: {input_path}")
         return False
 
-    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-    white_bg = np.sum(bw == 255)
-    black_fg = np.sum(bw == 0)
-    if black_fg > white_bg:
-        bw = cv2.bitwise_not(bw)
+    bw = image_to_bw(gray)
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     cv2.imwrite(output_path, bw)
     print(f"✅ {input_path} → {output_path}")
     return True
 
-def convert_to_bw(input_dir_or_file, output_dir_or_file):
+def convert_to_bw(input_dir_or_file, output_dir_or_file, workers=None):
+    """
+    workers - מספר תהליכים להמרת תיקייה במקביל (None/1 = סדרתי).
+    """
     if os.path.isfile(input_dir_or_file):
         convert_image_to_bw(input_dir_or_file, output_dir_or_file)
     elif os.path.isdir(input_dir_or_file):
         os.makedirs(output_dir_or_file, exist_ok=True)
-        for fname in os.listdir(input_dir_or_file):
-            if fname.lower().endswith(".png"):
-                convert_image_to_bw(
-                    os.path.join(input_dir_or_file, fname),
-                    os.path.join(output_dir_or_file, fname)
-                )
+        pairs = [
+            (os.path.join(input_dir_or_file, fname), os.path.join(output_dir_or_file, fname))
+            for fname in sorted(os.listdir(input_dir_or_file))
+            if fname.lower().endswith(".png")
+        ]
+        if workers and workers > 1 and pairs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(convert_image_to_bw, *zip(*pairs)))
+        else:
+            for src, dst in pairs:
+                convert_image_to_bw(src, dst)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("שימוש: python bw_converter.py <input_path> <output_path>")
+    if len(sys.argv) not in (3, 4):
+        print("שימוש: python bw_converter.py <input_path> <output_path> [workers]")
         sys.exit(1)
 
-    convert_to_bw(sys.argv[1], sys.argv[2])
+    convert_to_bw(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) == 4 else None)
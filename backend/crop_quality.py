@@ -0,0 +1,135 @@
+import os
+
+import cv2
+import numpy as np
+
+import metrics
+from binarize import binarize, otsu_from_hist, MIN_TILE_CONTRAST
+from tracer import DEFAULT_MIN_AREA
+
+# בדיקת האיכות לפני המעקב; CROP_QUALITY_CHECK=0 מבטל את הדחייה (הציונים עדיין מחושבים)
+CROP_QUALITY_CHECK = os.environ.get('CROP_QUALITY_CHECK', '1') != '0'
+# חלק הדיו מכל התמונה: פחות מזה - חיתוך ריק
+MIN_INK = 0.002
+# רכיב קטן מהחלק הזה של הרכיב הגדול הוא לכלוך ולא חלק מהאות
+SPECK_SHARE = 0.05
+# מספר רכיבים משמעותיים מקסימלי (אות בכתב יד: עד שלושה-ארבעה קטעים)
+MAX_COMPONENTS = 5
+# חלק הדיו מהתיבה התוחמת של הרכיבים המשמעותיים; פחות מזה - קווים פזורים ולא אות.
+# אין תקרה: קו ישר (ן, ו, י) ממלא כמעט את כל התיבה שלו
+MIN_BOX_FILL = 0.03
+# עובי הקו (פעמיים המרחק המקסימלי מהרקע) ביחס לצלע הארוכה של התיבה: מעל MAX_STROKE_SHARE -
+# כתם מלא ולא קו. מלבן מלא ומוארך נתפס כשהוא גם עבה (SOLID_STROKE_SHARE) וגם ממלא את התיבה
+# (SOLID_BOX_FILL); קו ישר דק (ן, ו, י) ממלא את התיבה אבל עוביו קטן ביחס לאורכו
+MAX_STROKE_SHARE = 0.7
+SOLID_STROKE_SHARE = 0.4
+SOLID_BOX_FILL = 0.9
+# הצלע הארוכה של התיבה התוחמת ביחס לצלע המתאימה של התמונה; פחות מזה - נקודה בודדת
+MIN_BOX_SIZE = 0.15
+# חלק פיקסלי הדיו שעל השפה (לא שורדים שחיקה 3×3). בקווים השפה היא חלק קטן, ברעש כמעט הכל;
+# נבדק רק מעל NOISE_MIN_INK, כדי שקו דק באות קטנה לא ייחשב לרעש
+MAX_EDGE_SHARE = 0.9
+NOISE_MIN_INK = 0.15
+# רכיב "גדול" (מועמד לאות שלמה): לפחות LETTER_AREA_SHARE מהשטח של הרכיב הגדול ביותר ולפחות
+# LETTER_HEIGHT_SHARE מגובה הדיו כולו - אות נפרדת ממלאת כמעט את כל גובה השורה, קו בתוך אות לא תמיד.
+# רכיבים גדולים הם אותיות נפרדות רק כשהרווח האופקי ביניהם הוא לפחות LETTER_GAP_SHARE מגובה הדיו;
+# קווים של אות אחת (רגל של ה/ק, ח או ף שנכתבו בשני קווים) חופפים או קרובים זה לזה
+LETTER_AREA_SHARE = 0.35
+LETTER_HEIGHT_SHARE = 0.7
+LETTER_GAP_SHARE = 0.3
+
+
+def _letter_groups(stats, ink_height):
+    """
+    מספר הקבוצות של רכיבים גדולים שמופרדות ברווח אופקי ברור (אותיות נפרדות בחיתוך).
+    """
+    areas = stats[:, cv2.CC_STAT_AREA]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    big = stats[(areas >= areas.max() * LETTER_AREA_SHARE) & (heights >= ink_height * LETTER_HEIGHT_SHARE)]
+    spans = sorted((int(x), int(x + w)) for x, w in zip(big[:, cv2.CC_STAT_LEFT], big[:, cv2.CC_STAT_WIDTH]))
+    min_gap = ink_height * LETTER_GAP_SHARE
+    groups, right = 0, None
+    for x0, x1 in spans:
+        if right is None or x0 - right >= min_gap:
+            groups += 1
+            right = x1
+        else:
+            right = max(right, x1)
+    return groups
+
+
+@metrics.timed("crop_quality")
+def score_crop(gray):
+    """
+    ציוני איכות לחיתוך אפור, לפני המעקב: אותו סף Otsu כמו במעקב ורכיבים קשירים
+    (cv2.connectedComponentsWithStats, כמו ב-split_letters). מחזיר מילון עם
+    ink (חלק הדיו), components (רכיבים משמעותיים), specks (לכלוך), letters (אותיות נפרדות),
+    bbox_fill, bbox_size, stroke (עובי הקו ביחס לתיבה), main_share (חלק הרכיב הגדול מהדיו),
+    edge_share, ok ו-reasons (רשימת סיבות הדחייה).
+    """
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    _, contrast = otsu_from_hist(hist)
+    scores = {"ink": 0.0, "components": 0, "specks": 0, "letters": 0, "bbox_fill": 0.0, "bbox_size": 0.0,
+              "stroke": 0.0, "main_share": 0.0, "edge_share": 0.0, "contrast": round(float(contrast), 4)}
+
+    stats = np.zeros((0, 5), dtype=np.int32)
+    if contrast >= MIN_TILE_CONTRAST:
+        mask = binarize(gray, ink=255)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        # בלי הרקע, ובלי כתמים שהמעקב ממילא מסנן
+        stats = stats[1:][stats[1:, cv2.CC_STAT_AREA] >= DEFAULT_MIN_AREA]
+
+    reasons = []
+    if len(stats):
+        interior = cv2.countNonZero(cv2.erode(mask, np.ones((3, 3), np.uint8)))
+        # רקע מסביב, כדי שדיו שנוגע בשולי החיתוך יימדד עד השוליים
+        padded = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        thickness = 2.0 * float(cv2.distanceTransform(padded, cv2.DIST_L2, 3).max())
+
+        areas = stats[:, cv2.CC_STAT_AREA]
+        main = areas >= areas.max() * SPECK_SHARE
+        kept = stats[main]
+        x0 = kept[:, cv2.CC_STAT_LEFT].min()
+        y0 = kept[:, cv2.CC_STAT_TOP].min()
+        x1 = (kept[:, cv2.CC_STAT_LEFT] + kept[:, cv2.CC_STAT_WIDTH]).max()
+        y1 = (kept[:, cv2.CC_STAT_TOP] + kept[:, cv2.CC_STAT_HEIGHT]).max()
+        h, w = gray.shape[:2]
+        ink = int(areas.sum())
+        scores.update(
+            ink=round(ink / float(gray.size), 4),
+            components=int(main.sum()),
+            specks=int((~main).sum()),
+            letters=_letter_groups(kept, y1 - y0),
+            bbox_fill=round(int(areas[main].sum()) / float((x1 - x0) * (y1 - y0)), 4),
+            bbox_size=round(float(max((x1 - x0) / w, (y1 - y0) / h)), 4),
+            stroke=round(thickness / float(max(x1 - x0, y1 - y0)), 4),
+            main_share=round(int(areas.max()) / float(ink), 4),
+            edge_share=round(1.0 - interior / float(max(cv2.countNonZero(mask), 1)), 4),
+        )
+
+    if scores["ink"] < MIN_INK:
+        reasons.append("empty")
+    else:
+        if scores["bbox_size"] < MIN_BOX_SIZE:
+            reasons.append("speck")
+        if scores["ink"] > NOISE_MIN_INK and scores["edge_share"] > MAX_EDGE_SHARE:
+            reasons.append("noise")
+        if scores["letters"] > 1:
+            reasons.append("multiple_letters")
+        if scores["components"] > MAX_COMPONENTS:
+            reasons.append("too_many_components")
+        if scores["bbox_fill"] < MIN_BOX_FILL:
+            reasons.append("sparse")
+        if scores["stroke"] > MAX_STROKE_SHARE or (scores["stroke"] > SOLID_STROKE_SHARE
+                                                   and scores["bbox_fill"] > SOLID_BOX_FILL):
+            reasons.append("solid")
+    scores["reasons"] = reasons
+    scores["ok"] = not reasons or not CROP_QUALITY_CHECK
+    return scores
+
+
+def describe(scores):
+    """
+    הודעת שגיאה קצרה לחיתוך שנדחה.
+    """
+    return "bad crop: " + ", ".join(scores["reasons"])
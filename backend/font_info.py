@@ -0,0 +1,4 @@
+# שם המשפחה של הפונט ושם הסגנון. מודול קל (בלי fontTools/cv2), כך שגם כלים שרק מכינים
+# עבודה לתהליכים אחרים (batch_fonts.py) יכולים לייבא אותו
+FAMILY_NAME = "uiHebrew Handwriting"
+STYLE_NAME = "Regular"
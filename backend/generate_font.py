@@ -3,8 +3,14 @@ from defcon import Font
 from ufo2ft import compileTTF
 from fontTools.svgLib.path import parse_path
 from fontTools.pens.transformPen import TransformPen
-from fontTools.misc.transform import Identity
+from fontTools.pens.recordingPen import RecordingPen
 from xml.dom import minidom
+from tracer import draw_contours
+from outline_optimizer import optimize_glyphs, report_points
+from glyph_profile import get_table
+from spacing import glyph_sides, kerning_pairs, kerning_fea
+from font_info import FAMILY_NAME
+import metrics
 
 # ===== מיפוי אותיות =====
 letter_map = {
@@ -38,179 +44,201 @@ letter_map = {
     "finaltsadi": 0x05E5
 }
 
-# ===== הזזות אנכיות =====
-vertical_offsets = {
-    "yod": 380,
-    "qof": -250,
-}
+# ההזזות, הריפודים, הרוחבים והטרנספורמציות של כל אות, וקבצי האותיות הסופיות הקבועות,
+# מוגדרים בפרופיל JSON (profiles/default.json) שמהודר פעם אחת לטבלה - ראו glyph_profile.py
+
+
+def _prepare_glyph(font, name, table, final=False):
+    """
+    יוצר גליף חדש בפונט ומחזיר (גליף, עט) כשהעט כבר מחיל את ההזזות והסקייל של האות מהטבלה.
+    """
+    entry = table["glyphs"][(name, final)]
+    glyph = font.newGlyph(name)
+    glyph.unicode = letter_map[name]
+    glyph.width = entry["width"]
+    return glyph, TransformPen(glyph.getPen(), entry["transform"])
+
+
+def _apply_sidebearings(glyph, table, final=False):
+    """
+    מרווחי הצד מהפרופיל נמדדים מהתיבה התוחמת של קו המתאר בפועל (אחרי הציור), כך שהרוחב
+    נקבע לפי האות ולא קבוע. גליף ריק שומר על הרוחב מהפרופיל.
+    """
+    entry = table["glyphs"][(glyph.name, final)]
+    if glyph.bounds is not None:
+        glyph.leftMargin = entry["left_margin"]
+        glyph.rightMargin = entry["right_margin"]
+
+
+def font_kerning(glyphs, table):
+    """
+    טבלת הקרנינג (טקסט FEA) לכל הגליפים יחד ({שם: גליף defcon}), לפי סעיף "kerning" של הפרופיל.
+    """
+    sides, widths = {}, {}
+    for name, glyph in glyphs.items():
+        pen = RecordingPen()
+        glyph.draw(pen)
+        sides[name], widths[name] = glyph_sides(pen.value), glyph.width
+    return kerning_fea(kerning_pairs(sides, widths, table["kerning"]))
+
+
+def glyph_name_from_filename(filename):
+    if "_" in filename:
+        return filename.split("_", 1)[1].replace(".svg", "")
+    return filename.replace(".svg", "")
+
+
+def load_glyph(font, name, svg_path, logs, table=None, final=False):
+    """
+    טוען קובץ SVG אחד לגליף חדש בפונט לפי הטבלה של הפרופיל (final = אות סופית מ-final_svgs).
+    מחזיר True אם נוסף לפחות path אחד.
+    """
+    table = table or get_table()
+    filename = os.path.basename(svg_path)
+    if final and not os.path.exists(svg_path):
+        msg = f"⚠️ קובץ סופי לא נמצא: {svg_path}"
+        print(msg)
+        logs.append(msg)
+        return False
 
-# ===== הגדרות כלליות =====
-GLOBAL_Y_SHIFT = 0
-PADDING_GENERAL = 12
-PADDING_LARGE = 15
-GLOBAL_SCALE = 1.0
+    try:
+        # קריאת SVG
+        with metrics.span("svg_parse"):
+            doc = minidom.parse(svg_path)
+        paths = doc.getElementsByTagName('path')
+        if not paths:
+            msg = f"⚠️ אין path בקובץ: {filename}"
+            print(msg)
+            logs.append(msg)
+            doc.unlink()
+            return False
 
-# ===== טרנספורמציות מיוחדות =====
-special_transforms = {
-    "finalpe": Identity.scale(0.70, 0.70).translate(50, 250),
-    "finaltsadi": Identity.scale(0.68, 0.68).translate(50, 250),
-}
+        glyph, tp = _prepare_glyph(font, name, table, final)
+
+        successful_paths = 0
+        with metrics.span("glyph_outline"):
+            for path_element in paths:
+                d = path_element.getAttribute('d')
+                if not d.strip():
+                    continue
+                try:
+                    parse_path(d, tp)
+                    successful_paths += 1
+                except Exception as e:
+                    msg = f"⚠️ שגיאה בנתיב בקובץ {filename}: {e}"
+                    print(msg)
+                    logs.append(msg)
 
+        doc.unlink()
 
-def generate_ttf(svg_folder, output_ttf):
+        if successful_paths == 0:
+            msg = f"❌ לא ניתן לנתח path עבור {filename}"
+            print(msg)
+            logs.append(msg)
+            return False
+
+        _apply_sidebearings(glyph, table, final)
+
+        if final:
+            msg = f"✅ אות סופית {name} נטענה בהצלחה"
+        else:
+            msg = f"✅ {name} נוסף בהצלחה ({successful_paths} path/paths)"
+        print(msg)
+        logs.append(msg)
+        return True
+
+    except Exception as e:
+        msg = f"❌ שגיאה בעיבוד {filename}: {e}"
+        print(msg)
+        logs.append(msg)
+        return False
+
+
+def load_traced_glyph(font, name, contours, table):
+    """
+    מצייר קווי מתאר של tracer (מהזיכרון או מקובץ הפרויקט) לגליף חדש בפונט לפי הטבלה של הפרופיל.
+    """
+    glyph, tp = _prepare_glyph(font, name, table)
+    with metrics.span("glyph_outline"):
+        draw_contours(contours, tp)
+    _apply_sidebearings(glyph, table)
+    return glyph
+
+
+def generate_ttf(svg_folder, output_ttf, traced=None, family_name=None, final_svgs=None, tolerance=None,
+                 profile=None):
+    """
+    בונה TTF מתיקיית SVG (או None). traced הוא מילון אופציונלי {שם_אות: קווי מתאר} מ-tracer.trace_bitmap
+    שמצויר ישירות לעט בלי לעבור דרך קבצי SVG (וגובר על SVG באותו שם).
+    profile בוחר את פרופיל המדדים (ראו glyph_profile.get_table).
+    final_svgs מחליף את final_svgs של הפרופיל ({} = בלי אותיות סופיות קבועות).
+    tolerance הוא תקציב הסטייה של אופטימיזציית קווי המתאר (ראו outline_optimizer, 0 מבטל).
+    """
+    traced = traced or {}
+    family_name = family_name or FAMILY_NAME
+    table = get_table(profile)
+    final_svgs = table["final_svgs"] if final_svgs is None else final_svgs
     print("🚀 התחלת יצירת פונט...")
     font = Font()
-    font.info.familyName = "uiHebrew Handwriting"
+    font.info.familyName = family_name
     font.info.styleName = "Regular"
-    font.info.fullName = "uiHebrew Handwriting"
+    font.info.fullName = family_name
     font.info.unitsPerEm = 1000
     font.info.ascender = 800
     font.info.descender = -200
 
     used_letters = set()
+    # אותיות שנטענו מ-SVG - רק הן עוברות את outline_optimizer
+    svg_letters = set()
     count = 0
     logs = []
 
     # ===== טעינת כל ה־SVG =====
-    for filename in sorted(os.listdir(svg_folder)):
+    for filename in sorted(os.listdir(svg_folder)) if svg_folder else []:
         if not filename.lower().endswith(".svg"):
             continue
 
-        try:
-            if "_" in filename:
-                name = filename.split("_", 1)[1].replace(".svg", "")
-            else:
-                name = filename.replace(".svg", "")
-
-            if name not in letter_map:
-                msg = f"🔸 אות לא במפה: {name}"
-                print(msg)
-                logs.append(msg)
-                continue
-
-            unicode_val = letter_map[name]
-            svg_path = os.path.join(svg_folder, filename)
-
-            # קריאת SVG
-            doc = minidom.parse(svg_path)
-            paths = doc.getElementsByTagName('path')
-            if not paths:
-                msg = f"⚠️ אין path בקובץ: {filename}"
-                print(msg)
-                logs.append(msg)
-                doc.unlink()
-                continue
-
-            glyph = font.newGlyph(name)
-            glyph.unicode = unicode_val
-            glyph.width = 470
-
-            # ✅ טיפול מיוחד באות א
-            if name == "alef":
-                glyph.leftMargin = 70 # דוחף אותה שמאלה
-                glyph.rightMargin = 20
-            else:
-                glyph.leftMargin = 13
-                glyph.rightMargin = 13
-
-            padding = PADDING_LARGE if name in ["finalkaf", "finalpe", "finaltsadi"] else PADDING_GENERAL
-            vertical_shift = vertical_offsets.get(name, 0) + GLOBAL_Y_SHIFT
-
-            # בסיס: סקייל גלובלי
-            transform = Identity.scale(GLOBAL_SCALE, GLOBAL_SCALE).translate(padding, vertical_shift - padding)
-
-            # אם יש טרנספורמציה מיוחדת → מחילים גם אותה
-            if name in special_transforms:
-                transform = special_transforms[name].scale(GLOBAL_SCALE, GLOBAL_SCALE).translate(padding, vertical_shift - padding)
-
-            pen = glyph.getPen()
-            tp = TransformPen(pen, transform)
-
-            successful_paths = 0
-            for path_element in paths:
-                d = path_element.getAttribute('d')
-                if not d.strip():
-                    continue
-                try:
-                    parse_path(d, tp)
-                    successful_paths += 1
-                except Exception as e:
-                    msg = f"⚠️ שגיאה בנתיב בקובץ {filename}: {e}"
-                    print(msg)
-                    logs.append(msg)
-
-            doc.unlink()
-
-            if successful_paths == 0:
-                msg = f"❌ לא ניתן לנתח path עבור {filename}"
-                print(msg)
-                logs.append(msg)
-                continue
-
-            msg = f"✅ {name} נוסף בהצלחה ({successful_paths} path/paths)"
+        name = glyph_name_from_filename(filename)
+        if name not in letter_map:
+            msg = f"🔸 אות לא במפה: {name}"
             print(msg)
             logs.append(msg)
+            continue
+
+        if name in traced:
+            continue
+
+        if load_glyph(font, name, os.path.join(svg_folder, filename), logs, table):
             used_letters.add(name)
+            svg_letters.add(name)
             count += 1
 
-        except Exception as e:
-            msg = f"❌ שגיאה בעיבוד {filename}: {e}"
+    # ===== קווי מתאר שנעקבו בזיכרון =====
+    for name, contours in traced.items():
+        if name not in letter_map:
+            msg = f"🔸 אות לא במפה: {name}"
             print(msg)
             logs.append(msg)
-
-    # ===== טעינת אותיות סופיות ידנית =====
-    final_svgs = {
-        "finalkaf": "app/backend/static/svg_letters/finalkaf.svg",
-        "finalmem": "app/backend/static/svg_letters/finalmem.svg",
-        "finalnun": "app/backend/static/svg_letters/finalnun.svg",
-        "finalpe": "app/backend/static/svg_letters/finalpe.svg",
-        "finaltsadi": "app/backend/static/svg_letters/finaltsadi.svg"
-    }
-
-    for name, path in final_svgs.items():
-        if not os.path.exists(path):
-            msg = f"⚠️ קובץ סופי לא נמצא: {path}"
+            continue
+        if not contours:
+            msg = f"❌ לא ניתן לנתח path עבור {name}"
             print(msg)
             logs.append(msg)
             continue
 
-        try:
-            unicode_val = letter_map[name]
-            doc = minidom.parse(path)
-            paths = doc.getElementsByTagName('path')
+        load_traced_glyph(font, name, contours, table)
 
-            glyph = font.newGlyph(name)
-            glyph.unicode = unicode_val
-            glyph.width = 600
-            glyph.leftMargin = 40
-            glyph.rightMargin = 40
-
-            padding = PADDING_LARGE if name in ["finalkaf", "finalpe", "finaltsadi"] else PADDING_GENERAL
-            vertical_shift = vertical_offsets.get(name, 0) + GLOBAL_Y_SHIFT
-
-            transform = Identity.scale(GLOBAL_SCALE, GLOBAL_SCALE).translate(padding, vertical_shift - padding)
-            if name in special_transforms:
-                transform = special_transforms[name].scale(GLOBAL_SCALE, GLOBAL_SCALE).translate(padding, vertical_shift - padding)
-
-            pen = glyph.getPen()
-            tp = TransformPen(pen, transform)
-
-            for path_element in paths:
-                d = path_element.getAttribute('d')
-                if not d.strip():
-                    continue
-                parse_path(d, tp)
+        msg = f"✅ {name} נוסף בהצלחה ({len(contours)} contours)"
+        print(msg)
+        logs.append(msg)
+        used_letters.add(name)
+        count += 1
 
-            doc.unlink()
-            msg = f"✅ אות סופית {name} נטענה בהצלחה"
-            print(msg)
-            logs.append(msg)
+    # ===== טעינת אותיות סופיות ידנית =====
+    for name, path in final_svgs.items():
+        if load_glyph(font, name, path, logs, table, final=True):
             used_letters.add(name)
-
-        except Exception as e:
-            msg = f"❌ שגיאה בטעינת האות הסופית {name}: {e}"
-            print(msg)
-            logs.append(msg)
+            svg_letters.add(name)
 
     # ===== שמירת הפונט =====
     if count == 0:
@@ -219,10 +247,16 @@ def generate_ttf(svg_folder, output_ttf):
         logs.append(msg)
         return False, logs
 
+    # אותיות ה-SVG עוברות יחד פישוט והמרה לריבועיות, כך ש-compileTTF מקבל קווי מתאר מוכנים
+    report_points(optimize_glyphs({name: font[name] for name in svg_letters}, tolerance), logs)
+    # קרנינג לכל 27×27 הזוגות במעבר אחד על פרופילי הצדדים של הגליפים הסופיים
+    font.features.text = font_kerning({name: font[name] for name in used_letters}, table)
+
     try:
         os.makedirs(os.path.dirname(output_ttf), exist_ok=True)
-        ttf = compileTTF(font)
-        ttf.save(output_ttf)
+        with metrics.span("compile"):
+            ttf = compileTTF(font)
+            ttf.save(output_ttf)
         msg = f"\n🎉 הפונט נוצר בהצלחה בנתיב: {output_ttf}"
         print(msg)
         logs.append(msg)
@@ -0,0 +1,131 @@
+import io
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+from tracer import pack_contours, unpack_contours
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('GLYPH_CACHE_DIR', os.path.join(BASE_DIR, '..', 'cache', 'glyphs'))
+# גודל מקסימלי של המטמון בדיסק (בבתים)
+CACHE_MAX_BYTES = int(os.environ.get('GLYPH_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# אחרי פינוי, המטמון יורד לחלק הזה מהתקרה
+CACHE_LOW_WATER = 0.9
+
+_lock = threading.Lock()
+_approx_size = None
+
+
+def cache_key(data, **params):
+    """
+    מפתח לפי תוכן: hash של ה-bytes של התמונה יחד עם פרמטרי המעקב.
+    """
+    h = hashlib.sha256(data)
+    h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.npz")
+
+
+def get(key):
+    """
+    מחזיר (קווי מתאר, (רוחב, גובה)) או None אם אין רשומה.
+    פגיעה מעדכנת את זמן השינוי כדי שהפינוי יהיה LRU.
+    """
+    path = _entry_path(key)
+    try:
+        with np.load(path) as data:
+            contours = unpack_contours(data["points"], data["offsets"])
+            size = tuple(int(v) for v in data["size"])
+        os.utime(path, None)
+        return contours, size
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def put(key, contours, size):
+    global _approx_size
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    points, offsets = pack_contours(contours)
+    buf = io.BytesIO()
+    np.savez(buf, points=points, offsets=offsets, size=np.array(size, dtype=np.int32))
+    # כתיבה אטומית - תהליכים אחרים עשויים לקרוא את אותה רשומה
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(buf.getvalue())
+    os.replace(tmp_path, path)
+
+    with _lock:
+        if _approx_size is None:
+            _approx_size = _scan_size()
+        else:
+            _approx_size += buf.tell()
+        if _approx_size > CACHE_MAX_BYTES:
+            _approx_size = _evict()
+
+
+def _entries():
+    entries = []
+    if not os.path.isdir(CACHE_DIR):
+        return entries
+    for sub in os.listdir(CACHE_DIR):
+        sub_dir = os.path.join(CACHE_DIR, sub)
+        if not os.path.isdir(sub_dir):
+            continue
+        for fname in os.listdir(sub_dir):
+            if not fname.endswith(".npz"):
+                continue
+            path = os.path.join(sub_dir, fname)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _scan_size():
+    return sum(size for _, size, _ in _entries())
+
+
+def _evict():
+    """
+    מוחק את הרשומות שהיה בהן שימוש הכי מזמן עד שהמטמון יורד מתחת לתקרה.
+    """
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    target = CACHE_MAX_BYTES * CACHE_LOW_WATER
+    removed = 0
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            continue
+    if removed:
+        print(f"🧹 פונו {removed} רשומות ממטמון הגליפים")
+    return total
+
+
+def trace_cached(data, trace_fn, mode, **params):
+    """
+    מחזיר (קווי מתאר, (רוחב, גובה), האם_פגיעה). trace_fn נקרא רק כשאין רשומה במטמון
+    ומחזיר (קווי מתאר, (רוחב, גובה)).
+    """
+    key = cache_key(data, mode=mode, **params)
+    hit = get(key)
+    if hit is not None:
+        return hit[0], hit[1], True
+    contours, size = trace_fn()
+    put(key, contours, size)
+    return contours, size, False
@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
+from fontTools.misc.transform import Identity
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PROFILE = "default"
+DEFAULT_PROFILE_PATH = os.path.join(BASE_DIR, 'profiles', f"{DEFAULT_PROFILE}.json")
+# פרופילים נוספים ({שם}.json) - כל אחד מכיל רק את מה ששונה מ-default.json
+PROFILES_DIR = os.environ.get('GLYPH_PROFILES_DIR', os.path.dirname(DEFAULT_PROFILE_PATH))
+
+# שדות לכל אות; "final" גובר עליהם באותיות הסופיות שנטענות מקבצים קבועים (final_svgs)
+GLYPH_FIELDS = ("width", "left_margin", "right_margin", "padding", "y_offset", "scale", "translate")
+
+_lock = threading.Lock()
+# {שם פרופיל: (חותמות הקבצים, טבלה מהודרת)}
+_tables = {}
+
+
+def _profile_path(name):
+    if name == DEFAULT_PROFILE:
+        return DEFAULT_PROFILE_PATH
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", name or ""):
+        raise ValueError(f"שם פרופיל לא חוקי: {name!r}")
+    path = os.path.join(PROFILES_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        raise ValueError(f"פרופיל לא נמצא: {name}")
+    return path
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def merge_profile(base, override):
+    """
+    override גובר על base: שדות כלליים מוחלפים, ו-glyph/final/glyphs/final_svgs מתמזגים לפי מפתח.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if key == "glyphs":
+            glyphs = {name: dict(fields) for name, fields in base.get("glyphs", {}).items()}
+            for name, fields in value.items():
+                glyphs.setdefault(name, {}).update(fields)
+            merged["glyphs"] = glyphs
+        elif key in ("glyph", "final", "final_svgs", "kerning"):
+            merged[key] = {**base.get(key, {}), **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def _glyph_transform(fields, scale, y_shift):
+    padding = fields["padding"]
+    vertical_shift = fields["y_offset"] + y_shift
+    transform = Identity
+    if "scale" in fields or "translate" in fields:
+        s = fields.get("scale", 1.0)
+        transform = Identity.scale(s, s).translate(*fields.get("translate", (0, 0)))
+    return tuple(transform.scale(scale, scale).translate(padding, vertical_shift - padding))
+
+
+def compile_profile(profile):
+    """
+    פרופיל (מילון) → טבלת חיפוש {"digest", "glyphs": {(שם, סופית): מדדים}, "final_svgs", "kerning"}.
+    הטרנספורמציות מחושבות כאן פעם אחת ולא בכל טעינת גליף.
+    """
+    from generate_font import letter_map
+
+    for section in ("glyph", "final"):
+        unknown = set(profile.get(section, {})) - set(GLYPH_FIELDS)
+        if unknown:
+            raise ValueError(f"שדות לא מוכרים ב-{section}: {sorted(unknown)}")
+    for name in list(profile.get("glyphs", {})) + list(profile.get("final_svgs", {})):
+        if name not in letter_map:
+            raise ValueError(f"אות לא במפה בפרופיל: {name}")
+    for name, fields in profile.get("glyphs", {}).items():
+        unknown = set(fields) - set(GLYPH_FIELDS)
+        if unknown:
+            raise ValueError(f"שדות לא מוכרים ב-{name}: {sorted(unknown)}")
+
+    scale = float(profile.get("scale", 1.0))
+    y_shift = float(profile.get("y_shift", 0))
+    glyphs = {}
+    for name in letter_map:
+        fields = {**profile["glyph"], **profile.get("glyphs", {}).get(name, {})}
+        for final in (False, True):
+            entry = {**fields, **profile.get("final", {})} if final else fields
+            glyphs[(name, final)] = {
+                "width": entry["width"],
+                "left_margin": entry["left_margin"],
+                "right_margin": entry["right_margin"],
+                "transform": _glyph_transform(entry, scale, y_shift),
+            }
+    digest = hashlib.sha1(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()
+    return {"digest": digest, "glyphs": glyphs, "final_svgs": dict(profile.get("final_svgs", {})),
+            "kerning": dict(profile.get("kerning", {}))}
+
+
+def get_table(profile=None):
+    """
+    הטבלה המהודרת של פרופיל: None/"default", שם של קובץ ב-PROFILES_DIR, או מילון שמתמזג מעל ברירת המחדל.
+    טבלה של קובץ נבנית מחדש רק כשהקובץ השתנה, כך שהחלפת פרופיל בין בקשות עולה רק stat.
+    """
+    if isinstance(profile, dict):
+        return compile_profile(merge_profile(_read(_profile_path(DEFAULT_PROFILE)), profile))
+
+    name = profile or DEFAULT_PROFILE
+    paths = [_profile_path(DEFAULT_PROFILE)] + ([_profile_path(name)] if name != DEFAULT_PROFILE else [])
+    stamps = tuple(os.stat(path).st_mtime_ns for path in paths)
+    with _lock:
+        cached = _tables.get(name)
+    if cached is not None and cached[0] == stamps:
+        return cached[1]
+
+    merged = _read(paths[0])
+    for path in paths[1:]:
+        merged = merge_profile(merged, _read(path))
+    table = compile_profile(merged)
+    with _lock:
+        _tables[name] = (stamps, table)
+    return table
@@ -0,0 +1,255 @@
+import os
+import pickle
+import hashlib
+
+from defcon import Font
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.pens.cu2quPen import Cu2QuPen
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+
+import metrics
+import outline_optimizer
+import project_store
+import spacing
+from generate_font import letter_map, glyph_name_from_filename, load_glyph, load_traced_glyph
+from glyph_profile import get_table
+from font_info import FAMILY_NAME, STYLE_NAME
+
+UNITS_PER_EM = 1000
+ASCENDER = 800
+DESCENDER = -200
+# סטייה מקסימלית בהמרת עקומות קוביות לריבועיות (כמו ברירת המחדל של ufo2ft: 0.001 em)
+CU2QU_MAX_ERR = UNITS_PER_EM * 0.001
+
+
+def _settings_version(table):
+    """
+    חתימה של פרופיל המדדים ושל הגדרות ההמרה - שינוי בהם מבטל את כל הגליפים השמורים.
+    """
+    settings = (
+        table["digest"],
+        CU2QU_MAX_ERR,
+        outline_optimizer.OUTLINE_TOLERANCE,
+        outline_optimizer.SIMPLIFY_SHARE,
+        (spacing.BAND_HEIGHT, spacing.BAND_BOTTOM, spacing.BAND_TOP, spacing.CURVE_STEPS),
+    )
+    return hashlib.sha1(repr(settings).encode('utf-8')).hexdigest()
+
+
+def _file_signature(path):
+    with open(path, 'rb') as fh:
+        return hashlib.sha1(fh.read()).hexdigest()
+
+
+def load_model(model_path, table):
+    """
+    טוען את מודל הפונט של הסשן: {שם_אות: {"sig", "data", "width", "lsb", "sides"}}.
+    מודל שנבנה עם פרופיל אחר מתחיל מאפס.
+    """
+    version = _settings_version(table)
+    try:
+        with open(model_path, 'rb') as fh:
+            model = pickle.load(fh)
+        if model.get("version") == version:
+            return model
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    return {"version": version, "glyphs": {}}
+
+
+def model_file(model_path, table):
+    """
+    קובץ המודל של פרופיל מסוים: בניות במקביל עם פרופילים שונים לא דורסות זו את המודל של זו.
+    """
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.{table['digest'][:16]}{ext}"
+
+
+def save_model(model, model_path):
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        pickle.dump(model, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, model_path)
+
+
+@metrics.timed("glyph_compile")
+def _compile_glyph(glyph):
+    """
+    ממיר גליף defcon ל-bytes של טבלת glyf (עקומות ריבועיות, כיוון TrueType).
+    """
+    tt_pen = TTGlyphPen(None)
+    glyph.draw(Cu2QuPen(tt_pen, CU2QU_MAX_ERR, reverse_direction=True))
+    tt_glyph = tt_pen.glyph()
+    data = tt_glyph.compile(None)
+    lsb = tt_glyph.xMin if tt_glyph.numberOfContours else 0
+    return data, lsb
+
+
+def _notdef_glyph():
+    width = round(UNITS_PER_EM * 0.5)
+    stroke = round(UNITS_PER_EM * 0.05)
+    xmin, xmax = stroke, width - stroke
+    ymin, ymax = DESCENDER, ASCENDER
+    pen = TTGlyphPen(None)
+    # מלבן חיצוני עם כיוון השעון ומלבן פנימי נגדו
+    for rect, clockwise in (((xmin, ymin, xmax, ymax), True),
+                            ((xmin + stroke, ymin + stroke, xmax - stroke, ymax - stroke), False)):
+        x0, y0, x1, y1 = rect
+        pts = [(x0, y0), (x0, y1), (x1, y1), (x1, y0)]
+        if not clockwise:
+            pts.reverse()
+        pen.moveTo(pts[0])
+        for pt in pts[1:]:
+            pen.lineTo(pt)
+        pen.closePath()
+    glyph = pen.glyph()
+    glyph.recalcBounds(None)
+    return glyph, width, xmin
+
+
+def _load_glyph(name, path, final, logs, table):
+    scratch = Font()
+    return scratch[name] if load_glyph(scratch, name, path, logs, table, final) else None
+
+
+def _load_stored_glyph(name, contours, logs, table):
+    if not contours:
+        msg = f"❌ לא ניתן לנתח path עבור {name}"
+        print(msg)
+        logs.append(msg)
+        return None
+    return load_traced_glyph(Font(), name, contours, table)
+
+
+def build_ttf_incremental(svg_folder, output_ttf, model_path, profile=None, store=None):
+    """
+    בונה TTF מתיקיית SVG ומקובץ הפרויקט (store, ראו project_store.py) תוך שימוש חוזר בנתוני glyf
+    של אותיות שלא השתנו. אות שנמצאת בקובץ הפרויקט גוברת על SVG באותו שם; כל האותיות השמורות
+    נקראות בשאילתה אחת, ורק אלה שהשתנו מאז הבנייה הקודמת מומרות מחדש.
+    מחזיר (הצלחה, לוגים) כמו generate_ttf.
+    """
+    print("🚀 התחלת בנייה מצטברת של פונט...")
+    logs = []
+    table = get_table(profile)
+    model_path = model_file(model_path, table)
+    model = load_model(model_path, table)
+    old_glyphs = model["glyphs"]
+    glyphs = {}
+    rebuilt = 0
+    count = 0
+
+    stored = project_store.load_glyphs(store)
+    sources = []
+    for name in stored:
+        if name not in letter_map:
+            msg = f"🔸 אות לא במפה: {name}"
+            print(msg)
+            logs.append(msg)
+            continue
+        sources.append((name, None, False))
+    for filename in sorted(os.listdir(svg_folder)) if svg_folder and os.path.isdir(svg_folder) else []:
+        if not filename.lower().endswith(".svg"):
+            continue
+        name = glyph_name_from_filename(filename)
+        if name not in letter_map:
+            msg = f"🔸 אות לא במפה: {name}"
+            print(msg)
+            logs.append(msg)
+            continue
+        if name not in stored:
+            sources.append((name, os.path.join(svg_folder, filename), False))
+    sources.sort()
+    for name, path in table["final_svgs"].items():
+        if not os.path.exists(path):
+            msg = f"⚠️ קובץ סופי לא נמצא: {path}"
+            print(msg)
+            logs.append(msg)
+            continue
+        sources.append((name, path, True))
+
+    # מקור אחד לכל אות, והרשומה במודל נקבעת לפיו: אות סופית קבועה (final_svgs) גוברת על
+    # האות של המשתמש באותו שם, כמו ב-generate_ttf. אחרת שני המקורות דורסים זה את זה בכל בנייה
+    chosen = {name: (name, path, final) for name, path, final in sources}
+
+    changed = {}
+    for name, path, final in chosen.values():
+        if path is None:
+            sig = "store:" + stored[name][2]
+        else:
+            sig = ("final:" if final else "") + _file_signature(path)
+        entry = old_glyphs.get(name)
+        if entry is None or entry["sig"] != sig:
+            if path is None:
+                glyph = _load_stored_glyph(name, stored[name][0], logs, table)
+            else:
+                glyph = _load_glyph(name, path, final, logs, table)
+            if glyph is None:
+                continue
+            rebuilt += 1
+            changed[name] = glyph
+            entry = {"sig": sig}
+        else:
+            msg = f"♻️ {name} נלקח מהבנייה הקודמת"
+            print(msg)
+            logs.append(msg)
+        glyphs[name] = entry
+        # נספרות רק אותיות של המשתמש שנכנסות לפונט (לא כאלה שאות סופית קבועה החליפה)
+        if not final:
+            count += 1
+
+    # הגליפים שהשתנו ונטענו מ-SVG עוברים יחד פישוט והמרה לריבועיות לפני ההידור
+    svg_changed = {name: glyph for name, glyph in changed.items() if chosen[name][1] is not None}
+    outline_optimizer.report_points(outline_optimizer.optimize_glyphs(svg_changed), logs)
+    for name, glyph in changed.items():
+        data, lsb = _compile_glyph(glyph)
+        pen = RecordingPen()
+        glyph.draw(pen)
+        # פרופיל הצדדים נשמר עם הגליף, כך שהקרנינג של כל הזוגות מחושב מחדש בכל בנייה בלי לקרוא קבצים
+        glyphs[name].update(data=data, width=glyph.width, lsb=lsb, sides=spacing.glyph_sides(pen.value))
+
+    if count == 0:
+        msg = "❌ לא נוצרו גליפים כלל."
+        print(msg)
+        logs.append(msg)
+        return False, logs
+
+    try:
+        notdef, notdef_width, notdef_lsb = _notdef_glyph()
+        glyph_order = [".notdef"] + list(glyphs)
+        fb = FontBuilder(UNITS_PER_EM, isTTF=True)
+        fb.setupGlyphOrder(glyph_order)
+        fb.setupCharacterMap({letter_map[name]: name for name in glyphs})
+        glyf = {".notdef": notdef}
+        glyf.update({name: Glyph(entry["data"]) for name, entry in glyphs.items()})
+        # הנתונים השמורים כבר מהודרים (כולל תיבות תוחמות) - לא מפרקים אותם שוב
+        fb.setupGlyf(glyf, calcGlyphBounds=False, validateGlyphFormat=False)
+        hmtx = {".notdef": (notdef_width, notdef_lsb)}
+        hmtx.update({name: (round(e["width"]), e["lsb"]) for name, e in glyphs.items()})
+        fb.setupHorizontalMetrics(hmtx)
+        fb.setupHorizontalHeader(ascent=ASCENDER, descent=DESCENDER)
+        fb.setupNameTable({"familyName": FAMILY_NAME, "styleName": STYLE_NAME, "fullName": FAMILY_NAME})
+        fb.setupOS2(sTypoAscender=ASCENDER, sTypoDescender=DESCENDER, sTypoLineGap=0,
+                    usWinAscent=ASCENDER, usWinDescent=-DESCENDER)
+        fb.setupPost()
+        kerning = spacing.kerning_pairs({n: e["sides"] for n, e in glyphs.items()},
+                                        {n: e["width"] for n, e in glyphs.items()}, table["kerning"])
+        if kerning:
+            fb.addOpenTypeFeatures(spacing.kerning_fea(kerning))
+
+        os.makedirs(os.path.dirname(output_ttf), exist_ok=True)
+        with metrics.span("compile"):
+            fb.save(output_ttf)
+
+        model["glyphs"] = glyphs
+        save_model(model, model_path)
+        msg = f"\n🎉 הפונט נוצר בהצלחה בנתיב: {output_ttf} ({rebuilt} גליפים נבנו מחדש מתוך {len(glyphs)})"
+        print(msg)
+        logs.append(msg)
+        return True, logs
+    except Exception as e:
+        msg = f"❌ שגיאה בשמירת הפונט: {e}"
+        print(msg)
+        logs.append(msg)
+        return False, logs
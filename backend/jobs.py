@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+from incremental_font import build_ttf_incremental
+import project_store
+from variable_font import build_variable_ttf
+from webfont import build_web_fonts
+import metrics
+from process_pool import new_pool
+
+# מספר התהליכים שבונים פונטים במקביל
+FONT_BUILD_WORKERS = int(os.environ.get('FONT_BUILD_WORKERS', os.cpu_count() or 1))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+# המשימה האחרונה שנשלחה לכל סביבת עבודה, כדי לא לתזמן בנייה כפולה
+_latest_jobs = {}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = new_pool(FONT_BUILD_WORKERS)
+        return _executor
+
+
+def _job_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def _write_job(jobs_dir, job):
+    # כתיבה אטומית כדי שבדיקת סטטוס לא תקרא קובץ חלקי
+    path = _job_path(jobs_dir, job["id"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(job, fh, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def get_job(jobs_dir, job_id):
+    """
+    מחזיר את רשומת המשימה (מילון) או None אם אינה קיימת בתיקייה.
+    """
+    if not job_id or not job_id.isalnum():
+        return None
+    try:
+        with open(_job_path(jobs_dir, job_id), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _run_build(jobs_dir, job):
+    """
+    רץ בתהליך העובד: מעדכן סטטוס, בונה את הפונט לקובץ זמני ומחליף אותו אטומית.
+    """
+    job["status"] = STATUS_RUNNING
+    job["started"] = time.time()
+    _write_job(jobs_dir, job)
+
+    output_ttf = job["output"]
+    tmp_ttf = f"{output_ttf}.{job['id']}.tmp"
+    try:
+        if job.get("variable"):
+            success, logs = build_variable_ttf(job["svg_folder"], tmp_ttf, profile=job.get("profile"),
+                                               store=job.get("store"))
+        else:
+            success, logs = build_ttf_incremental(job["svg_folder"], tmp_ttf, job["model"], job.get("profile"),
+                                                  job.get("store"))
+        if success:
+            os.replace(tmp_ttf, output_ttf)
+            # הבונה כתב לקובץ הזמני, שכבר לא קיים; בלוגים מופיע הנתיב הסופי
+            logs = [line.replace(tmp_ttf, output_ttf) for line in logs]
+            # גרסאות הרשת נוצרות פעם אחת לכל בנייה, כאן בתהליך העובד. ה-TTF כבר פורסם,
+            # כך שכישלון כאן לא מכשיל את המשימה (ensure_web_font ינסה שוב בהורדה)
+            try:
+                build_web_fonts(output_ttf)
+            except Exception as e:
+                msg = f"⚠️ שגיאה ביצירת WOFF/WOFF2: {e}"
+                print(msg)
+                logs.append(msg)
+            if job.get("store"):
+                # נתוני הבנייה האחרונה נשמרים עם הפרויקט ושורדים הפעלה מחדש
+                project_store.set_meta(job["store"], **{
+                    "last_variable_build" if job.get("variable") else "last_build": {
+                        "job": job["id"], "output": output_ttf, "profile": job.get("profile"),
+                        "finished": time.time()}})
+        job["logs"] = logs
+        job["status"] = STATUS_DONE if success else STATUS_FAILED
+    except Exception as e:
+        job["status"] = STATUS_FAILED
+        job["error"] = str(e)
+    finally:
+        if os.path.exists(tmp_ttf):
+            os.remove(tmp_ttf)
+    job["finished"] = time.time()
+    _write_job(jobs_dir, job)
+    return job["status"]
+
+
+def _on_done(jobs_dir, job, future):
+    metrics.gauge_add("font_build_jobs_in_flight", -1)
+    # אם התהליך העובד קרס לפני שכתב סטטוס סופי
+    exc = future.exception()
+    if exc is not None:
+        job["status"] = STATUS_FAILED
+        job["error"] = str(exc)
+        job["finished"] = time.time()
+        _write_job(jobs_dir, job)
+        metrics.inc("font_build_jobs_total", status=STATUS_FAILED)
+        return
+    status, spans = future.result()
+    metrics.record_spans(spans)
+    metrics.inc("font_build_jobs_total", status=status)
+
+
+def submit_build(workspace_id, jobs_dir, svg_folder, output_ttf, model_path, variable=False, profile=None,
+                 store=None):
+    """
+    מתזמן בניית פונט (מצטברת - ראו incremental_font.py, או משתנה עם כל המשקלים - ראו
+    variable_font.py) ומחזיר מיד את רשומת המשימה. profile הוא שם פרופיל המדדים (ראו glyph_profile.py),
+    store הוא קובץ הפרויקט שממנו נקראות האותיות (ראו project_store.py).
+    אם כבר יש משימה ממתינה מאותו סוג ופרופיל לאותה סביבת עבודה - מחזיר אותה במקום לתזמן שוב.
+    """
+    os.makedirs(jobs_dir, exist_ok=True)
+
+    key = (workspace_id, variable, profile)
+    latest = get_job(jobs_dir, _latest_jobs.get(key))
+    if latest and latest["status"] == STATUS_QUEUED:
+        return latest
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "workspace": workspace_id,
+        "status": STATUS_QUEUED,
+        "svg_folder": svg_folder,
+        "output": output_ttf,
+        "model": model_path,
+        "variable": variable,
+        "profile": profile,
+        "store": store,
+        "logs": [],
+        "error": None,
+        "submitted": time.time(),
+        "started": None,
+        "finished": None,
+    }
+    _write_job(jobs_dir, job)
+    _latest_jobs[key] = job["id"]
+
+    metrics.gauge_add("font_build_jobs_in_flight", 1)
+    future = _get_executor().submit(metrics.call_with_spans, _run_build, jobs_dir, job)
+    future.add_done_callback(lambda f: _on_done(jobs_dir, job, f))
+    print(f"📥 משימת בנייה {job['id']} נוספה לתור")
+    return job
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import threading
+import importlib
+
+import metrics
+
+# מודולים כבדים (cv2, numpy, defcon, ufo2ft, fontTools) שנטענים ברקע אחרי עליית השרת
+PREWARM_MODULES = ["batch_trace", "jobs", "sheet_pipeline", "webfont", "preview", "svg_converter", "crop_quality"]
+PREWARM = os.environ.get('FONT_PREWARM', '1') != '0'
+
+# {מודול: זמן טעינה בשניות}
+IMPORT_TIMES = {}
+_lock = threading.Lock()
+
+metrics.describe("module_import_seconds", "gauge", "Time spent importing heavy modules")
+
+
+def timed_import(name):
+    """
+    טוען מודול ורושם כמה זמן לקח (רק בטעינה הראשונה).
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        if name not in IMPORT_TIMES:
+            IMPORT_TIMES[name] = time.perf_counter() - start
+            metrics.gauge_set("module_import_seconds", round(IMPORT_TIMES[name], 4), module=name)
+    return module
+
+
+class LazyModule:
+    """
+    מחליף של מודול שנטען רק בגישה הראשונה לאחד המאפיינים שלו.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = timed_import(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy(name):
+    return LazyModule(name)
+
+
+def _prewarm(names):
+    start = time.perf_counter()
+    for name in names:
+        try:
+            timed_import(name)
+        except Exception as e:
+            print(f"⚠️ טעינה מוקדמת של {name} נכשלה: {e}")
+    details = ", ".join(f"{n} {IMPORT_TIMES[n] * 1000:.0f}ms" for n in names if n in IMPORT_TIMES)
+    print(f"🔥 מודולים כבדים נטענו ברקע תוך {time.perf_counter() - start:.2f}s ({details})")
+
+
+def start_prewarm(names=None):
+    """
+    טוען את המודולים הכבדים בתהליכון רקע, כך שהבקשה הראשונה לא משלמת עליהם
+    והשרת עונה מיד. נקרא בכל תהליך עובד (אחרי fork), לא בתהליך האב.
+    """
+    if not PREWARM:
+        return None
+    thread = threading.Thread(target=_prewarm, args=(names or PREWARM_MODULES,), name="prewarm", daemon=True)
+    thread.start()
+    return thread
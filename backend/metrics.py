@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+# גבולות ההיסטוגרמה בשניות
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# {שם: (סוג, תיאור)}
+_meta = {}
+# {(שם, תוויות): ערך}
+_counters = {}
+_gauges = {}
+# {(שם, תוויות): [מונים לכל גבול..., סכום, ספירה]}
+_histograms = {}
+
+# כמה תהליכי web (gunicorn): כל תהליך כותב תמונת מצב של המדדים שלו לתיקייה משותפת,
+# ו-/metrics מסכם את כל התהליכים - לא משנה לאיזה עובד הגיעה הסריקה. ראו gunicorn.conf.py
+METRICS_DIR = os.environ.get('METRICS_DIR')
+# כל כמה שניות תהליך כותב את תמונת המצב שלו (אם משהו השתנה)
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+# התהליך שהפעיל את המצב המשותף; תהליכים שנוצרו ממנו ב-fork (מאגרי העבודה) לא כותבים -
+# המדידות שלהם מגיעות אליו דרך record_spans
+_shared_pid = None
+_dirty = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def describe(name, kind, help_text):
+    _meta[name] = (kind, help_text)
+
+
+def inc(name, value=1, **labels):
+    global _dirty
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+        _dirty = True
+
+
+def gauge_add(name, value, **labels):
+    global _dirty
+    with _lock:
+        key = _key(name, labels)
+        _gauges[key] = _gauges.get(key, 0) + value
+        _dirty = True
+
+
+def gauge_set(name, value, **labels):
+    global _dirty
+    with _lock:
+        _gauges[_key(name, labels)] = value
+        _dirty = True
+
+
+def observe(name, seconds, **labels):
+    global _dirty
+    with _lock:
+        _dirty = True
+        key = _key(name, labels)
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * len(DEFAULT_BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    מודד את משך השלב ורושם אותו בהיסטוגרמה font_stage_duration_seconds{stage=...}.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe("font_stage_duration_seconds", seconds, stage=stage, **labels)
+        for captured in getattr(_local, "captures", ()):
+            captured.append((stage, seconds, labels))
+
+
+def timed(stage):
+    """
+    מקשט פונקציה כך שכל קריאה אליה נמדדת כ-span בשם stage.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def call_with_spans(fn, *args, **kwargs):
+    """
+    להרצה בתהליך עובד: מחזיר (תוצאה, רשימת מדידות) כדי שהתהליך הראשי ירשום אותן.
+    """
+    captured = []
+    captures = getattr(_local, "captures", None)
+    if captures is None:
+        captures = _local.captures = []
+    captures.append(captured)
+    try:
+        return fn(*args, **kwargs), captured
+    finally:
+        captures.remove(captured)
+
+
+def record_spans(spans):
+    for stage, seconds, labels in spans:
+        observe("font_stage_duration_seconds", seconds, stage=stage, **labels)
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"'.replace('\n', ' ') for k, v in items)
+    return "{" + body + "}"
+
+
+def _snapshot():
+    with _lock:
+        return {
+            "counters": [[name, labels, value] for (name, labels), value in _counters.items()],
+            "gauges": [[name, labels, value] for (name, labels), value in _gauges.items()],
+            "histograms": [[name, labels, list(hist)] for (name, labels), hist in _histograms.items()],
+        }
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def flush():
+    """
+    כותב את תמונת המצב של התהליך הנוכחי לתיקייה המשותפת (כתיבה אטומית).
+    """
+    global _dirty
+    if _shared_pid is None or os.getpid() != _shared_pid:
+        return
+    with _lock:
+        _dirty = False
+    path = _snapshot_path(_shared_pid)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(_snapshot(), fh)
+    os.replace(tmp_path, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        if _dirty:
+            try:
+                flush()
+            except OSError:
+                pass
+
+
+def enable_shared(directory=None):
+    """
+    מפעיל את המצב המשותף בתהליך הנוכחי (נקרא פעם אחת בכל עובד web). בלי תיקייה - לא עושה כלום.
+    """
+    global METRICS_DIR, _shared_pid
+    METRICS_DIR = directory or METRICS_DIR
+    if not METRICS_DIR or _shared_pid == os.getpid():
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    _shared_pid = os.getpid()
+    flush()
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    לתהליך שיצא: המונים וההיסטוגרמות שלו נשארים בסיכום (כדי שלא ירדו), המדים (gauges) נמחקים.
+    """
+    path = os.path.join(directory or METRICS_DIR, f"{pid}.json")
+    try:
+        with open(path, encoding='utf-8') as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return
+    data["gauges"] = []
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    os.replace(f"{path}.tmp", path)
+
+
+def _labels(labels):
+    return tuple(tuple(item) for item in labels)
+
+
+def _collect():
+    """
+    {סוג: {(שם, תוויות): ערך}} - של התהליך הזה, ובמצב המשותף מסוכם מכל התהליכים.
+    מונים והיסטוגרמות מסוכמים; מדים מקבלים תווית pid, כי סכום שלהם לא תמיד הגיוני.
+    """
+    if _shared_pid is None or os.getpid() != _shared_pid:
+        with _lock:
+            return {"counter": dict(_counters), "gauge": dict(_gauges),
+                    "histogram": {key: list(hist) for key, hist in _histograms.items()}}
+
+    snapshots = {_shared_pid: _snapshot()}
+    for fname in os.listdir(METRICS_DIR):
+        pid = fname[:-len(".json")]
+        if not fname.endswith(".json") or not pid.isdigit() or int(pid) == _shared_pid:
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, fname), encoding='utf-8') as fh:
+                snapshots[int(pid)] = json.load(fh)
+        except (OSError, ValueError):
+            continue
+
+    counters, gauges, histograms = {}, {}, {}
+    for pid, data in snapshots.items():
+        for name, labels, value in data["counters"]:
+            key = (name, _labels(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in data["gauges"]:
+            gauges[(name, _labels(labels) + (("pid", pid),))] = value
+        for name, labels, hist in data["histograms"]:
+            key = (name, _labels(labels))
+            total = histograms.setdefault(key, [0] * len(hist))
+            for i, v in enumerate(hist):
+                total[i] += v
+    return {"counter": counters, "gauge": gauges, "histogram": histograms}
+
+
+def render_prometheus():
+    """
+    מחזיר את כל המדדים בפורמט הטקסט של Prometheus.
+    """
+    lines = []
+    series = {}
+    for entry_kind, values in _collect().items():
+        for (name, labels), value in values.items():
+            series.setdefault(name, []).append((entry_kind, labels, value))
+
+    for name in sorted(series):
+        entries = series[name]
+        kind = _meta.get(name, (entries[0][0], ""))[0]
+        help_text = _meta.get(name, ("", name))[1] or name
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for entry_kind, labels, value in entries:
+            if entry_kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            for bound, count in zip(DEFAULT_BUCKETS, value):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+describe("font_stage_duration_seconds", "histogram", "Duration of font pipeline stages")
+describe("http_requests_total", "counter", "HTTP requests by endpoint, method and status")
+describe("http_request_duration_seconds", "histogram", "HTTP request latency by endpoint")
+describe("http_requests_in_flight", "gauge", "HTTP requests currently being served")
+describe("font_build_jobs_in_flight", "gauge", "Font build jobs queued or running")
+describe("font_build_jobs_total", "counter", "Finished font build jobs by status")
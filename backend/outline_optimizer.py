@@ -0,0 +1,227 @@
+import os
+
+import numpy as np
+from fontTools.cu2qu import curve_to_quadratic
+from fontTools.pens.basePen import decomposeSuperBezierSegment
+from fontTools.pens.recordingPen import RecordingPen
+
+import metrics
+
+# השלב מיועד לקווי מתאר שנקראים מ-SVG (potrace ואותיות סופיות קבועות): עקומות קוביות ונקודות צפופות.
+# קווי המתאר של המעקב בתהליך (tracer) כבר מפושטים ב-approxPolyDP ומצוירים כעקומות ריבועיות, כך
+# שהשלב לא משנה בהם דבר ("1325 → 1325"); הבונים מעבירים לכאן רק אותיות שנטענו מ-SVG
+
+# תקציב הסטייה הכולל (ביחידות פונט) בין קווי המתאר שנקראו לאלה שנכנסים לפונט; 0 מבטל את השלב
+OUTLINE_TOLERANCE = float(os.environ.get('OUTLINE_TOLERANCE', 2.0))
+# החלק מהתקציב להסרת נקודות ואיחוד קטעים; השאר להמרת עקומות קוביות לריבועיות
+SIMPLIFY_SHARE = 0.5
+
+
+def point_count(value):
+    """
+    מספר הנקודות (on + off) בהקלטה של RecordingPen.
+    """
+    return sum(sum(1 for p in args if p is not None) for op, args in value
+               if op in ("moveTo", "lineTo", "curveTo", "qCurveTo"))
+
+
+def _distances(points, a, b):
+    """
+    מרחק כל נקודה (n, 2) מהקטע a-b (לא מהישר האינסופי).
+    """
+    ab = b - a
+    denom = float(ab @ ab)
+    if denom == 0.0:
+        return np.hypot(*(points - a).T)
+    t = np.clip((points - a) @ ab / denom, 0.0, 1.0)
+    return np.hypot(*(points - (a + t[:, None] * ab)).T)
+
+
+def simplify_polyline(points, tolerance):
+    """
+    Ramer-Douglas-Peucker: מסכת הנקודות שנשארות כך שהקו המפושט רחוק לכל היותר tolerance מהמקורי.
+    הקצוות תמיד נשארים; נקודות על ישר אחד (קטעים קוליניאריים) מתאחדות.
+    """
+    pts = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        d = _distances(pts[i + 1:j], pts[i], pts[j])
+        k = int(np.argmax(d))
+        if d[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.extend(((i, k), (k, j)))
+    return keep
+
+
+def _is_flat(p0, controls, end, tolerance):
+    return _distances(np.asarray(controls, dtype=np.float64), np.asarray(p0, dtype=np.float64),
+                      np.asarray(end, dtype=np.float64)).max() <= tolerance
+
+
+def _split_contours(value):
+    """
+    הקלטה → רשימת קווי מתאר {"start", "segs", "closed"}, כש-segs הוא [סוג, נקודות] עם
+    "line" (נקודה), "curve" (p0, c1, c2, p3) או "qcurve" (נקודות off..., סוף).
+    None אם יש בהקלטה משהו שהשלב לא מטפל בו (רכיבים, קו מתאר ריבועי בלי נקודות on).
+    """
+    contours = []
+    current = None
+    for op, args in value:
+        if op == "moveTo":
+            current = {"start": tuple(args[0]), "segs": [], "closed": False}
+            last = current["start"]
+        elif op == "lineTo" and current is not None:
+            current["segs"].append(["line", tuple(args[0])])
+            last = tuple(args[0])
+        elif op == "curveTo" and current is not None:
+            for c1, c2, p3 in decomposeSuperBezierSegment(args) if len(args) > 3 else [args]:
+                current["segs"].append(["curve", (last, tuple(c1), tuple(c2), tuple(p3))])
+                last = tuple(p3)
+        elif op == "qCurveTo" and current is not None and args[-1] is not None:
+            current["segs"].append(["qcurve", tuple(tuple(p) for p in args)])
+            last = tuple(args[-1])
+        elif op in ("closePath", "endPath") and current is not None:
+            current["closed"] = op == "closePath"
+            contours.append(current)
+            current = None
+        else:
+            return None
+    return contours
+
+
+def _simplify_contour(contour, tolerance):
+    start, segs = contour["start"], contour["segs"]
+
+    # עקומה שכל נקודות הבקרה שלה קרובות למיתר היא בעצם קו
+    flat = []
+    last = start
+    for kind, pts in segs:
+        end = pts[-1] if kind != "line" else pts
+        if kind == "curve" and _is_flat(pts[0], pts[1:3], end, tolerance):
+            kind, pts = "line", end
+        elif kind == "qcurve" and _is_flat(last, pts[:-1], end, tolerance):
+            kind, pts = "line", end
+        if kind == "line" and pts == last:
+            continue
+        flat.append([kind, pts])
+        last = end
+
+    if contour["closed"]:
+        # קו הסגירה המשתמע נכתב במפורש, ואז הקו מסובב כך שיתחיל בסוף של עקומה:
+        # כל רצף קווים נמצא אז בתוך הקו ולא חוצה את נקודת ההתחלה
+        if last != start:
+            flat.append(["line", start])
+        curves = [i for i, (kind, _) in enumerate(flat) if kind != "line"]
+        if curves:
+            k = curves[-1]
+            flat = flat[k + 1:] + flat[:k + 1]
+            start = flat[-1][1][-1]
+        elif len(flat) > 2:
+            # מצולע: כל הטבעת היא רצף קווים אחד
+            ring = [start] + [pts for _, pts in flat]
+            keep = simplify_polyline(ring, tolerance)
+            kept = [p for p, k in zip(ring[:-1], keep[:-1]) if k]
+            return {"start": kept[0], "segs": [["line", p] for p in kept[1:]], "closed": True}
+
+    out = []
+    run = [start]
+    for kind, pts in flat + [[None, None]]:
+        if kind == "line":
+            run.append(pts)
+            continue
+        if len(run) > 1:
+            keep = simplify_polyline(run, tolerance)
+            out.extend(["line", p] for p, k in zip(run[1:], keep[1:]) if k)
+        if kind is None:
+            break
+        if kind == "curve":
+            # נקודת ההתחלה של העקומה היא סוף הרצף שלפניה, שתמיד נשאר
+            pts = (run[-1],) + pts[1:]
+        out.append([kind, pts])
+        run = [pts[-1]]
+
+    if contour["closed"] and out and out[-1][0] == "line" and out[-1][1] == start:
+        out.pop()
+    return {"start": start, "segs": out, "closed": contour["closed"]}
+
+
+def _replay(contours, pen):
+    for contour in contours:
+        pen.moveTo(contour["start"])
+        for kind, pts in contour["segs"]:
+            if kind == "line":
+                pen.lineTo(pts)
+            elif kind == "curve":
+                pen.curveTo(*pts[1:])
+            else:
+                pen.qCurveTo(*pts)
+        if contour["closed"]:
+            pen.closePath()
+        else:
+            pen.endPath()
+
+
+@metrics.timed("outline_optimize")
+def optimize_glyphs(glyphs, tolerance=None):
+    """
+    מפשט את קווי המתאר של כל הגליפים (מילון {שם: גליף defcon}) במקום, במעבר אחד:
+    הסרת נקודות לפי סף, איחוד קטעים קוליניאריים, ואז המרה של כל העקומות הקוביות
+    של כל האותיות יחד לריבועיות. הסטייה הכוללת חסומה ב-tolerance יחידות פונט.
+    מחזיר {שם: (נקודות לפני, נקודות אחרי)}.
+    """
+    tolerance = OUTLINE_TOLERANCE if tolerance is None else tolerance
+    if tolerance <= 0:
+        return {}
+    simplify_tol = tolerance * SIMPLIFY_SHARE
+    curve_tol = tolerance - simplify_tol
+
+    parsed = {}
+    before = {}
+    for name, glyph in glyphs.items():
+        if len(glyph.components):
+            continue
+        recording = RecordingPen()
+        glyph.draw(recording)
+        contours = _split_contours(recording.value)
+        if contours is None:
+            continue
+        before[name] = point_count(recording.value)
+        parsed[name] = [_simplify_contour(c, simplify_tol) for c in contours]
+
+    # כל העקומות הקוביות של כל הגליפים עוברות המרה אחת, עם אותו תקציב שגיאה
+    cubics = [seg for contours in parsed.values() for c in contours for seg in c["segs"] if seg[0] == "curve"]
+    for seg in cubics:
+        spline = curve_to_quadratic(seg[1], curve_tol)
+        seg[0], seg[1] = "qcurve", tuple(tuple(p) for p in spline[1:])
+
+    stats = {}
+    for name, contours in parsed.items():
+        glyph = glyphs[name]
+        glyph.clearContours()
+        recording = RecordingPen()
+        _replay(contours, recording)
+        recording.replay(glyph.getPen())
+        stats[name] = (before[name], point_count(recording.value))
+    return stats
+
+
+def report_points(stats, logs):
+    """
+    מדפיס את מספר הנקודות לפני ואחרי לכל גליף ובסך הכל.
+    """
+    for name, (before, after) in stats.items():
+        msg = f"🪶 {name}: {before} → {after} נקודות"
+        print(msg)
+        logs.append(msg)
+    if stats:
+        total_before = sum(b for b, _ in stats.values())
+        total_after = sum(a for _, a in stats.values())
+        msg = f"🪶 סה\"כ {total_before} → {total_after} נקודות ({len(stats)} גליפים)"
+        print(msg)
+        logs.append(msg)
@@ -0,0 +1,220 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from defcon import Font
+from fontTools.pens.basePen import BasePen
+from fontTools.pens.recordingPen import RecordingPen, replayRecording
+
+import metrics
+import project_store
+import spacing
+from generate_font import letter_map, glyph_name_from_filename, load_glyph, load_traced_glyph
+from glyph_profile import get_table
+from incremental_font import UNITS_PER_EM, ASCENDER, DESCENDER
+
+# מספר תמונות תצוגה מקדימה שנשמרות בזיכרון (LRU)
+PREVIEW_CACHE_SIZE = int(os.environ.get('PREVIEW_CACHE_SIZE', 128))
+MIN_SIZE, MAX_SIZE = 12, 256
+MAX_TEXT = 80
+# מספר גליפים מפוענחים שנשמרים בזיכרון (מכל סביבות העבודה יחד)
+GLYPH_CACHE_SIZE = 4096
+# מספר נקודות לכל עקומה בשיטוח
+CURVE_STEPS = 8
+# רוחב רווח ואות חסרה ביחידות פונט
+SPACE_WIDTH = 300
+MISSING_WIDTH = 470
+
+CHAR_TO_GLYPH = {chr(code): name for name, code in letter_map.items()}
+
+_lock = threading.Lock()
+# {(נתיב, פרופיל): (חותמת קובץ, (הקלטה, רוחב))} - גליף נטען מחדש רק כשה-SVG שלו או הפרופיל השתנו.
+# לאות מקובץ הפרויקט הנתיב הוא "קובץ:שם" והחותמת היא החתימה של קווי המתאר השמורים
+_glyphs = OrderedDict()
+_renders = OrderedDict()
+# {גרסת סט הגליפים: זוגות קרנינג}
+_kerning = OrderedDict()
+
+
+class FlattenPen(BasePen):
+    """
+    עט שממיר קווי מתאר למצולעים (עקומות מפורקות לקווים) בקואורדינטות פיקסל.
+    """
+
+    def __init__(self, scale, dx, baseline):
+        super().__init__(None)
+        self.scale, self.dx, self.baseline = scale, dx, baseline
+        self.polygons = []
+        self._current = []
+
+    def _map(self, pt):
+        return (self.dx + pt[0] * self.scale, self.baseline - pt[1] * self.scale)
+
+    def _moveTo(self, pt):
+        self._current = [self._map(pt)]
+        self.polygons.append(self._current)
+
+    def _lineTo(self, pt):
+        self._current.append(self._map(pt))
+
+    def _curveToOne(self, p1, p2, p3):
+        p0 = self._getCurrentPoint()
+        t = np.linspace(0, 1, CURVE_STEPS + 1)[1:, None]
+        pts = ((1 - t) ** 3 * p0 + 3 * (1 - t) ** 2 * t * p1 + 3 * (1 - t) * t ** 2 * p2 + t ** 3 * p3)
+        self._current.extend(self._map(p) for p in pts)
+
+    def _qCurveToOne(self, p1, p2):
+        p0 = self._getCurrentPoint()
+        t = np.linspace(0, 1, CURVE_STEPS + 1)[1:, None]
+        pts = (1 - t) ** 2 * p0 + 2 * (1 - t) * t * np.asarray(p1) + t ** 2 * np.asarray(p2)
+        self._current.extend(self._map(p) for p in pts)
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_glyph(name, path, final, table, contours=None):
+    scratch = Font()
+    logs = []
+    if contours is not None:
+        if not contours:
+            return None
+        load_traced_glyph(scratch, name, contours, table)
+    elif not load_glyph(scratch, name, path, logs, table, final):
+        return None
+    pen = RecordingPen()
+    scratch[name].draw(pen)
+    return pen.value, scratch[name].width
+
+
+def glyph_set(svg_folder, profile=None, store=None):
+    """
+    קווי המתאר הנוכחיים של הסשן (גם כשחסרות אותיות): מחזיר (גרסה, {שם: (הקלטה, רוחב)}).
+    אותיות מקובץ הפרויקט (store) גוברות על SVG באותו שם.
+    הגרסה משתנה בכל פעם שאות נוספת או משתנה, או כשמחליפים פרופיל.
+    """
+    table = get_table(profile)
+    stored = project_store.load_glyphs(store)
+    sources = [(name, None, False) for name in sorted(stored) if name in letter_map]
+    if svg_folder and os.path.isdir(svg_folder):
+        for filename in sorted(os.listdir(svg_folder)):
+            name = glyph_name_from_filename(filename) if filename.lower().endswith(".svg") else None
+            if name in letter_map and name not in stored:
+                sources.append((name, os.path.join(svg_folder, filename), False))
+    sources += [(name, path, True) for name, path in table["final_svgs"].items() if os.path.exists(path)]
+
+    glyphs = {}
+    version = hashlib.sha1(table["digest"].encode('utf-8'))
+    for name, path, final in sources:
+        contours = None
+        if path is None:
+            contours, _, stamp = stored[name]
+            path = f"{store}:{name}"
+        else:
+            try:
+                stamp = _stamp(path)
+            except OSError:
+                continue
+        version.update(f"{name}:{path}:{stamp}".encode('utf-8'))
+        key = (path, table["digest"])
+        with _lock:
+            cached = _glyphs.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, _load_glyph(name, path, final, table, contours))
+            with _lock:
+                _glyphs[key] = cached
+                while len(_glyphs) > GLYPH_CACHE_SIZE:
+                    _glyphs.popitem(last=False)
+        if cached[1] is not None and name not in glyphs:
+            glyphs[name] = cached[1]
+    return version.hexdigest(), glyphs
+
+
+def glyph_kerning(version, glyphs, profile=None):
+    """
+    זוגות הקרנינג של סט הגליפים הנוכחי (אותו חישוב כמו בבניית הפונט), נשמרים לפי גרסה.
+    """
+    with _lock:
+        pairs = _kerning.get(version)
+    if pairs is None:
+        sides = {name: spacing.glyph_sides(value) for name, (value, _) in glyphs.items()}
+        widths = {name: width for name, (_, width) in glyphs.items()}
+        pairs = spacing.kerning_pairs(sides, widths, get_table(profile)["kerning"])
+        with _lock:
+            _kerning[version] = pairs
+            while len(_kerning) > PREVIEW_CACHE_SIZE:
+                _kerning.popitem(last=False)
+    return pairs
+
+
+@metrics.timed("preview_render")
+def _rasterize(glyphs, text, size, kerning=None):
+    scale = size / UNITS_PER_EM
+    margin = max(4, size // 8)
+    kerning = kerning or {}
+    advances = []
+    prev = None
+    for ch in text:
+        name = CHAR_TO_GLYPH.get(ch)
+        if name in glyphs:
+            # קרנינג RTL מקצר את הקידום בין האות הקודמת (מימין) לזו
+            advances.append((name, glyphs[name][1] + kerning.get((prev, name), 0)))
+        elif ch.isspace():
+            advances.append((None, SPACE_WIDTH))
+        else:
+            advances.append(("", MISSING_WIDTH))
+        prev = name
+
+    width = int(round(sum(w for _, w in advances) * scale)) + 2 * margin
+    height = int(round((ASCENDER - DESCENDER) * scale)) + 2 * margin
+    canvas = np.full((height, max(width, 2 * margin + 1)), 255, np.uint8)
+    baseline = margin + ASCENDER * scale
+
+    # עברית נכתבת מימין לשמאל: התו הראשון בקצה הימני
+    x = width - margin
+    for name, advance in advances:
+        x -= advance * scale
+        if name:
+            pen = FlattenPen(scale, x, baseline)
+            replayRecording(glyphs[name][0], pen)
+            polygons = [np.round(np.array(p) * 16).astype(np.int32) for p in pen.polygons if len(p) > 2]
+            if polygons:
+                cv2.fillPoly(canvas, polygons, 0, lineType=cv2.LINE_AA, shift=4)
+        elif name == "":
+            # אות שעוד לא נחתכה - מסגרת ריקה כמו .notdef
+            x0, x1 = int(x + advance * scale * 0.15), int(x + advance * scale * 0.85)
+            y0, y1 = int(baseline - ASCENDER * scale * 0.7), int(baseline)
+            cv2.rectangle(canvas, (x0, y0), (x1, y1), 180, 1)
+
+    ok, png = cv2.imencode('.png', canvas)
+    return png.tobytes()
+
+
+def render_preview(svg_folder, text, size=64, profile=None, store=None):
+    """
+    מצייר את text עם קווי המתאר הנוכחיים ל-PNG בלי לבנות פונט. מחזיר (png, etag).
+    התוצאה נשמרת לפי (גרסת סט הגליפים, טקסט, גודל).
+    """
+    text = text[:MAX_TEXT]
+    size = min(MAX_SIZE, max(MIN_SIZE, int(size)))
+    version, glyphs = glyph_set(svg_folder, profile, store)
+    key = (version, text, size)
+    etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    with _lock:
+        png = _renders.get(key)
+        if png is not None:
+            _renders.move_to_end(key)
+            return png, etag
+
+    png = _rasterize(glyphs, text, size, glyph_kerning(version, glyphs, profile))
+    with _lock:
+        _renders[key] = png
+        while len(_renders) > PREVIEW_CACHE_SIZE:
+            _renders.popitem(last=False)
+    return png, etag
@@ -3,6 +3,8 @@ import cv2
 import numpy as np
 import shutil
 
+import metrics
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 def convert_to_black_white(input_path, output_path, filename=None):
@@ -27,6 +29,7 @@ def convert_to_black_white(input_path, output_path, filename=None):
 
 
 
+@metrics.timed("normalize")
 def normalize_and_center_glyph(input_path, output_path, filename=None, target_size=600, margin=50, vertical_offset=0):
     """
     מנרמל ומרכז את התמונה בצבע המקורי בלי המרה לשחור-לבן.
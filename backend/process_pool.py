@@ -0,0 +1,20 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# שיטת ההפעלה של תהליכי המאגרים שנוצרים בתוך השרת. עובד gthread מריץ תהליכונים (בקשות, טעינה
+# מוקדמת, כתיבת מדדים), ו-fork ממנו עלול להעתיק מנעול תפוס (metrics._lock, מנעול import)
+# לילד שייתקע עליו. forkserver מייצר את הילדים מתהליך נקי עם תהליכון אחד
+START_METHOD = os.environ.get('POOL_START_METHOD', 'forkserver')
+# מודולים שתהליך ה-forkserver טוען פעם אחת, כך שכל ילד מתחיל כשהם כבר בזיכרון
+PRELOAD_MODULES = ["jobs", "batch_trace"]
+
+
+def new_pool(max_workers):
+    """
+    ProcessPoolExecutor עם START_METHOD (ולא ברירת המחדל fork).
+    """
+    context = multiprocessing.get_context(START_METHOD)
+    if START_METHOD == "forkserver":
+        context.set_forkserver_preload(PRELOAD_MODULES)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
@@ -0,0 +1,135 @@
+import json
+import time
+import sqlite3
+import hashlib
+import contextlib
+
+import numpy as np
+
+from tracer import pack_contours, unpack_contours
+import metrics
+
+# קובץ SQLite אחד לכל פרויקט (סביבת עבודה, ראו workspace.workspace_paths()["store"]):
+# החיתוכים המקוריים, קווי המתאר הארוזים (מערכי float32/int32 של tracer.pack_contours) ונתוני הבנייה
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS glyphs (
+    name TEXT PRIMARY KEY,
+    crop BLOB,
+    points BLOB,
+    offsets BLOB,
+    width INTEGER,
+    height INTEGER,
+    digest TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+@contextlib.contextmanager
+def _connect(path):
+    """
+    חיבור לקובץ הפרויקט (נוצר בפעם הראשונה). WAL מאפשר לעובדי הבנייה לקרוא בזמן שהשרת כותב.
+    היציאה מההקשר מבצעת commit (או rollback בשגיאה) וסוגרת את החיבור.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _pack(contours):
+    points, offsets = pack_contours(contours)
+    points, offsets = points.tobytes(), offsets.tobytes()
+    return points, offsets, hashlib.sha1(points + offsets).hexdigest()
+
+
+@metrics.timed("store_save")
+def save_glyphs(path, glyphs):
+    """
+    שומר כמה אותיות בטרנזקציה אחת. glyphs הוא רשימת (שם, חיתוך מקורי (bytes או None),
+    קווי מתאר, (רוחב, גובה) או None). קווי מתאר None שומרים רק את החיתוך (למשל כשה-SVG מגיע מ-potrace),
+    ואז האות נטענת מתיקיית ה-SVG ולא מהקובץ.
+    """
+    rows = []
+    now = time.time()
+    for name, crop, contours, size in glyphs:
+        if contours is None:
+            rows.append((name, crop, None, None, None, None, None, now))
+        else:
+            points, offsets, digest = _pack(contours)
+            width, height = size or (None, None)
+            rows.append((name, crop, points, offsets, width, height, digest, now))
+    with _connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO glyphs (name, crop, points, offsets, width, height, digest, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET crop = COALESCE(excluded.crop, crop), points = excluded.points, "
+            "offsets = excluded.offsets, width = excluded.width, height = excluded.height, "
+            "digest = excluded.digest, updated = excluded.updated",
+            rows)
+
+
+@metrics.timed("store_load")
+def load_glyphs(path):
+    """
+    כל קווי המתאר של הפרויקט בשאילתה אחת: {שם: (קווי מתאר, (רוחב, גובה), חתימה)}.
+    המערכים הם תצוגות על ה-BLOB בלי העתקה ובלי פענוח XML. קובץ שלא קיים → {}.
+    """
+    if not path:
+        return {}
+    try:
+        with _connect(path) as conn:
+            rows = conn.execute(
+                "SELECT name, points, offsets, width, height, digest FROM glyphs WHERE points IS NOT NULL"
+            ).fetchall()
+    except sqlite3.Error:
+        return {}
+    glyphs = {}
+    for name, points, offsets, width, height, digest in rows:
+        points = np.frombuffer(points, dtype=np.float32).reshape(-1, 2)
+        offsets = np.frombuffer(offsets, dtype=np.int32)
+        glyphs[name] = (unpack_contours(points, offsets), (width, height), digest)
+    return glyphs
+
+
+def load_crop(path, name):
+    """
+    החיתוך המקורי (bytes) של אות, למשל למעקב מחדש עם הגדרות אחרות. None אם אין.
+    """
+    with _connect(path) as conn:
+        row = conn.execute("SELECT crop FROM glyphs WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def glyph_names(path):
+    """
+    שמות האותיות שיש להן קווי מתאר בפרויקט.
+    """
+    if not path:
+        return set()
+    with _connect(path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM glyphs WHERE points IS NOT NULL")}
+
+
+def set_meta(path, **values):
+    """
+    שומר נתוני פרויקט (ערכי JSON), למשל פרטי הבנייה האחרונה.
+    """
+    with _connect(path) as conn:
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         [(key, json.dumps(value, ensure_ascii=False)) for key, value in values.items()])
+
+
+def get_meta(path):
+    with _connect(path) as conn:
+        return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
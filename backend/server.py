@@ -1,11 +1,24 @@
 import os
+import time
+_IMPORT_START = time.perf_counter()
 import base64
-import shutil
-from flask import Flask, render_template, request, jsonify, url_for, send_file
+from flask import Flask, render_template, request, jsonify, url_for, send_file, g, Response
 from werkzeug.utils import secure_filename
-from process_image import convert_to_black_white, normalize_and_center_glyph
-from generate_font import generate_ttf  # הפונקציה שלך ליצירת TTF
-from svg_converter import convert_png_to_svg  # המרת PNG ל-SVG
+import workspace
+import metrics
+from lazy_import import lazy, start_prewarm
+from upload_stream import iter_multipart_parts, PartTooLarge
+
+# מודולים כבדים (cv2/numpy/fontTools/defcon/ufo2ft) נטענים בגישה הראשונה או ברקע - ראו lazy_import.py
+svg_converter = lazy("svg_converter")
+jobs = lazy("jobs")
+batch_trace = lazy("batch_trace")
+webfont = lazy("webfont")
+preview = lazy("preview")
+sheet_pipeline = lazy("sheet_pipeline")
+glyph_profile = lazy("glyph_profile")
+project_store = lazy("project_store")
+crop_quality = lazy("crop_quality")
 
 # --- נתיבי בסיס ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,19 +28,12 @@ STATIC_DIR = os.path.join(BASE_DIR, 'static')
 FONTS_DIR = os.path.join(STATIC_DIR, 'fonts')
 os.makedirs(FONTS_DIR, exist_ok=True)
 
-# תיקיות עבודה
-UPLOADS_DIR = os.path.join(STATIC_DIR, 'uploads')
-PROCESSED_DIR = os.path.join(STATIC_DIR, 'processed')
-GLYPHS_DIR = os.path.join(STATIC_DIR, 'glyphs')
-BW_DIR = os.path.join(STATIC_DIR, 'bw')
-SVG_DIR = os.path.join(STATIC_DIR, 'svg_letters')
-
-for d in (UPLOADS_DIR, PROCESSED_DIR, GLYPHS_DIR, BW_DIR, SVG_DIR):
-    os.makedirs(d, exist_ok=True)
-
+# תיקיות העבודה (uploads, glyphs, bw, svg_letters) והפונט נפרדים לכל סביבת עבודה - ראו workspace.py
 EXPORT_FOLDER = os.path.join(BASE_DIR, '..', 'exports')
 os.makedirs(EXPORT_FOLDER, exist_ok=True)
-FONT_OUTPUT_PATH = os.path.join(EXPORT_FOLDER, 'my_font.ttf')
+os.makedirs(workspace.WORKSPACES_DIR, exist_ok=True)
+
+WORKSPACE_COOKIE = 'workspace_id'
 
 app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
 
@@ -39,15 +45,62 @@ LETTERS_ORDER = [
     "finalpe","finaltsadi"
 ]
 
-VERTICAL_OFFSETS = {
-    "yod": 0, "qof": 0, "finalkaf": 0, "finalnun": 0,
-    "finalpe": 0, "finaltsadi": 0
-}
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.gauge_add("http_requests_in_flight", 1)
+
+@app.before_request
+def load_workspace():
+    # כל משתמש מקבל סביבת עבודה משלו לפי עוגייה, כך שבניות במקביל לא דורסות זו את זו.
+    # כאן רק נטענת סביבה קיימת; סביבה חדשה נוצרת רק בנקודות שכותבות (require_workspace),
+    # כדי שבדיקות בריאות, סורקים ובקשות קריאה לא ייצרו תיקיות
+    g.workspace_id, g.paths, g.new_workspace = None, None, False
+    if request.endpoint in ('static', 'metrics_endpoint'):
+        return
+    workspace.cleanup_expired()
+    g.workspace_id, g.paths = workspace.get_workspace(request.cookies.get(WORKSPACE_COOKIE))
+
+def require_workspace():
+    """
+    סביבת העבודה של הבקשה, ויוצר אותה אם אין (לנקודות שכותבות: העלאות, חיתוכים, בנייה).
+    """
+    g.workspace_id, g.paths, created = workspace.get_or_create_workspace(g.workspace_id)
+    g.new_workspace = g.new_workspace or created
+    return g.paths
+
+def font_ready():
+    return g.paths is not None and os.path.exists(g.paths["font"])
+
+@app.after_request
+def save_workspace_cookie(response):
+    if getattr(g, 'new_workspace', False):
+        response.set_cookie(WORKSPACE_COOKIE, g.workspace_id,
+                            max_age=workspace.WORKSPACE_TTL, httponly=True, samesite='Lax')
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or "unknown"
+    metrics.inc("http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+    start = getattr(g, 'request_start', None)
+    if start is not None:
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+@app.teardown_request
+def finish_request_timer(exc):
+    if 'request_start' in g:
+        metrics.gauge_add("http_requests_in_flight", -1)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # פורמט הטקסט של Prometheus; לא יוצר סביבת עבודה למי שסורק
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
-    font_ready = os.path.exists(FONT_OUTPUT_PATH)
-    return render_template('index.html', font_ready=font_ready)
+    return render_template('index.html', font_ready=font_ready())
 
 @app.route('/upload', methods=['POST'])
 def upload():
@@ -58,19 +111,35 @@ def upload():
     if f.filename == '':
         return render_template('index.html', error='לא נבחר קובץ')
 
-    filename = secure_filename(f.filename)
-    input_path = os.path.join(UPLOADS_DIR, filename)
-    f.save(input_path)
+    require_workspace()
+    if request.form.get('mode') == 'auto':
+        return upload_auto(f)
 
-    # המרה פשוטה לשחור-לבן (ללא התאמות נוספות)
-    processed_name = f"proc_{filename}"
-    processed_path = os.path.join(PROCESSED_DIR, processed_name)
-    convert_to_black_white(input_path, processed_path)
+    # הדף נשמר פעם אחת ישירות לתיקייה שממנה הוא מוצג בדף החיתוך
+    filename = secure_filename(f.filename)
+    f.save(os.path.join(g.paths["uploads"], filename))
 
-    # העתקה ל-static/uploads להצגה
-    shutil.copy(processed_path, os.path.join(STATIC_DIR, 'uploads', processed_name))
+    image_path = f"{g.paths['static_prefix']}/uploads/{filename}"
+    return render_template('crop.html', filename=filename, image_path=image_path,
+                           font_ready=font_ready())
 
-    return render_template('crop.html', filename=processed_name, font_ready=os.path.exists(FONT_OUTPUT_PATH))
+def upload_auto(f):
+    """
+    מצב אוטומטי: דף אחד נכנס, הפונט יוצא באותה בקשה - חלוקה, נרמול, מעקב ובנייה בזיכרון.
+    """
+    tmp_ttf = f"{g.paths['font']}.{os.getpid()}.auto.tmp"
+    try:
+        profile = request_profile()
+        success, logs = sheet_pipeline.sheet_to_font(f.read(), tmp_ttf, profile=profile)
+        if not success:
+            return render_template('index.html', error=logs[-1] if logs else 'שגיאה ביצירת הפונט'), 422
+        os.replace(tmp_ttf, g.paths["font"])
+    except ValueError as e:
+        return render_template('index.html', error=str(e)), 400
+    finally:
+        if os.path.exists(tmp_ttf):
+            os.remove(tmp_ttf)
+    return send_file(g.paths["font"], as_attachment=True, download_name="my_font.ttf", mimetype="font/ttf")
 
 @app.route('/backend/save_crop', methods=['POST'])
 def save_crop():
@@ -91,51 +160,259 @@ def save_crop():
         except (ValueError, IndexError):
             return jsonify({"error": "invalid index"}), 400
 
+        require_workspace()
         # המרה מבסיס64 ל-PNG
         _, b64 = imageData.split(',', 1)
-        binary = base64.b64decode(b64)
-        tmp_path = os.path.join(PROCESSED_DIR, f"tmp_{eng_name}.png")
-        with open(tmp_path, 'wb') as fh:
-            fh.write(binary)
+        with metrics.span("base64_decode"):
+            binary = base64.b64decode(b64)
+        # חיתוך ריק/לכלוך/כמה אותיות נדחה מיד, לפני המעקב
+        quality, error = check_crop(binary)
+        if error:
+            return jsonify({"error": error, "letter": eng_name, "quality": quality}), 400 if quality is None else 422
+        # מעקב בזיכרון (פענוח → סף → מעקב); החיתוך וקווי המתאר הארוזים נשמרים בקובץ הפרויקט.
+        # חיתוך זהה שכבר נעקב נלקח מהמטמון בלי מעקב מחדש
+        cached = False
+        if svg_converter.TRACE_ENGINE == "potrace":
+            # potrace חיצוני צריך קובץ קלט, והבנייה קוראת את ה-SVG שלו
+            bw_out = os.path.join(g.paths["bw"], f"{eng_name}.png")
+            with open(bw_out, 'wb') as fh:
+                fh.write(binary)
+            svg_converter.convert_png_to_svg(bw_out, os.path.join(g.paths["svg"], f"{eng_name}.svg"))
+            project_store.save_glyphs(g.paths["store"], [(eng_name, binary, None, None)])
+        else:
+            contours, size, cached = batch_trace.trace_source(binary)
+            project_store.save_glyphs(g.paths["store"], [(eng_name, binary, contours, size)])
 
-        # שמירה ישירה ל-glyphs בלי התאמות חכמות
-        out_path = os.path.join(GLYPHS_DIR, f"{eng_name}.png")
-        shutil.copy(tmp_path, out_path)
+        # בדיקה: אם זו האות האחרונה, תזמון בניית הפונט ברקע
+        result = {"saved": f"{eng_name}.png", "cached": cached, "quality": quality,
+                  "font_ready": font_ready()}
+        if eng_name == LETTERS_ORDER[-1]:
+            job = submit_font_build()
+            result["job_id"] = job["id"]
+            result["status_url"] = url_for('job_status', job_id=job["id"])
 
-        # שמירה ל-BW
-        bw_out = os.path.join(BW_DIR, f"{eng_name}.png")
-        shutil.copy(tmp_path, bw_out)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # המרת SVG
-        svg_out = os.path.join(SVG_DIR, f"{eng_name}.svg")
-        convert_png_to_svg(bw_out, svg_out)
+@app.route('/backend/save_crops', methods=['POST'])
+def save_crops():
+    """
+    מקבל את כל החיתוכים בבקשה אחת: {"crops": [{"index": i, "data": dataURL}, ...]}
+    ועוקב אחריהם במקביל על מאגר תהליכים; התוצאות נשמרות בקובץ הפרויקט (ראו project_store.py).
+    """
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('crops'), list):
+            return jsonify({"error": "no crops"}), 400
 
-        # בדיקה: אם זו האות האחרונה, יצירת הפונט
-        font_ready = False
-        if eng_name == LETTERS_ORDER[-1]:
-            success, _ = generate_ttf(svg_folder=SVG_DIR, output_ttf=FONT_OUTPUT_PATH)
-            font_ready = success
+        sources = {}
+        for crop in data['crops']:
+            try:
+                eng_name = LETTERS_ORDER[int(crop.get('index'))]
+                _, b64 = crop['data'].split(',', 1)
+            except (TypeError, ValueError, IndexError, KeyError, AttributeError):
+                return jsonify({"error": "invalid crop"}), 400
+            with metrics.span("base64_decode"):
+                sources[eng_name] = base64.b64decode(b64)
 
-        return jsonify({"saved": f"{eng_name}.png", "font_ready": font_ready})
+        quality, rejected = {}, {}
+        for name in list(sources):
+            quality[name], error = check_crop(sources[name])
+            if error:
+                rejected[name] = error
+                del sources[name]
+        require_workspace()
+        results = batch_trace.process_glyphs(sources) if sources else []
+        return jsonify(batch_result(results, sources, quality, rejected))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/backend/upload_glyphs', methods=['POST'])
+def upload_glyphs():
+    """
+    העלאה בזרם multipart של כל האותיות: כל חלק נקרא שם_אות (או אינדקס) ומכיל PNG.
+    כל חלק נשלח לעיבוד ברגע שהגיע במלואו, בלי base64 ובלי קבצים זמניים.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return jsonify({"error": "expected multipart/form-data"}), 400
+
+    require_workspace()
+    futures, sources, quality, rejected = {}, {}, {}, {}
+    try:
+        for field, binary in iter_multipart_parts(request.stream, boundary):
+            eng_name = LETTERS_ORDER[int(field)] if field.isdigit() and int(field) < len(LETTERS_ORDER) else field
+            if eng_name not in LETTERS_ORDER:
+                return jsonify({"error": f"invalid letter: {field}"}), 400
+            quality[eng_name], error = check_crop(binary)
+            if error:
+                rejected[eng_name] = error
+                continue
+            sources[eng_name] = binary
+            futures[eng_name] = batch_trace.submit_glyph(eng_name, binary)
+    except PartTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": f"bad multipart body: {e}"}), 400
+
+    if not futures and not rejected:
+        return jsonify({"error": "no glyphs"}), 400
+    return jsonify(batch_result(batch_trace.collect_results(futures), sources, quality, rejected))
+
+def check_crop(binary):
+    """
+    ציוני האיכות של חיתוך לפני המעקב (ראו crop_quality.py). מחזיר (ציונים, שגיאה או None);
+    תמונה שלא ניתן לפענח מחזירה (None, שגיאה).
+    """
+    try:
+        quality = crop_quality.score_crop(batch_trace.decode_image(binary))
+    except ValueError as e:
+        return None, str(e)
+    return quality, None if quality["ok"] else crop_quality.describe(quality)
+
+def batch_result(results, sources, quality=None, rejected=None):
+    """
+    שומר את האותיות שנעקבו בקובץ הפרויקט (טרנזקציה אחת) ומחזיר את תשובת ה-JSON,
+    כולל ציוני האיכות וחיתוכים שנדחו לפני המעקב.
+    """
+    saved = [name for name, res in results if not isinstance(res, Exception)]
+    errors = {name: str(res) for name, res in results if isinstance(res, Exception)}
+    errors.update(rejected or {})
+    project_store.save_glyphs(g.paths["store"], [(name, sources[name], res, None)
+                                                 for name, res in results if not isinstance(res, Exception)])
+    result = {"saved": saved, "errors": errors, "quality": quality or {},
+              "font_ready": font_ready()}
+    # אם כל האותיות קיימות - תזמון בניית הפונט ברקע
+    stored = project_store.glyph_names(g.paths["store"])
+    if all(n in stored or os.path.exists(os.path.join(g.paths["svg"], f"{n}.svg")) for n in LETTERS_ORDER):
+        job = submit_font_build()
+        result["job_id"] = job["id"]
+        result["status_url"] = url_for('job_status', job_id=job["id"])
+    return result
+
+def request_profile():
+    """
+    שם פרופיל המדדים מהבקשה (profile=..., ברירת מחדל None). פרופיל לא קיים או שגוי → ValueError.
+    """
+    data = request.get_json(silent=True) or {}
+    name = data.get('profile', request.values.get('profile')) or None
+    if name:
+        glyph_profile.get_table(name)
+    return name
+
+def submit_font_build(variable=False, profile=None):
+    output = g.paths["variable_font"] if variable else g.paths["font"]
+    return jobs.submit_build(g.workspace_id, g.paths["jobs"], g.paths["svg"], output, g.paths["model"],
+                             variable=variable, profile=profile, store=g.paths["store"])
+
+def job_payload(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "logs": job["logs"],
+        "error": job["error"],
+        "status_url": url_for('job_status', job_id=job["id"]),
+        "download_url": url_for('download_font', job=job["id"]),
+    }
+
 @app.route('/generate_font', methods=['POST'])
 def generate_font():
     try:
-        success, _ = generate_ttf(svg_folder=SVG_DIR, output_ttf=FONT_OUTPUT_PATH)
-        return jsonify({
-            "status": "success" if success else "error",
-            "download_url": url_for('download_font')
-        })
+        # variable=1: פונט משתנה אחד עם כל המשקלים (Light/Regular/Bold)
+        data = request.get_json(silent=True) or {}
+        variable = str(data.get('variable', request.values.get('variable', ''))).lower() in ('1', 'true', 'yes')
+        # profile=<שם>: פרופיל מדדים מ-profiles/ לבנייה הזו בלבד
+        try:
+            profile = request_profile()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        require_workspace()
+        job = submit_font_build(variable, profile)
+        return jsonify(job_payload(job)), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get_job(g.paths["jobs"], job_id) if g.paths else None
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job_payload(job))
+
 @app.route('/download_font')
 def download_font():
-    if os.path.exists(FONT_OUTPUT_PATH):
-        return send_file(FONT_OUTPUT_PATH, as_attachment=True, download_name="my_font.ttf", mimetype="font/ttf")
-    return "הפונט עדיין לא נוצר", 404
+    job_id = request.args.get('job')
+    if g.paths is None:
+        return "הפונט עדיין לא נוצר", 404
+    font_path, download_name = g.paths["font"], "my_font.ttf"
+    if job_id:
+        job = jobs.get_job(g.paths["jobs"], job_id)
+        if job is None:
+            return "משימה לא קיימת", 404
+        if job["status"] != jobs.STATUS_DONE:
+            return jsonify(job_payload(job)), 409
+        if job.get("variable"):
+            font_path, download_name = g.paths["variable_font"], "my_font_variable.ttf"
+    fmt = request.args.get('format', 'ttf')
+    if fmt not in webfont.WEB_FORMATS:
+        return jsonify({"error": f"unsupported format: {fmt}"}), 400
+    if not os.path.exists(font_path):
+        return "הפונט עדיין לא נוצר", 404
+    # send_file מוסיף ETag ומחזיר 304 לבקשה מותנית (If-None-Match)
+    path = webfont.ensure_web_font(font_path, fmt)
+    return send_file(path, as_attachment=True, download_name=webfont.web_font_path(download_name, fmt),
+                     mimetype=webfont.WEB_FORMATS[fmt], conditional=True, etag=True)
+
+@app.route('/preview')
+def preview_text():
+    """
+    PNG של text עם האותיות שנחתכו עד עכשיו, בלי לבנות פונט (אותיות חסרות מוצגות כמסגרת).
+    """
+    text = request.args.get('text', '')
+    if not text:
+        return jsonify({"error": "missing text"}), 400
+    try:
+        size = int(request.args.get('size', 64))
+    except ValueError:
+        return jsonify({"error": "invalid size"}), 400
+    try:
+        profile = request_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # בלי סביבת עבודה - תצוגה ריקה (כל האותיות כמסגרות)
+    paths = g.paths or {}
+    png, etag = preview.render_preview(paths.get("svg"), text, size, profile, paths.get("store"))
+    response = Response(png, mimetype='image/png')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+@app.route('/font_subset')
+def font_subset():
+    """
+    תת-פונט עם האותיות של text בלבד (ברירת מחדל WOFF2), לשילוב בדף אינטרנט.
+    """
+    text = request.args.get('text', '')
+    fmt = request.args.get('format', 'woff2')
+    if not text:
+        return jsonify({"error": "missing text"}), 400
+    if fmt not in webfont.WEB_FORMATS:
+        return jsonify({"error": f"unsupported format: {fmt}"}), 400
+    if g.paths is None:
+        return "הפונט עדיין לא נוצר", 404
+    font_path = g.paths["variable_font"] if request.args.get('variable') == '1' else g.paths["font"]
+    if not os.path.exists(font_path):
+        return "הפונט עדיין לא נוצר", 404
+    path = webfont.subset_font(font_path, text, fmt)
+    return send_file(path, mimetype=webfont.WEB_FORMATS[fmt], conditional=True, etag=True)
+
+# עם כמה עובדי gunicorn (METRICS_DIR מוגדר) - /metrics מסכם את כל העובדים
+metrics.enable_shared()
+metrics.describe("server_import_seconds", "gauge", "Time to import server.py (heavy modules excluded)")
+metrics.gauge_set("server_import_seconds", round(time.perf_counter() - _IMPORT_START, 4))
+print(f"⚡ השרת מוכן תוך {(time.perf_counter() - _IMPORT_START) * 1000:.0f}ms")
+# הטעינה המוקדמת רצה בכל תהליך שמייבא את השרת (גם בעובדי gunicorn אחרי fork)
+start_prewarm()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,68 @@
+import os
+
+import cv2
+import numpy as np
+
+import batch_trace
+import metrics
+from binarize import binarize, ADAPTIVE
+from generate_font import generate_ttf, letter_map
+from split_letters import segment_letters
+
+# גובה אות חציוני אחרי נרמול (בפיקסלים); ביחידות פונט זה פי TRACE_SCALE
+TARGET_LETTER_HEIGHT = 70
+# שוליים לבנים סביב כל אות אחרי נרמול
+GLYPH_MARGIN = 4
+# מעל מספר פיקסלים זה לא נבנית מסכה לכל הדף: החלוקה רצה ברצועות וכל חיתוך עובר סף בנפרד
+STREAM_PIXELS = int(os.environ.get('SHEET_STREAM_PIXELS', 24_000_000))
+
+
+def normalization_scale(crops, target_height=TARGET_LETTER_HEIGHT):
+    """
+    יחס שינוי גודל אחיד לכל החיתוכים (לפי הגובה החציוני), כך שיחסי הגודל בין האותיות נשמרים.
+    """
+    heights = [crop.shape[0] for _, crop in crops if crop.size]
+    if not heights:
+        return None
+    return target_height / float(np.median(heights))
+
+
+def sheet_to_font(source, output_ttf, workers=None, family_name=None, final_svgs=None, profile=None):
+    """
+    דף כתב יד אחד (נתיב/bytes/מערך) → פונט TTF: חלוקה, נרמול, מעקב ובנייה, הכל בזיכרון.
+    family_name/final_svgs/profile עוברים ל-generate_ttf. מחזיר (הצלחה, לוגים).
+    """
+    logs = []
+    gray = batch_trace.decode_image(source)
+
+    streaming = gray.size > STREAM_PIXELS
+    with metrics.span("segment"):
+        if streaming:
+            # סריקה גדולה: רק הדף האפור בזיכרון, החיתוכים עוברים סף אחד-אחד בצינור המעקב
+            crops = segment_letters(gray)
+        else:
+            # הדף עובר סף פעם אחת; החלוקה והמעקב משתמשים באותה מסכה
+            mask = binarize(gray, ADAPTIVE, denoise=True, ink=255)
+            crops = segment_letters(mask, ink_mask=mask)
+    msg = f"✂️ נמצאו {len(crops)} אותיות בדף" + (" (ברצועות)" if streaming else "")
+    print(msg)
+    logs.append(msg)
+
+    # שמות split_letters הם final_kaf וכו', במפת הפונט finalkaf
+    sources = {name.replace('_', ''): crop if streaming else cv2.bitwise_not(crop)
+               for name, crop in crops if crop.size}
+
+    # הנרמול קורה בתוך הצינור של כל אות (סף → נרמול → מעקב), לא כאן
+    traced = {}
+    for name, result in batch_trace.process_glyphs(sources, workers=workers, scale=normalization_scale(crops),
+                                                   margin=GLYPH_MARGIN, binarized=not streaming):
+        if isinstance(result, Exception):
+            msg = f"❌ שגיאה במעקב אחרי {name}: {result}"
+            print(msg)
+            logs.append(msg)
+        elif name in letter_map:
+            traced[name] = result
+
+    success, build_logs = generate_ttf(None, output_ttf, traced=traced, family_name=family_name,
+                                       final_svgs=final_svgs, profile=profile)
+    return success, logs + build_logs
@@ -0,0 +1,120 @@
+import numpy as np
+from fontTools.pens.basePen import BasePen
+from fontTools.pens.recordingPen import replayRecording
+
+import metrics
+
+# פרופיל הצדדים נמדד ברצועות אופקיות בגובה BAND_HEIGHT יחידות, בטווח [BAND_BOTTOM, BAND_TOP)
+BAND_HEIGHT = 20
+BAND_BOTTOM = -400
+BAND_TOP = 1200
+BANDS = (BAND_TOP - BAND_BOTTOM) // BAND_HEIGHT
+# נקודות לכל עקומה בשיטוח
+CURVE_STEPS = 8
+
+
+class EdgePen(BasePen):
+    """
+    אוסף את קטעי קו המתאר (אחרי שיטוח עקומות) כמערך (n, 4) של x0, y0, x1, y1.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.edges = []
+
+    def _moveTo(self, pt):
+        self._start = pt
+
+    def _lineTo(self, pt):
+        self.edges.append((*self._getCurrentPoint(), *pt))
+
+    def _curveToOne(self, p1, p2, p3):
+        p0 = np.asarray(self._getCurrentPoint(), dtype=np.float64)
+        t = np.linspace(0, 1, CURVE_STEPS + 1)[:, None]
+        pts = ((1 - t) ** 3 * p0 + 3 * (1 - t) ** 2 * t * np.asarray(p1) + 3 * (1 - t) * t ** 2 * np.asarray(p2)
+               + t ** 3 * np.asarray(p3))
+        self.edges.extend(np.hstack([pts[:-1], pts[1:]]).tolist())
+
+    def _qCurveToOne(self, p1, p2):
+        p0 = np.asarray(self._getCurrentPoint(), dtype=np.float64)
+        t = np.linspace(0, 1, CURVE_STEPS + 1)[:, None]
+        pts = (1 - t) ** 2 * p0 + 2 * (1 - t) * t * np.asarray(p1) + t ** 2 * np.asarray(p2)
+        self.edges.extend(np.hstack([pts[:-1], pts[1:]]).tolist())
+
+    def _closePath(self):
+        current = self._getCurrentPoint()
+        if current is not None and current != self._start:
+            self.edges.append((*current, *self._start))
+
+
+def glyph_sides(recording):
+    """
+    פרופיל הצדדים של גליף (הקלטת RecordingPen): מערכים (left, right) באורך BANDS עם ה-x
+    הקיצוני בכל רצועה (inf/-inf ברצועה ריקה). הקטעים נדגמים בצפיפות של חצי רצועה, בבת אחת.
+    """
+    pen = EdgePen()
+    replayRecording(recording, pen)
+    left = np.full(BANDS, np.inf)
+    right = np.full(BANDS, -np.inf)
+    if not pen.edges:
+        return left, right
+    edges = np.asarray(pen.edges, dtype=np.float64)
+    p, q = edges[:, :2], edges[:, 2:]
+    counts = np.ceil(np.abs(q[:, 1] - p[:, 1]) / (BAND_HEIGHT / 2)).astype(np.int64) + 1
+    # t לכל דגימה: 0, 1/n, 2/n ... לכל קטע, בלי לולאה
+    owner = np.repeat(np.arange(len(edges)), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = (step / counts[owner])[:, None]
+    pts = p[owner] + t * (q[owner] - p[owner])
+    bands = np.clip(((pts[:, 1] - BAND_BOTTOM) // BAND_HEIGHT).astype(np.int64), 0, BANDS - 1)
+    np.minimum.at(left, bands, pts[:, 0])
+    np.maximum.at(right, bands, pts[:, 0])
+    return left, right
+
+
+@metrics.timed("kerning")
+def kerning_pairs(sides, widths, settings):
+    """
+    קרנינג לכל הזוגות בבת אחת. sides הוא {שם: (left, right)} מ-glyph_sides, widths {שם: רוחב},
+    settings הוא סעיף "kerning" של הפרופיל (strength, max, min).
+    בעברית (RTL) בזוג (ראשון, שני) השני מופיע משמאל לראשון: המרווח בכל רצועה הוא
+    רוחב(שני) - ימין(שני) + שמאל(ראשון). הזוג מתקרב כשהמרווח הקטן ביותר גדול מהרצוי
+    (מרווח הצד הימני של השני + השמאלי של הראשון), ומתרחק כשהוא קטן ממנו. מחזיר {(ראשון, שני): ערך}.
+    """
+    names = [n for n in sides if np.isfinite(sides[n][0]).any()]
+    if not names:
+        return {}
+    left = np.stack([sides[n][0] for n in names])
+    right = np.stack([sides[n][1] for n in names])
+    # רצועות שכנות נחשבות גם הן, כך שאלכסונים קרובים לא מתנגשים
+    left = np.minimum(left, np.minimum(np.roll(left, 1, axis=1), np.roll(left, -1, axis=1)))
+    right = np.maximum(right, np.maximum(np.roll(right, 1, axis=1), np.roll(right, -1, axis=1)))
+    adv = np.array([widths[n] for n in names], dtype=np.float64)
+    # מרווחי הצד בפועל (אחרי שהוחלו מהפרופיל) הם המרווח הרצוי בין שני צדדים ישרים
+    lsb = left.min(axis=1)
+    rsb = adv - right.max(axis=1)
+
+    # [ראשון, שני, רצועה]; רצועה שחסרה באחד מהשניים נותנת inf
+    gaps = adv[None, :, None] + left[:, None, :] - right[None, :, :]
+    closest = gaps.min(axis=2)
+    target = lsb[:, None] + rsb[None, :]
+    kern = np.clip((target - closest) * settings["strength"], -settings["max"], settings["max"])
+    kern = np.where(np.isfinite(closest), np.round(kern), 0)
+
+    first, second = np.nonzero(np.abs(kern) >= settings["min"])
+    return {(names[i], names[j]): int(kern[i, j]) for i, j in zip(first, second)}
+
+
+def kerning_fea(pairs):
+    """
+    טבלת GPOS (feature kern) לזוגות, בכתב עברית. בזוג RTL הערך מוזז וגם מקצר את
+    הקידום של הגליף הראשון (<v 0 v 0>), כמו שכותב הקרנינג של ufo2ft עושה.
+    """
+    if not pairs:
+        return ""
+    lines = ["languagesystem DFLT dflt;", "languagesystem hebr dflt;", "", "feature kern {",
+             "    lookup kern_rtl {", "        lookupflag IgnoreMarks;"]
+    for (first, second), value in sorted(pairs.items()):
+        lines.append(f"        pos {first} {second} <{value} 0 {value} 0>;")
+    lines += ["    } kern_rtl;", "} kern;", ""]
+    return "\n".join(lines)
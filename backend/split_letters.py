@@ -3,60 +3,227 @@ import numpy as np
 import os
 from pathlib import Path
 
-def split_letters_from_image(image_path, output_dir):
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
+from binarize import iter_bands, ADAPTIVE, BAND_ROWS
 
-    img_gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    if img_gray is None:
-        raise ValueError(f"Cannot load image: {image_path}")
+hebrew_letters = [
+    'alef', 'bet', 'gimel', 'dalet', 'he', 'vav', 'zayin', 'het', 'tet',
+    'yod', 'kaf', 'lamed', 'mem', 'nun', 'samekh', 'ayin', 'pe', 'tsadi',
+    'qof', 'resh', 'shin', 'tav', 'final_kaf', 'final_mem', 'final_nun',
+    'final_pe', 'final_tsadi'
+]
+
+letters_expand_top = ['tsadi', 'qof', 'final_kaf', 'final_nun', 'final_pe', 'final_tsadi']
+
+# אותיות שצריך להזיז למטה (shift down) — צ ק ך ן ף
+letters_shift_down = {
+    'tsadi': 15,
+    'qof': 15,
+    'final_kaf': 15,
+    'final_nun': 15,
+    'final_pe': 15,
+    'final_tsadi': 15,
+}
+
+
+def sort_boxes_hebrew(boxes, line_tol=15):
+    """
+    ממיין תיבות לשורות (לפי y) ובתוך כל שורה מימין לשמאל.
+    שורה חדשה מתחילה כשה-y רחוק מתחילת השורה הנוכחית ביותר מ-line_tol.
+    """
+    if not boxes:
+        return []
+    arr = np.asarray(boxes)
+    arr = arr[np.argsort(arr[:, 1], kind='stable')]
+    ys = arr[:, 1]
+
+    # תחילת כל שורה נמצאת בחיפוש בינארי - לולאה על שורות ולא על תיבות
+    line_ids = np.zeros(len(arr), dtype=np.int64)
+    start = 0
+    line = 0
+    while start < len(arr):
+        end = int(np.searchsorted(ys, ys[start] + line_tol, side='right'))
+        line_ids[start:end] = line
+        start = end
+        line += 1
+
+    order = np.lexsort((-arr[:, 0], line_ids))
+    return [tuple(int(v) for v in box) for box in arr[order]]
 
-    _, bw = cv2.threshold(img_gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
 
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
-    bw = cv2.morphologyEx(bw, cv2.MORPH_OPEN, kernel, iterations=1)
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
 
-    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(bw, connectivity=8)
+
+def _candidate_pairs(x0, y0, x1, y1, max_dist):
+    """
+    זוגות (i, j) של תיבות שהפער האופקי ביניהן < max_dist ויש ביניהן חפיפה אנכית.
+    כל תיבה, מורחבת ימינה ב-max_dist, נרשמת בתאי רשת שגודלם כגודל תיבה טיפוסית; רק תיבות
+    שחולקות תא נבדקות, כך שתיבות משורות אחרות (או רחוקות אופקית) לא נבדקות כלל.
+    """
+    ex1 = x1 + max_dist
+    cw = max(int(np.median(ex1 - x0)), 1)
+    ch = max(int(np.median(y1 - y0)), 1)
+    cx0, cx1 = x0 // cw, (ex1 - 1) // cw
+    cy0, cy1 = y0 // ch, (y1 - 1) // ch
+    nx, ny = cx1 - cx0 + 1, cy1 - cy0 + 1
+
+    # (תא, תיבה) לכל תא שהתיבה מכסה, בלי לולאה
+    per_box = nx * ny
+    box = np.repeat(np.arange(len(x0)), per_box)
+    k = np.arange(per_box.sum()) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+    cell_x = cx0[box] + k % nx[box]
+    cell_y = cy0[box] + k // nx[box]
+    cols = int(cx1.max()) + 2
+    cell = cell_y * cols + cell_x
+    order = np.lexsort((box, cell))
+    cell, box = cell[order], box[order]
+
+    # כל הזוגות בתוך כל תא
+    ends = np.searchsorted(cell, cell, side='right')
+    counts = ends - np.arange(len(cell)) - 1
+    first = np.repeat(np.arange(len(cell)), counts)
+    second = first + 1 + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    i_idx, j_idx, shared = box[first], box[second], cell[first]
+
+    keep = ((x0[j_idx] < ex1[i_idx]) & (x0[i_idx] < ex1[j_idx])
+            & (np.minimum(y1[i_idx], y1[j_idx]) - np.maximum(y0[i_idx], y0[j_idx]) > 0))
+    # זוג שחולק כמה תאים נספר רק בתא של הפינה השמאלית-עליונה של החיתוך ביניהם
+    corner = (np.maximum(y0[i_idx], y0[j_idx]) // ch) * cols + np.maximum(x0[i_idx], x0[j_idx]) // cw
+    keep &= corner == shared
+    return i_idx[keep], j_idx[keep]
+
+
+def _merge_pass(arr, max_dist):
+    n = len(arr)
+    x0, y0 = arr[:, 0], arr[:, 1]
+    x1, y1 = x0 + arr[:, 2], y0 + arr[:, 3]
+
+    parent = list(range(n))
+    for i, j in zip(*(idx.tolist() for idx in _candidate_pairs(x0, y0, x1, y1, max_dist))):
+        ri, rj = _find(parent, i), _find(parent, j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    roots = np.array([_find(parent, i) for i in range(n)])
+
+    groups, labels = np.unique(roots, return_inverse=True)
+    gx0 = np.full(len(groups), np.iinfo(np.int64).max)
+    gy0 = gx0.copy()
+    gx1 = np.full(len(groups), np.iinfo(np.int64).min)
+    gy1 = gx1.copy()
+    np.minimum.at(gx0, labels, x0)
+    np.minimum.at(gy0, labels, y0)
+    np.maximum.at(gx1, labels, x1)
+    np.maximum.at(gy1, labels, y1)
+    # הסדר לפי האינדקס הראשון בכל קבוצה, כמו בסריקה המקורית
+    return np.stack([gx0, gy0, gx1 - gx0, gy1 - gy0], axis=1)
+
+
+def merge_close_boxes(boxes, max_dist=15):
+    """
+    מאחד תיבות קרובות אופקית (פער < max_dist) שיש ביניהן חפיפה אנכית, כולל שרשראות של תיבות,
+    עד שאין יותר מה לאחד: תיבה מאוחדת גדולה יותר ויכולה להתקרב לתיבות נוספות, ולכן מעבר
+    union-find חוזר על התיבות המאוחדות עד שהמספר לא משתנה. המועמדים מגיעים מרשת (ראו _candidate_pairs).
+    """
+    if len(boxes) < 2:
+        return list(boxes)
+    arr = np.asarray(boxes, dtype=np.int64)
+    while len(arr) > 1:
+        merged = _merge_pass(arr, max_dist)
+        if len(merged) == len(arr):
+            break
+        arr = merged
+    return [tuple(int(v) for v in box) for box in arr]
+
+
+def _band_pairs(prev_row, cur_row):
+    """
+    זוגות (תווית למעלה, תווית למטה) שנוגעות זו בזו בגבול בין שתי רצועות (קשירות 8).
+    """
+    pairs = []
+    for a, b in ((prev_row, cur_row), (prev_row[:-1], cur_row[1:]), (prev_row[1:], cur_row[:-1])):
+        touching = (a > 0) & (b > 0)
+        pairs.append(np.stack([a[touching], b[touching]], axis=1))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def component_stats(bands):
+    """
+    רכיבים קשירים על דף שמגיע ברצועות (y0, מסכה): מחזיר מערך (x, y, w, h, area) כמו
+    stats של cv2.connectedComponentsWithStats (בלי הרקע ובאותו סדר), כשרכיבים שחוצים
+    גבול בין רצועות מאוחדים עם union-find. נשמרת רק השורה האחרונה של התוויות, כך שהזיכרון
+    תלוי בגודל הרצועה ולא בגודל הדף.
+    """
+    stats_parts = []
+    order_parts = []
+    parent = []
+    prev_row, prev_offset, offset = None, 0, 0
+    for y0, band in bands:
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(band, connectivity=8)
+        part = stats[1:].astype(np.int64)
+        part[:, 1] += y0
+        stats_parts.append(part)
+        # cv2 ממספר רכיבים לפי בלוק 2x2 הראשון שלהם בסדר סריקה; שומרים את המפתח הזה
+        # כדי שהסדר הסופי יהיה זהה לתיוג של הדף כולו
+        ys, xs = np.nonzero(labels)
+        key = np.full(n, np.iinfo(np.int64).max)
+        block_cols = (band.shape[1] + 1) // 2
+        np.minimum.at(key, labels[ys, xs], (ys.astype(np.int64) + y0) // 2 * block_cols + xs // 2)
+        order_parts.append(key[1:])
+        del ys, xs
+        parent.extend(range(offset, offset + n - 1))
+        if prev_row is not None and n > 1:
+            for a, b in _band_pairs(prev_row, labels[0]).tolist():
+                ri, rj = _find(parent, prev_offset + a - 1), _find(parent, offset + b - 1)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+        prev_row, prev_offset = labels[-1].copy(), offset
+        offset += n - 1
+        del labels
+
+    if not offset:
+        return np.zeros((0, 5), dtype=np.int64)
+    stats = np.concatenate(stats_parts)
+    order = np.concatenate(order_parts)
+    roots = np.array([_find(parent, i) for i in range(offset)])
+    groups, labels = np.unique(roots, return_inverse=True)
+    x0 = np.full(len(groups), np.iinfo(np.int64).max)
+    y0 = x0.copy()
+    x1 = np.full(len(groups), np.iinfo(np.int64).min)
+    y1 = x1.copy()
+    area = np.zeros(len(groups), dtype=np.int64)
+    np.minimum.at(x0, labels, stats[:, 0])
+    np.minimum.at(y0, labels, stats[:, 1])
+    np.maximum.at(x1, labels, stats[:, 0] + stats[:, 2])
+    np.maximum.at(y1, labels, stats[:, 1] + stats[:, 3])
+    np.add.at(area, labels, stats[:, 4])
+    first = np.full(len(groups), np.iinfo(np.int64).max)
+    np.minimum.at(first, labels, order)
+    return np.stack([x0, y0, x1 - x0, y1 - y0, area], axis=1)[np.argsort(first, kind='stable')]
+
+
+def _mask_bands(mask, band_rows=BAND_ROWS):
+    for y0 in range(0, mask.shape[0], band_rows):
+        yield y0, mask[y0:y0 + band_rows]
+
+
+def segment_letters(img_gray, ink_mask=None):
+    """
+    מחלק דף כתב יד (מערך אפור) ל-27 אותיות ומחזיר רשימת (שם, מערך החיתוך) בזיכרון.
+    ink_mask (דיו=255) מאפשר להעביר דף שכבר עבר סף, כדי לא לחשב אותו פעמיים.
+    """
+    # סף מקומי לפי אריחים + ניקוי רעש, עמיד לתאורה לא אחידה בצילום טלפון.
+    # הסף והתיוג רצים ברצועות, כך שלא נוצרות מסכה ותוויות int32 בגודל הדף כולו
+    if ink_mask is not None:
+        bands = _mask_bands(ink_mask)
+    else:
+        bands = iter_bands(img_gray, ADAPTIVE, denoise=True, ink=255)
+    components = component_stats(bands)
 
     min_area = 50
-    letter_boxes = []
-    for i in range(1, num_labels):
-        x, y, w, h, area = stats[i]
-        if area >= min_area:
-            letter_boxes.append((x, y, w, h))
-
-    def sort_boxes_hebrew(boxes, line_tol=15):
-        boxes = sorted(boxes, key=lambda b: b[1])
-        lines = []
-        current_line = []
-        current_y = -1000
-        for box in boxes:
-            x, y, w, h = box
-            if abs(y - current_y) > line_tol:
-                if current_line:
-                    lines.append(current_line)
-                current_line = [box]
-                current_y = y
-            else:
-                current_line.append(box)
-        if current_line:
-            lines.append(current_line)
-        sorted_boxes = []
-        for line in lines:
-            line_sorted = sorted(line, key=lambda b: -b[0])
-            sorted_boxes.extend(line_sorted)
-        return sorted_boxes
-
-    letters_expand_top = ['tsadi', 'qof', 'final_kaf', 'final_nun', 'final_pe', 'final_tsadi']
-
-    # אותיות שצריך להזיז למטה (shift down) — צ ק ך ן ף
-    letters_shift_down = {
-        'tsadi': 15,
-        'qof': 15,
-        'final_kaf': 15,
-        'final_nun': 15,
-        'final_pe': 15,
-        'final_tsadi': 15,
-    }
+    letter_boxes = [tuple(box) for box in components[components[:, 4] >= min_area][:, :4].tolist()]
 
     def expand_box(box, pad_x=10, pad_y_top=15, pad_y_bottom=5, letter_name=None):
         if letter_name in letters_expand_top:
@@ -68,13 +235,6 @@ def split_letters_from_image(image_path, output_dir):
         nh = min(h + pad_y_top + pad_y_bottom, img_gray.shape[0] - ny)
         return (nx, ny, nw, nh)
 
-    hebrew_letters = [
-        'alef', 'bet', 'gimel', 'dalet', 'he', 'vav', 'zayin', 'het', 'tet',
-        'yod', 'kaf', 'lamed', 'mem', 'nun', 'samekh', 'ayin', 'pe', 'tsadi',
-        'qof', 'resh', 'shin', 'tav', 'final_kaf', 'final_mem', 'final_nun',
-        'final_pe', 'final_tsadi'
-    ]
-
     # בדיקה אם האות הראשונה היא alef, אם לא - דילוג עליה
     if len(letter_boxes) > 0:
         # למיון לפני דילוג, נעשה מיון זמני לפי מיקום X כדי להבין
@@ -93,38 +253,9 @@ def split_letters_from_image(image_path, output_dir):
         letter_name = hebrew_letters[i] if i < len(hebrew_letters) else None
         expanded_boxes.append(expand_box(box, letter_name=letter_name))
 
-    def merge_close_boxes(boxes, max_dist=15):
-        merged = []
-        used = [False]*len(boxes)
-        for i, b1 in enumerate(boxes):
-            if used[i]:
-                continue
-            x1, y1, w1, h1 = b1
-            x1b, y1b = x1 + w1, y1 + h1
-            merged_box = b1
-            for j in range(i+1, len(boxes)):
-                if used[j]:
-                    continue
-                x2, y2, w2, h2 = boxes[j]
-                x2b, y2b = x2 + w2, y2 + h2
-                horizontal_gap = max(x2 - x1b, x1 - x2b)
-                vertical_overlap = min(y1b, y2b) - max(y1, y2)
-                if horizontal_gap < max_dist and vertical_overlap > 0:
-                    nx = min(x1, x2)
-                    ny = min(y1, y2)
-                    nb = max(x1b, x2b)
-                    nh = max(y1b, y2b)
-                    merged_box = (nx, ny, nb - nx, nh - ny)
-                    used[j] = True
-            used[i] = True
-            merged.append(merged_box)
-        return merged
-
-    while len(expanded_boxes) > 27:
-        prev_len = len(expanded_boxes)
+    # איחוד רק כשיש יותר תיבות מאותיות; merge_close_boxes ממשיך בעצמו עד שאין מה לאחד
+    if len(expanded_boxes) > 27:
         expanded_boxes = merge_close_boxes(expanded_boxes)
-        if len(expanded_boxes) == prev_len:
-            break
 
     if len(expanded_boxes) < 27:
         avg_w = int(np.mean([b[2] for b in expanded_boxes])) if expanded_boxes else 50
@@ -134,7 +265,8 @@ def split_letters_from_image(image_path, output_dir):
 
     expanded_boxes = sort_boxes_hebrew(expanded_boxes)
 
-    # חיתוך ושמירת אותיות עם הורדת y ספציפית לאותיות
+    # חיתוך אותיות עם הורדת y ספציפית לאותיות
+    crops = []
     for i, (x, y, w, h) in enumerate(expanded_boxes[:27]):
         name = hebrew_letters[i]
         shift_down = letters_shift_down.get(name, 0)
@@ -145,9 +277,22 @@ def split_letters_from_image(image_path, output_dir):
         if ny + h > img_gray.shape[0]:
             ny = img_gray.shape[0] - h
 
-        crop = img_gray[ny:ny+h, x:x+w]
+        crops.append((name, img_gray[ny:ny+h, x:x+w]))
+
+    return crops
+
+
+def split_letters_from_image(image_path, output_dir):
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    img_gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if img_gray is None:
+        raise ValueError(f"Cannot load image: {image_path}")
+
+    crops = segment_letters(img_gray)
+    for i, (name, crop) in enumerate(crops):
         out_path = os.path.join(output_dir, f"{i:02d}_{name}.png")
         cv2.imwrite(out_path, crop)
-        print(f"✅ נשמרה אות {i}: {name} (shift down {shift_down}px)")
+        print(f"✅ נשמרה אות {i}: {name} (shift down {letters_shift_down.get(name, 0)}px)")
 
-    print(f"\n✅ נחתכו ונשמרו {min(len(expanded_boxes),27)} אותיות בתיקייה:\n{output_dir}")
+    print(f"\n✅ נחתכו ונשמרו {len(crops)} אותיות בתיקייה:\n{output_dir}")
@@ -1,10 +1,32 @@
 import os
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+from tracer import trace_file_to_svg
 
-def convert_png_to_svg(input_path, output_path):
+# "inprocess" - מעקב בתוך התהליך (ברירת מחדל), "potrace" - הרצת הבינארי החיצוני
+TRACE_ENGINE = os.environ.get('TRACE_ENGINE', 'inprocess')
+
+
+def convert_png_to_svg(input_path, output_path, engine=None):
+    """
+    פונקציה לייבוא בקוד: ממירה PNG ל-SVG. ברירת המחדל היא מעקב בתוך התהליך (tracer.py).
+    """
+    engine = engine or TRACE_ENGINE
+    if engine == "potrace":
+        return convert_png_to_svg_potrace(input_path, output_path)
+
+    try:
+        trace_file_to_svg(input_path, output_path)
+        print(f"✅ {input_path} → {output_path}")
+    except ValueError as e:
+        print(f"❌ שגיאה בהמרת {input_path}: {e}")
+    return output_path
+
+
+def convert_png_to_svg_potrace(input_path, output_path):
     """
-    פונקציה לייבוא בקוד: ממירה PNG ל-SVG באמצעות Potrace.
+    ממירה PNG ל-SVG באמצעות הבינארי החיצוני של Potrace.
     """
     bmp_path = input_path.replace(".png", ".bmp")
     Image.open(input_path).save(bmp_path)
@@ -25,22 +47,31 @@ def convert_png_to_svg(input_path, output_path):
     return output_path
 
 
-def convert_to_svg(input_dir_or_file, output_dir_or_file):
+def convert_to_svg(input_dir_or_file, output_dir_or_file, workers=None):
+    """
+    workers - מספר תהליכים להמרת תיקייה במקביל (None/1 = סדרתי).
+    """
     if os.path.isfile(input_dir_or_file):
         return convert_png_to_svg(input_dir_or_file, output_dir_or_file)
     elif os.path.isdir(input_dir_or_file):
         os.makedirs(output_dir_or_file, exist_ok=True)
-        for fname in os.listdir(input_dir_or_file):
-            if fname.lower().endswith(".png"):
-                convert_png_to_svg(
-                    os.path.join(input_dir_or_file, fname),
-                    os.path.join(output_dir_or_file, fname.replace(".png", ".svg"))
-                )
+        pairs = [
+            (os.path.join(input_dir_or_file, fname),
+             os.path.join(output_dir_or_file, fname.replace(".png", ".svg")))
+            for fname in sorted(os.listdir(input_dir_or_file))
+            if fname.lower().endswith(".png")
+        ]
+        if workers and workers > 1 and pairs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(convert_png_to_svg, *zip(*pairs)))
+        else:
+            for src, dst in pairs:
+                convert_png_to_svg(src, dst)
 
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 3:
-        print("שימוש: python svg_converter.py <input_path> <output_path>")
+    if len(sys.argv) not in (3, 4):
+        print("שימוש: python svg_converter.py <input_path> <output_path> [workers]")
         sys.exit(1)
-    convert_to_svg(sys.argv[1], sys.argv[2])
+    convert_to_svg(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) == 4 else None)
@@ -0,0 +1,197 @@
+import os
+import cv2
+import numpy as np
+
+import metrics
+
+# מערכת הקואורדינטות זהה לפלט ה-SVG של potrace: 10 יחידות לפיקסל, ציר Y כלפי מעלה
+TRACE_SCALE = 10
+# סף הבהירות לדיו (כמו ברירת המחדל של potrace: -k 0.5)
+DEFAULT_THRESHOLD = 128
+# סטייה מקסימלית בפיקסלים בפישוט הקווים
+DEFAULT_EPSILON = 1.0
+# כתמים קטנים מזה (בפיקסלים) מסוננים (כמו turdsize של potrace)
+DEFAULT_MIN_AREA = 4
+# זווית פנייה (במעלות) שמעליה נקודה נחשבת לפינה ולא לעקומה
+CORNER_ANGLE = 70.0
+
+
+def to_gray(image):
+    if image.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(image, code)
+    return image
+
+
+def trace_params(threshold=DEFAULT_THRESHOLD, epsilon=DEFAULT_EPSILON, min_area=DEFAULT_MIN_AREA):
+    """
+    הפרמטרים שמשפיעים על תוצאת המעקב (משמשים כחלק ממפתח המטמון).
+    """
+    return {"threshold": threshold, "epsilon": epsilon, "min_area": min_area, "scale": TRACE_SCALE}
+
+
+def pack_contours(contours):
+    """
+    אורז רשימת קווי מתאר לשני מערכים רציפים: נקודות (N,2) והיסטים (k+1).
+    """
+    offsets = np.zeros(len(contours) + 1, dtype=np.int32)
+    if contours:
+        offsets[1:] = np.cumsum([len(c) for c in contours])
+        points = np.concatenate(contours).astype(np.float32)
+    else:
+        points = np.zeros((0, 2), dtype=np.float32)
+    return points, offsets
+
+
+def unpack_contours(points, offsets):
+    return [points[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def _signed_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+@metrics.timed("trace")
+def trace_bitmap(image, threshold=DEFAULT_THRESHOLD, epsilon=DEFAULT_EPSILON, min_area=DEFAULT_MIN_AREA):
+    """
+    ממיר מערך NumPy (אפור/צבע) לרשימת קווי מתאר ביחידות פונט, בלי potrace ובלי קבצים.
+    קווים חיצוניים נגד כיוון השעון וחורים עם כיוון השעון (כמו ב-PostScript/UFO).
+    """
+    gray = to_gray(image)
+    height = gray.shape[0]
+    mask = (gray < threshold).astype(np.uint8)
+
+    found, hierarchy = cv2.findContours(mask, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE)
+    contours = []
+    if hierarchy is None:
+        return contours
+
+    for contour, (_, _, _, parent) in zip(found, hierarchy[0]):
+        if cv2.contourArea(contour) < min_area:
+            continue
+        approx = cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2)
+        if len(approx) < 3:
+            continue
+
+        points = np.empty(approx.shape, dtype=np.float32)
+        points[:, 0] = approx[:, 0] * TRACE_SCALE
+        points[:, 1] = (height - approx[:, 1]) * TRACE_SCALE
+
+        is_hole = parent != -1
+        if (_signed_area(points) > 0) == is_hole:
+            points = points[::-1].copy()
+        contours.append(points)
+    return contours
+
+
+def corner_flags(points, angle=CORNER_ANGLE):
+    """
+    מסמן אילו נקודות הן פינות חדות (True) ואילו חלק מעקומה (False).
+    """
+    incoming = points - np.roll(points, 1, axis=0)
+    outgoing = np.roll(points, -1, axis=0) - points
+    norms = np.linalg.norm(incoming, axis=1) * np.linalg.norm(outgoing, axis=1)
+    cos = np.einsum('ij,ij->i', incoming, outgoing) / np.maximum(norms, 1e-9)
+    return cos < np.cos(np.radians(angle))
+
+
+def contour_segments(points, corners=None):
+    """
+    מחזיר (נקודת_התחלה, מקטעים). כל מקטע הוא ("line", [p]) או ("qcurve", [off..., on])
+    כשבין נקודות off עוקבות יש נקודת on משתמעת באמצע (כמו ב-TrueType).
+    """
+    if corners is None:
+        corners = corner_flags(points)
+    pts = [tuple(map(float, p)) for p in points]
+
+    if not corners.any():
+        start = ((pts[-1][0] + pts[0][0]) / 2, (pts[-1][1] + pts[0][1]) / 2)
+        return start, [("qcurve", pts + [start])]
+
+    first = int(np.argmax(corners))
+    n = len(pts)
+    order = [(first + i) % n for i in range(n)] + [first]
+    start = pts[first]
+    segments = []
+    offs = []
+    for idx in order[1:]:
+        point = pts[idx]
+        if corners[idx]:
+            segments.append(("qcurve", offs + [point]) if offs else ("line", [point]))
+            offs = []
+        else:
+            offs.append(point)
+    return start, segments
+
+
+def draw_contours(contours, pen, corners=None):
+    """
+    מצייר את קווי המתאר ישירות לעט של fontTools/defcon.
+    """
+    for i, points in enumerate(contours):
+        start, segments = contour_segments(points, None if corners is None else corners[i])
+        pen.moveTo(start)
+        for kind, seg_points in segments:
+            if kind == "line":
+                if seg_points[0] != start:
+                    pen.lineTo(seg_points[0])
+            else:
+                pen.qCurveTo(*seg_points)
+        pen.closePath()
+
+
+def _fmt(value):
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def contours_to_svg_path(contours, corners=None):
+    """
+    ממיר את קווי המתאר למחרוזת d של SVG (נקודות on משתמעות נכתבות במפורש).
+    """
+    parts = []
+    for i, points in enumerate(contours):
+        start, segments = contour_segments(points, None if corners is None else corners[i])
+        parts.append(f"M{_fmt(start[0])} {_fmt(start[1])}")
+        for kind, seg_points in segments:
+            if kind == "line":
+                x, y = seg_points[0]
+                parts.append(f"L{_fmt(x)} {_fmt(y)}")
+                continue
+            offs, end = seg_points[:-1], seg_points[-1]
+            for j, (cx, cy) in enumerate(offs):
+                if j + 1 < len(offs):
+                    ex, ey = (cx + offs[j + 1][0]) / 2, (cy + offs[j + 1][1]) / 2
+                else:
+                    ex, ey = end
+                parts.append(f"Q{_fmt(cx)} {_fmt(cy)} {_fmt(ex)} {_fmt(ey)}")
+        parts.append("Z")
+    return "".join(parts)
+
+
+def write_svg(contours, output_path, width, height):
+    """
+    כותב SVG באותו מבנה כמו potrace, כך ש-generate_ttf קורא אותו בלי שינוי.
+    """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    d = contours_to_svg_path(contours)
+    svg = (
+        f'<svg version="1.0" xmlns="http://www.w3.org/2000/svg" '
+        f'width="{width}pt" height="{height}pt" viewBox="0 0 {width} {height}">\n'
+        f'<g transform="translate(0,{height}) scale({1 / TRACE_SCALE},{-1 / TRACE_SCALE})" '
+        f'fill="#000000" stroke="none">\n'
+        f'<path d="{d}"/>\n'
+        f'</g>\n</svg>\n'
+    )
+    with open(output_path, 'w', encoding='utf-8') as fh:
+        fh.write(svg)
+    return output_path
+
+
+def trace_file_to_svg(input_path, output_path, **kwargs):
+    gray = cv2.imread(input_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError(f"Cannot read image: {input_path}")
+    contours = trace_bitmap(gray, **kwargs)
+    write_svg(contours, output_path, gray.shape[1], gray.shape[0])
+    return contours
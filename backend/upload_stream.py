@@ -0,0 +1,44 @@
+import os
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+# גודל קריאה מהזרם
+CHUNK_SIZE = 64 * 1024
+# גודל מקסימלי לחלק אחד (תמונת אות אחת)
+MAX_PART_BYTES = int(os.environ.get('MAX_GLYPH_UPLOAD_BYTES', 5 * 1024 * 1024))
+# מספר חלקים מקסימלי בבקשה אחת
+MAX_PARTS = 64
+
+
+class PartTooLarge(ValueError):
+    pass
+
+
+def iter_multipart_parts(stream, boundary, chunk_size=CHUNK_SIZE):
+    """
+    קורא גוף multipart מהזרם ומחזיר (שם_שדה, bytes) לכל חלק ברגע שהוא מסתיים,
+    בלי לחכות לסוף הבקשה ובלי קבצים זמניים.
+    """
+    decoder = MultipartDecoder(boundary.encode('latin-1'), max_parts=MAX_PARTS)
+    name = None
+    chunks = []
+    size = 0
+
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            # סוף הזרם מסומן ב-None; גוף קטוע יגרום ל-ValueError מהמפענח
+            data = stream.read(chunk_size)
+            decoder.receive_data(data if data else None)
+            continue
+        if isinstance(event, (Field, File)):
+            name, chunks, size = event.name, [], 0
+        elif isinstance(event, Data):
+            size += len(event.data)
+            if size > MAX_PART_BYTES:
+                raise PartTooLarge(f"part {name} exceeds {MAX_PART_BYTES} bytes")
+            chunks.append(event.data)
+            if not event.more_data:
+                yield name, b"".join(chunks)
+                chunks = []
+        elif isinstance(event, Epilogue):
+            break
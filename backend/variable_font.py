@@ -0,0 +1,262 @@
+import io
+import os
+
+import numpy as np
+from defcon import Font
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.pens.cu2quPen import Cu2QuMultiPen
+from fontTools.ttLib import TTFont
+from fontTools.designspaceLib import DesignSpaceDocument, AxisDescriptor, SourceDescriptor, InstanceDescriptor
+from fontTools import varLib
+
+import metrics
+import project_store
+import spacing
+from generate_font import letter_map, glyph_name_from_filename, load_glyph, load_traced_glyph
+from glyph_profile import get_table
+from incremental_font import (FAMILY_NAME, UNITS_PER_EM, ASCENDER, DESCENDER, CU2QU_MAX_ERR,
+                              _notdef_glyph)
+
+# מאסטרים של משקל: שם → (ערך ציר wght, הזזת קו המתאר ביחידות פונט; חיובי = עבה יותר)
+WEIGHT_MASTERS = {
+    "Light": (300, -12),
+    "Regular": (400, 0),
+    "Bold": (700, 24),
+}
+DEFAULT_MASTER = "Regular"
+# הגבלת הארכת פינות חדות (קוסינוס חצי הזווית המינימלי)
+MITER_LIMIT = 0.5
+
+
+def _split_contours(value):
+    """
+    מפרק הקלטה של RecordingPen לרשימת קווי מתאר, כל אחד רשימת (פעולה, נקודות).
+    """
+    contours, current = [], None
+    for op, args in value:
+        if op == "moveTo":
+            current = [(op, args)]
+            contours.append(current)
+        else:
+            current.append((op, args))
+    return contours
+
+
+def _vertex_normals(points):
+    """
+    נורמל ימני (החוצה מהדיו בכיוון PostScript) לכל נקודה במצולע הבקרה הסגור,
+    כולל הארכה בפינות כדי שעובי הקו יישמר.
+    """
+    # נקודות כפולות (למשל סגירה חוזרת לנקודת ההתחלה) מקבלות את הנורמל של שכנתן
+    keep = np.ones(len(points), bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    if len(points) > 1 and np.all(points[-1] == points[0]):
+        keep[-1] = False
+    index = np.cumsum(keep) - 1
+    index[~keep & (np.arange(len(points)) == len(points) - 1)] = 0
+    unique = points[keep]
+    if len(unique) < 3:
+        return np.zeros_like(points)
+
+    edges = np.roll(unique, -1, axis=0) - unique
+    lengths = np.maximum(np.linalg.norm(edges, axis=1), 1e-9)
+    edge_normals = np.stack([edges[:, 1], -edges[:, 0]], axis=1) / lengths[:, None]
+    incoming = np.roll(edge_normals, 1, axis=0)
+    bisector = incoming + edge_normals
+    norms = np.linalg.norm(bisector, axis=1)
+    # היפוך של 180 מעלות - אין חוצה זווית, משתמשים בנורמל הנכנס
+    flat = norms < 1e-6
+    bisector[flat] = incoming[flat]
+    norms[flat] = 1.0
+    bisector /= norms[:, None]
+    cos_half = np.einsum('ij,ij->i', bisector, incoming)
+    normals = bisector / np.maximum(cos_half, MITER_LIMIT)[:, None]
+    return normals[index]
+
+
+def _signed_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def offset_recording(value, distance):
+    """
+    מזיז כל נקודה בקו המתאר (כולל נקודות בקרה) לאורך הנורמל שלה ב-distance יחידות.
+    מבנה הפעולות לא משתנה, כך שכל המאסטרים תואמים לאינטרפולציה.
+    """
+    if not distance:
+        return value
+    contours = _split_contours(value)
+    polygons = [np.array([pt for _, args in contour for pt in args], dtype=np.float64) for contour in contours]
+    if not polygons:
+        return value
+
+    # כיוון הגליף נקבע לפי קו המתאר הגדול ביותר (חיצוני); טרנספורמציה הופכת מחליפה סימן
+    areas = [_signed_area(p) for p in polygons]
+    sign = 1.0 if areas[int(np.argmax(np.abs(areas)))] > 0 else -1.0
+
+    result = []
+    for contour, polygon in zip(contours, polygons):
+        moved = polygon + _vertex_normals(polygon) * distance * sign
+        i = 0
+        for op, args in contour:
+            n = len(args)
+            result.append((op, tuple((round(float(x), 2), round(float(y), 2)) for x, y in moved[i:i + n])))
+            i += n
+    return result
+
+
+def _load_base_glyphs(svg_folder, logs, table, store=None):
+    """
+    קורא את כל ה-SVG ואת קובץ הפרויקט (שגובר על SVG באותו שם) פעם אחת
+    ומחזיר {שם: (הקלטת קו מתאר, רוחב)} - בסיס לכל המאסטרים.
+    """
+    scratch = Font()
+    sources = []
+    stored = project_store.load_glyphs(store)
+    for name, (contours, _, _) in sorted(stored.items()):
+        if name not in letter_map or not contours:
+            msg = f"🔸 אות לא במפה: {name}" if name not in letter_map else f"❌ לא ניתן לנתח path עבור {name}"
+            print(msg)
+            logs.append(msg)
+            continue
+        load_traced_glyph(scratch, name, contours, table)
+        sources.append(name)
+    for filename in sorted(os.listdir(svg_folder)) if svg_folder else []:
+        if not filename.lower().endswith(".svg"):
+            continue
+        name = glyph_name_from_filename(filename)
+        if name not in letter_map:
+            msg = f"🔸 אות לא במפה: {name}"
+            print(msg)
+            logs.append(msg)
+            continue
+        if name in stored:
+            continue
+        if load_glyph(scratch, name, os.path.join(svg_folder, filename), logs, table):
+            sources.append(name)
+    for name, path in table["final_svgs"].items():
+        load_glyph(scratch, name, path, logs, table, final=True)
+
+    base = {}
+    for glyph in scratch:
+        pen = RecordingPen()
+        glyph.draw(pen)
+        base[glyph.name] = (pen.value, glyph.width)
+    return base, len(sources)
+
+
+@metrics.timed("variable_master")
+def _offset_master(base, distance):
+    return {name: offset_recording(value, distance) for name, (value, _) in base.items()}
+
+
+def _compile_masters(base, master_outlines):
+    """
+    ממיר את כל המאסטרים לגליפי TrueType יחד (cu2qu משותף), כך שמספר הנקודות זהה בכולם.
+    מחזיר רשימת {שם: Glyph} לפי סדר המאסטרים.
+    """
+    compiled = [{} for _ in master_outlines]
+    for name in base:
+        pens = [TTGlyphPen(None) for _ in master_outlines]
+        multi = Cu2QuMultiPen(pens, CU2QU_MAX_ERR, reverse_direction=True)
+        for ops in zip(*(outlines[name] for outlines in master_outlines)):
+            op = ops[0][0]
+            if op in ("closePath", "endPath"):
+                getattr(multi, op)()
+            else:
+                getattr(multi, op)([args for _, args in ops])
+        for i, pen in enumerate(pens):
+            compiled[i][name] = pen.glyph()
+    return compiled
+
+
+def _master_font(style, glyphs, widths, features=""):
+    notdef, notdef_width, notdef_lsb = _notdef_glyph()
+    fb = FontBuilder(UNITS_PER_EM, isTTF=True)
+    fb.setupGlyphOrder([".notdef"] + list(glyphs))
+    fb.setupCharacterMap({letter_map[name]: name for name in glyphs if name in letter_map})
+    glyf = {".notdef": notdef}
+    glyf.update(glyphs)
+    fb.setupGlyf(glyf)
+    hmtx = {".notdef": (notdef_width, notdef_lsb)}
+    hmtx.update({name: (round(widths[name]), g.xMin if g.numberOfContours else 0) for name, g in glyphs.items()})
+    fb.setupHorizontalMetrics(hmtx)
+    fb.setupHorizontalHeader(ascent=ASCENDER, descent=DESCENDER)
+    fb.setupNameTable({"familyName": FAMILY_NAME, "styleName": style, "fullName": f"{FAMILY_NAME} {style}"})
+    fb.setupOS2(sTypoAscender=ASCENDER, sTypoDescender=DESCENDER, sTypoLineGap=0,
+                usWinAscent=ASCENDER, usWinDescent=-DESCENDER)
+    fb.setupPost()
+    if features:
+        fb.addOpenTypeFeatures(features)
+    # מעבר דרך bytes כדי ש-varLib יקבל פונט מהודר ולא אובייקטים חלקיים
+    buf = io.BytesIO()
+    fb.save(buf)
+    buf.seek(0)
+    return TTFont(buf)
+
+
+def build_variable_ttf(svg_folder, output_ttf, masters=None, profile=None, store=None):
+    """
+    בונה פונט משתנה (ציר wght) מסט אותיות אחד: כל מאסטר נגזר מאותם קווי מתאר בהזזה לאורך
+    הנורמלים ומשולב עם fontTools varLib. מחזיר (הצלחה, לוגים).
+    profile בוחר את פרופיל המדדים כמו ב-generate_ttf; store הוא קובץ הפרויקט (ראו project_store.py).
+    """
+    print("🚀 התחלת יצירת פונט משתנה...")
+    masters = masters or WEIGHT_MASTERS
+    logs = []
+    table = get_table(profile)
+    base, count = _load_base_glyphs(svg_folder, logs, table, store)
+    if count == 0:
+        msg = "❌ לא נוצרו גליפים כלל."
+        print(msg)
+        logs.append(msg)
+        return False, logs
+
+    styles = list(masters)
+    distances = [masters[s][1] for s in styles]
+    # ההזזה היא חישוב numpy קצר; היא רצה כבר בתהליך של עובד הבנייה, ותהליכים נוספים
+    # (עם העתקת הבסיס לכל אחד) היו עולים יותר מהחישוב עצמו
+    master_outlines = [_offset_master(base, d) for d in distances]
+
+    try:
+        with metrics.span("compile"):
+            compiled = _compile_masters(base, master_outlines)
+            widths = {name: width for name, (_, width) in base.items()}
+
+            weights = [masters[s][0] for s in styles]
+            default = DEFAULT_MASTER if DEFAULT_MASTER in masters else styles[0]
+            doc = DesignSpaceDocument()
+            axis = AxisDescriptor()
+            axis.tag, axis.name = "wght", "Weight"
+            axis.minimum, axis.maximum, axis.default = min(weights), max(weights), masters[default][0]
+            doc.addAxis(axis)
+            for style, glyphs, outlines in zip(styles, compiled, master_outlines):
+                # קרנינג לכל מאסטר מקווי המתאר שלו: באות עבה המרווחים קטנים יותר, ו-varLib משלב את הערכים
+                kerning = spacing.kerning_pairs({n: spacing.glyph_sides(v) for n, v in outlines.items()},
+                                                widths, table["kerning"])
+                source = SourceDescriptor()
+                source.font = _master_font(style, glyphs, widths, spacing.kerning_fea(kerning))
+                source.name = source.styleName = style
+                source.familyName = FAMILY_NAME
+                source.location = {"Weight": masters[style][0]}
+                doc.addSource(source)
+                instance = InstanceDescriptor()
+                instance.familyName, instance.styleName = FAMILY_NAME, style
+                instance.location = {"Weight": masters[style][0]}
+                doc.addInstance(instance)
+
+            vf, _, _ = varLib.build(doc)
+            os.makedirs(os.path.dirname(output_ttf) or '.', exist_ok=True)
+            vf.save(output_ttf)
+        msg = f"\n🎉 הפונט המשתנה נוצר בהצלחה בנתיב: {output_ttf} ({', '.join(styles)})"
+        print(msg)
+        logs.append(msg)
+        return True, logs
+    except Exception as e:
+        msg = f"❌ שגיאה בשמירת הפונט המשתנה: {e}"
+        print(msg)
+        logs.append(msg)
+        return False, logs
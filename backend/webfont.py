@@ -0,0 +1,120 @@
+import os
+import hashlib
+import threading
+
+from fontTools.ttLib import TTFont
+from fontTools import subset
+
+import metrics
+
+# פורמטים נתמכים להורדה: פורמט → סוג MIME
+WEB_FORMATS = {
+    "ttf": "font/ttf",
+    "woff2": "font/woff2",
+    "woff": "font/woff",
+}
+# מספר מקסימלי של תתי-פונטים שמורים לכל פונט
+MAX_SUBSETS = int(os.environ.get('MAX_FONT_SUBSETS', 256))
+
+
+def web_font_path(ttf_path, fmt):
+    return ttf_path if fmt == "ttf" else f"{os.path.splitext(ttf_path)[0]}.{fmt}"
+
+
+def _build_id(ttf_path):
+    # מזהה בנייה זול: משתנה בכל פעם שה-TTF מוחלף
+    st = os.stat(ttf_path)
+    return hashlib.sha1(f"{st.st_mtime_ns}:{st.st_size}".encode()).hexdigest()[:12]
+
+
+def _tmp_path(path):
+    # שם זמני לכל תהליך ותהליכון: שתי בקשות במקביל (גם באותו עובד gthread) לא כותבות לאותו קובץ
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _save_flavor(font, flavor, path):
+    tmp_path = _tmp_path(path)
+    font.flavor = flavor
+    font.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+@metrics.timed("web_compress")
+def build_web_fonts(ttf_path):
+    """
+    יוצר WOFF2 ו-WOFF ליד ה-TTF. נקרא פעם אחת אחרי כל בנייה.
+    """
+    for fmt in ("woff2", "woff"):
+        _save_flavor(TTFont(ttf_path), fmt, web_font_path(ttf_path, fmt))
+    print(f"🗜️ נוצרו WOFF2/WOFF עבור {ttf_path}")
+
+
+def ensure_web_font(ttf_path, fmt):
+    """
+    מחזיר את הנתיב לפורמט המבוקש; יוצר אותו רק אם חסר או ישן מה-TTF (למשל אחרי בנייה ישירה).
+    """
+    path = web_font_path(ttf_path, fmt)
+    if path != ttf_path and (not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(ttf_path)):
+        build_web_fonts(ttf_path)
+    return path
+
+
+def _remove(path):
+    # בקשה מקבילה עשויה כבר למחוק את אותו קובץ
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _prune_subsets(subset_dir, build_id):
+    # תתי-פונטים של בניות קודמות נמחקים, והשאר מוגבלים ל-MAX_SUBSETS (הישנים קודם).
+    # קבצי .tmp שייכים לבקשות שעדיין כותבות ולא נוגעים בהם
+    entries = []
+    for name in os.listdir(subset_dir):
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(subset_dir, name)
+        if not name.startswith(build_id):
+            _remove(path)
+            continue
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - MAX_SUBSETS)]:
+        _remove(path)
+
+
+@metrics.timed("subset")
+def subset_font(ttf_path, text, fmt="woff2"):
+    """
+    מחזיר נתיב לתת-פונט שמכיל רק את האותיות של text. התוצאה נשמרת לפי hash של הטקסט
+    והבנייה, כך שאותה בקשה לא מחושבת פעמיים.
+    """
+    build_id = _build_id(ttf_path)
+    text_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    # תיקייה נפרדת לכל TTF (הפונט הרגיל והמשתנה יושבים באותה תיקיית ייצוא), כך שהניקוי
+    # אחרי בנייה של אחד לא מוחק את תתי-הפונטים של השני
+    subset_dir = os.path.join(os.path.dirname(ttf_path), "subsets", os.path.basename(os.path.splitext(ttf_path)[0]))
+    path = os.path.join(subset_dir, f"{build_id}_{text_hash}.{fmt}")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(subset_dir, exist_ok=True)
+    options = subset.Options()
+    options.flavor = None if fmt == "ttf" else fmt
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    font = TTFont(ttf_path)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+
+    tmp_path = _tmp_path(path)
+    font.flavor = options.flavor
+    font.save(tmp_path)
+    os.replace(tmp_path, path)
+    _prune_subsets(subset_dir, build_id)
+    return path
@@ -0,0 +1,145 @@
+import os
+import re
+import time
+import uuid
+import shutil
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKSPACES_DIR = os.path.join(BASE_DIR, 'static', 'workspaces')
+EXPORTS_DIR = os.path.join(BASE_DIR, '..', 'exports')
+
+# זמן חיים של סביבת עבודה ללא פעילות (בשניות)
+WORKSPACE_TTL = int(os.environ.get('WORKSPACE_TTL', 6 * 3600))
+# כל כמה זמן לכל היותר לסרוק ולמחוק סביבות שפג תוקפן
+CLEANUP_INTERVAL = int(os.environ.get('WORKSPACE_CLEANUP_INTERVAL', 600))
+
+# שמות תיקיות העבודה בתוך כל סביבה
+SUBDIRS = {
+    "uploads": "uploads",
+    "bw": "bw",  # רק כקלט ל-potrace חיצוני
+    "svg": "svg_letters",
+}
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_ACCESS_FILE = '.last_access'
+_last_cleanup = 0.0
+
+
+def is_valid_id(workspace_id):
+    return bool(workspace_id) and bool(_ID_RE.match(workspace_id))
+
+
+def workspace_paths(workspace_id):
+    """
+    מחזיר מילון נתיבים של סביבת עבודה: תיקיות העבודה, תיקיית הייצוא וקובץ הפונט.
+    """
+    root = os.path.join(WORKSPACES_DIR, workspace_id)
+    paths = {key: os.path.join(root, sub) for key, sub in SUBDIRS.items()}
+    paths["root"] = root
+    paths["static_prefix"] = f"workspaces/{workspace_id}"
+    paths["export"] = os.path.join(EXPORTS_DIR, workspace_id)
+    paths["font"] = os.path.join(paths["export"], 'my_font.ttf')
+    paths["variable_font"] = os.path.join(paths["export"], 'my_font_variable.ttf')
+    paths["jobs"] = os.path.join(paths["export"], 'jobs')
+    # בסיס השם של מודל הבנייה המצטברת; לכל פרופיל קובץ משלו (ראו incremental_font.model_file)
+    paths["model"] = os.path.join(paths["export"], 'font_model.pkl')
+    # קובץ הפרויקט (חיתוכים, קווי מתאר ונתוני בנייה) - ראו project_store.py
+    paths["store"] = os.path.join(paths["export"], 'project.sqlite')
+    return paths
+
+
+def workspace_exists(workspace_id):
+    return is_valid_id(workspace_id) and os.path.isdir(os.path.join(WORKSPACES_DIR, workspace_id))
+
+
+def touch_workspace(workspace_id):
+    """
+    מעדכן את זמן הגישה האחרון. נשמר כקובץ כדי שיהיה משותף לכל התהליכים.
+    """
+    access_path = os.path.join(WORKSPACES_DIR, workspace_id, _ACCESS_FILE)
+    try:
+        with open(access_path, 'a'):
+            pass
+        os.utime(access_path, None)
+    except OSError:
+        pass
+
+
+def create_workspace():
+    workspace_id = uuid.uuid4().hex
+    paths = workspace_paths(workspace_id)
+    for key in SUBDIRS:
+        os.makedirs(paths[key], exist_ok=True)
+    os.makedirs(paths["export"], exist_ok=True)
+    touch_workspace(workspace_id)
+    print(f"🆕 נוצרה סביבת עבודה: {workspace_id}")
+    return workspace_id
+
+
+def get_workspace(workspace_id):
+    """
+    מחזיר (מזהה, נתיבים) של סביבה קיימת ומעדכן את זמן הגישה שלה, או (None, None) - בלי ליצור כלום.
+    """
+    if not workspace_exists(workspace_id):
+        return None, None
+    touch_workspace(workspace_id)
+    return workspace_id, workspace_paths(workspace_id)
+
+
+def get_or_create_workspace(workspace_id=None):
+    """
+    מחזיר (מזהה, נתיבים, האם_חדשה). יוצר סביבה חדשה אם המזהה חסר או שפג תוקפו.
+    """
+    created = False
+    if not workspace_exists(workspace_id):
+        workspace_id = create_workspace()
+        created = True
+    else:
+        touch_workspace(workspace_id)
+    paths = workspace_paths(workspace_id)
+    for key in SUBDIRS:
+        os.makedirs(paths[key], exist_ok=True)
+    os.makedirs(paths["export"], exist_ok=True)
+    return workspace_id, paths, created
+
+
+def _last_access(workspace_id):
+    root = os.path.join(WORKSPACES_DIR, workspace_id)
+    try:
+        return os.path.getmtime(os.path.join(root, _ACCESS_FILE))
+    except OSError:
+        return os.path.getmtime(root)
+
+
+def remove_workspace(workspace_id):
+    paths = workspace_paths(workspace_id)
+    shutil.rmtree(paths["root"], ignore_errors=True)
+    shutil.rmtree(paths["export"], ignore_errors=True)
+    print(f"🧹 סביבת עבודה נמחקה: {workspace_id}")
+
+
+def cleanup_expired(now=None, force=False):
+    """
+    מוחק סביבות עבודה שלא היתה בהן גישה במשך WORKSPACE_TTL.
+    רץ לכל היותר פעם ב-CLEANUP_INTERVAL, אלא אם force=True.
+    """
+    global _last_cleanup
+    now = time.time() if now is None else now
+    if not force and now - _last_cleanup < CLEANUP_INTERVAL:
+        return []
+    _last_cleanup = now
+
+    if not os.path.isdir(WORKSPACES_DIR):
+        return []
+
+    removed = []
+    for workspace_id in os.listdir(WORKSPACES_DIR):
+        if not is_valid_id(workspace_id):
+            continue
+        try:
+            if now - _last_access(workspace_id) > WORKSPACE_TTL:
+                remove_workspace(workspace_id)
+                removed.append(workspace_id)
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,5 @@
+"""
+נקודת כניסה ל-WSGI לייצור (ראו gunicorn.conf.py בשורש הפרויקט):
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from server import app
@@ -0,0 +1,240 @@
+"""
+מדידת ביצועים לכל שלבי הצינור על דפי כתב יד סינתטיים.
+
+שימוש:
+    python benchmarks/bench_pipeline.py --scales 1 2 4 --repeat 5 --output bench_results.json
+    python benchmarks/bench_pipeline.py --compare old.json new.json
+
+כל שלב נמדד בכמה רזולוציות; נשמרים חציון/מינימום של זמן ריצה ושיא זיכרון (tracemalloc).
+שלב potrace מדולג אם הבינארי לא מותקן.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import statistics
+from contextlib import redirect_stdout
+from xml.dom import minidom
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.svgLib.path import parse_path
+
+from bw_converter import image_to_bw
+from binarize import binarize, ADAPTIVE
+from split_letters import segment_letters
+from tracer import trace_bitmap, write_svg
+from svg_converter import convert_png_to_svg_potrace
+from generate_font import generate_ttf, letter_map
+from incremental_font import build_ttf_incremental
+
+LETTERS = list(letter_map)
+# גודל בסיס של אות ושל דף בקנה מידה 1
+GLYPH_SIZE = 100
+SHEET_COLS = 9
+SHEET_ROWS = 3
+
+
+def synthetic_glyph(seed, size=GLYPH_SIZE):
+    """
+    אות "כתב יד" סינתטית: כמה קווים עבים ומעוקלים על רקע לבן, דטרמיניסטית לפי seed.
+    """
+    rng = np.random.default_rng(seed)
+    img = np.full((size, size), 255, np.uint8)
+    thickness = max(2, size // 14)
+    for _ in range(rng.integers(2, 4)):
+        t = np.linspace(0, 1, 24)
+        p0, p1, p2 = rng.uniform(0.15, 0.85, (3, 2)) * size
+        curve = ((1 - t)[:, None] ** 2) * p0 + (2 * (1 - t) * t)[:, None] * p1 + (t[:, None] ** 2) * p2
+        cv2.polylines(img, [curve.astype(np.int32)], False, 0, thickness, cv2.LINE_AA)
+    # רעש קל כמו בסריקה
+    noise = rng.normal(0, 6, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_sheet(scale):
+    """
+    דף של 27 אותיות ב-3 שורות, מימין לשמאל, ונקודה מימין למעלה (התיבה הראשונה שנזרקת).
+    """
+    cell = int(GLYPH_SIZE * 1.6 * scale)
+    glyph_size = int(GLYPH_SIZE * scale)
+    sheet = np.full((cell * SHEET_ROWS + cell, cell * SHEET_COLS + cell), 255, np.uint8)
+    cv2.circle(sheet, (sheet.shape[1] - cell // 4, cell // 4), max(4, glyph_size // 12), 0, -1)
+    for i in range(len(LETTERS)):
+        row, col = divmod(i, SHEET_COLS)
+        x = sheet.shape[1] - (col + 1) * cell
+        y = cell // 2 + row * cell
+        glyph = cv2.resize(synthetic_glyph(i), (glyph_size, glyph_size), interpolation=cv2.INTER_LINEAR)
+        sheet[y:y + glyph_size, x:x + glyph_size] = np.minimum(sheet[y:y + glyph_size, x:x + glyph_size], glyph)
+    return sheet
+
+
+def measure(fn, repeat):
+    """
+    מריץ fn כמה פעמים ומחזיר (זמנים במילישניות, שיא זיכרון ב-KB).
+    הזיכרון נמדד בהרצה נפרדת כדי ש-tracemalloc לא יאט את המדידה.
+    """
+    times = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return times, peak / 1024
+
+
+def bench_scale(scale, repeat, workdir):
+    results = []
+
+    def record(stage, fn, **extra):
+        times, peak_kb = measure(fn, repeat)
+        row = {
+            "stage": stage,
+            "scale": scale,
+            "median_ms": round(statistics.median(times), 3),
+            "min_ms": round(min(times), 3),
+            "peak_kb": round(peak_kb, 1),
+            "repeat": repeat,
+        }
+        row.update(extra)
+        results.append(row)
+        print(f"  {stage:<22} x{scale:<3} {row['median_ms']:>10.2f} ms  {row['peak_kb']:>10.1f} KB")
+
+    sheet = synthetic_sheet(scale)
+    glyphs = [cv2.resize(synthetic_glyph(i), None, fx=scale, fy=scale) for i in range(len(LETTERS))]
+    size = f"{sheet.shape[1]}x{sheet.shape[0]}"
+
+    record("threshold", lambda: image_to_bw(sheet), size=size)
+    record("threshold_adaptive", lambda: binarize(sheet, ADAPTIVE, denoise=True, ink=255), size=size)
+    record("segmentation", lambda: segment_letters(sheet), size=size)
+
+    bw_glyphs = [image_to_bw(g) for g in glyphs]
+    record("trace", lambda: [trace_bitmap(g) for g in bw_glyphs], glyphs=len(bw_glyphs))
+
+    svg_dir = os.path.join(workdir, f"svg_x{scale}")
+    os.makedirs(svg_dir, exist_ok=True)
+    for name, g in zip(LETTERS, bw_glyphs):
+        write_svg(trace_bitmap(g), os.path.join(svg_dir, f"{name}.svg"), g.shape[1], g.shape[0])
+
+    if shutil.which("potrace"):
+        png_dir = os.path.join(workdir, f"png_x{scale}")
+        os.makedirs(png_dir, exist_ok=True)
+        pngs = []
+        for name, g in zip(LETTERS, bw_glyphs):
+            path = os.path.join(png_dir, f"{name}.png")
+            cv2.imwrite(path, g)
+            pngs.append(path)
+        record("trace_potrace", lambda: [convert_png_to_svg_potrace(p, p.replace(".png", ".svg")) for p in pngs],
+               glyphs=len(pngs))
+    else:
+        print("  trace_potrace          מדולג - potrace לא מותקן")
+
+    def parse_svgs():
+        for fname in os.listdir(svg_dir):
+            doc = minidom.parse(os.path.join(svg_dir, fname))
+            for path in doc.getElementsByTagName('path'):
+                parse_path(path.getAttribute('d'), RecordingPen())
+            doc.unlink()
+    record("svg_parse", parse_svgs, glyphs=len(LETTERS))
+
+    out_ttf = os.path.join(workdir, f"font_x{scale}.ttf")
+    record("compile", lambda: generate_ttf(svg_dir, out_ttf))
+
+    model_path = os.path.join(workdir, f"model_x{scale}.pkl")
+
+    def compile_incremental_cold():
+        if os.path.exists(model_path):
+            os.remove(model_path)
+        build_ttf_incremental(svg_dir, out_ttf, model_path)
+    record("compile_incremental", compile_incremental_cold)
+
+    # בנייה חמה: המודל כבר קיים ואף אות לא השתנתה
+    with redirect_stdout(io.StringIO()):
+        build_ttf_incremental(svg_dir, out_ttf, model_path)
+    record("compile_incremental_warm", lambda: build_ttf_incremental(svg_dir, out_ttf, model_path))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BACKEND_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, repeat, output):
+    meta = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "potrace": bool(shutil.which("potrace")),
+    }
+    results = []
+    workdir = tempfile.mkdtemp(prefix="font_bench_")
+    try:
+        for scale in scales:
+            print(f"📏 קנה מידה x{scale}")
+            results.extend(bench_scale(scale, repeat, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump({"meta": meta, "results": results}, fh, indent=2)
+    print(f"✅ התוצאות נשמרו ב-{output}")
+
+
+def compare(old_path, new_path):
+    """
+    משווה שני קבצי תוצאות לפי (שלב, קנה מידה). יחס < 1 = המהדורה החדשה מהירה יותר.
+    """
+    with open(old_path, encoding='utf-8') as fh:
+        old = {(r["stage"], r["scale"]): r for r in json.load(fh)["results"]}
+    with open(new_path, encoding='utf-8') as fh:
+        new = json.load(fh)["results"]
+
+    print(f"{'stage':<26}{'scale':>6}{'old ms':>12}{'new ms':>12}{'ratio':>8}")
+    for row in new:
+        before = old.get((row["stage"], row["scale"]))
+        if before is None:
+            continue
+        ratio = row["median_ms"] / before["median_ms"] if before["median_ms"] else float('nan')
+        print(f"{row['stage']:<26}{row['scale']:>6}{before['median_ms']:>12.2f}{row['median_ms']:>12.2f}{ratio:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the font pipeline stages")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args.scales, args.repeat, args.output)
+
+
+if __name__ == "__main__":
+    main()
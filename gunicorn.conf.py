@@ -0,0 +1,73 @@
+"""
+הגדרות gunicorn להרצה בייצור:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+תהליכי ה-web (WEB_WORKERS × WEB_THREADS) מטפלים בבקשות, שרובן קלות ומחכות לדיסק/רשת.
+העבודה הכבדה (מעקב ובניית פונטים) רצה במאגרי התהליכים של batch_trace ו-jobs,
+שהגודל שלהם מחולק בין עובדי ה-web כך שכל הליבות בשימוש בלי הרשמת יתר.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+CPUS = os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+# בקשות I/O: כמה תהליכים עם תהליכונים
+worker_class = "gthread"
+workers = int(os.environ.get('WEB_WORKERS', min(4, max(2, CPUS // 2))))
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# עבודת CPU: כל עובד web מקבל חלק מהליבות למאגרי המעקב והבנייה
+os.environ.setdefault('TRACE_WORKERS', str(max(1, CPUS // workers)))
+os.environ.setdefault('FONT_BUILD_WORKERS', str(max(1, CPUS // workers)))
+
+# מצב אוטומטי בונה פונט בתוך הבקשה
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+# זמן לסיום בקשות ובניות פתוחות אחרי SIGTERM
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 90))
+keepalive = 5
+
+# האפליקציה נטענת בכל עובד אחרי fork: תהליכון הטעינה המוקדמת ומאגרי התהליכים
+# לא עוברים fork מתהליך האב
+preload_app = False
+
+# המדדים נשמרים בזיכרון של כל עובד; כל עובד כותב תמונת מצב לתיקייה משותפת ו-/metrics
+# מסכם את כולם, כך שסריקה שמגיעה לעובד כלשהו רואה את כל השרת (ראו metrics.enable_shared)
+METRICS_DIR = os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"font-metrics-{os.getpid()}"))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # מונים מהרצה קודמת לא נספרים
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """
+    רץ בתהליך האב כשעובד יצא: המונים שלו נשארים בסיכום, המדים שלו (בקשות פתוחות וכו') נמחקים.
+    """
+    sys.path.insert(0, chdir)
+    import metrics
+    metrics.mark_process_dead(worker.pid, METRICS_DIR)
+
+
+def worker_exit(server, worker):
+    """
+    עובד שנסגר (SIGTERM/החלפה) מסיים קודם את כל בניות הפונט והמעקבים שבתור.
+    """
+    for name in ("jobs", "batch_trace"):
+        module = sys.modules.get(name)
+        if module is not None:
+            server.log.info("draining %s pool in worker %s", name, worker.pid)
+            module.shutdown(wait=True)
+    # המונים האחרונים של העובד נכתבים לפני שהאב מסמן אותו כמת
+    metrics = sys.modules.get("metrics")
+    if metrics is not None:
+        metrics.flush()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+# מודולי ה-backend מיובאים בשמם (כמו בשרת ובסקריפטים)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+import pytest
+
+
+def letter_contours(seed):
+    """
+    קווי מתאר ביחידות פונט של "אות" מצוירת (קווים עבים), כמו שהמעקב מחזיר.
+    """
+    from tracer import trace_bitmap
+    rng = np.random.default_rng(seed)
+    img = np.full((200, 160), 255, np.uint8)
+    for _ in range(3):
+        p0 = tuple(int(v) for v in rng.integers(20, 140, 2))
+        p1 = tuple(int(v) for v in rng.integers(20, 140, 2))
+        cv2.line(img, p0, p1, 0, 14)
+    return trace_bitmap(img)
+
+
+@pytest.fixture
+def glyph_store(tmp_path):
+    """
+    קובץ פרויקט עם כמה אותיות שנעקבו (בלי חיתוכים), לבניית פונט בבדיקות.
+    """
+    import project_store
+    path = str(tmp_path / "project.sqlite")
+    project_store.save_glyphs(path, [(name, None, letter_contours(i), None)
+                                     for i, name in enumerate(["alef", "bet", "gimel", "dalet"])])
+    return path
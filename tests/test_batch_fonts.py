@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+
+import batch_fonts
+
+
+def touch(path):
+    with open(path, "wb") as fh:
+        fh.write(b"sheet")
+    return str(path)
+
+
+def test_same_stem_different_suffix(tmp_path):
+    sheets = tmp_path / "sheets"
+    sheets.mkdir()
+    for name in ("a.png", "a.jpg", "b.png", "notes.txt"):
+        touch(sheets / name)
+    entries = batch_fonts.load_sheets(str(sheets), str(tmp_path / "out"))
+    outputs = sorted(os.path.basename(e["output"]) for e in entries)
+    assert outputs == ["a_jpg.ttf", "a_png.ttf", "b.ttf"]
+    assert len({e["family"] for e in entries}) == 3
+
+
+def test_manifest_duplicate_outputs_fail(tmp_path):
+    touch(tmp_path / "a.png")
+    touch(tmp_path / "a.jpg")
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps(["a.png", "a.jpg"]))
+    with pytest.raises(ValueError):
+        batch_fonts.load_sheets(str(manifest), str(tmp_path / "out"))
+    assert batch_fonts.main([str(manifest), str(tmp_path / "out")]) == 2
+    manifest.write_text(json.dumps(["a.png", {"sheet": "a.jpg", "output": "a2.ttf"}]))
+    assert len(batch_fonts.load_sheets(str(manifest), str(tmp_path / "out"))) == 2
+
+
+def crash_on_b(entry):
+    # רץ בתהליך העובד במקום build_sheet: דף b הורג את התהליך ושובר את המאגר
+    if os.path.basename(entry["sheet"]).startswith("b"):
+        os._exit(1)
+    return dict(entry, status="ok", glyphs=27, seconds=0.0)
+
+
+def test_broken_pool_still_writes_summary(tmp_path, monkeypatch):
+    sheets = tmp_path / "sheets"
+    sheets.mkdir()
+    for name in ("b.png", "c.png", "d.png"):
+        touch(sheets / name)
+    monkeypatch.setattr(batch_fonts, "build_sheet", crash_on_b)
+    out = str(tmp_path / "out")
+    summary = batch_fonts.run_batch(batch_fonts.load_sheets(str(sheets), out), out, workers=1)
+
+    assert summary["processed"] == 3 and summary["failed"] >= 1
+    assert summary["succeeded"] + summary["failed"] == 3
+    assert all("BrokenProcessPool" in f["error"] for f in summary["failures"])
+    with open(os.path.join(out, batch_fonts.SUMMARY_FILE), encoding="utf-8") as fh:
+        assert json.load(fh) == summary
+    state = batch_fonts.load_state(out)
+    assert set(state) == {str(sheets / n) for n in ("b.png", "c.png", "d.png")}
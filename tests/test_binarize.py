@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from binarize import binarize, otsu_from_hist
+from bw_converter import image_to_bw
+
+
+def baseline_bw(gray):
+    # ההמרה המקורית: סף Otsu של cv2 והיפוך כשיש יותר שחור מלבן
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if np.sum(bw == 0) > np.sum(bw == 255):
+        bw = cv2.bitwise_not(bw)
+    return bw
+
+
+def page(seed, invert=False):
+    rng = np.random.default_rng(seed)
+    img = np.full((300, 240), 235, np.uint8)
+    for _ in range(25):
+        p0 = tuple(int(v) for v in rng.integers(0, 240, 2))
+        p1 = tuple(int(v) for v in rng.integers(0, 240, 2))
+        cv2.line(img, p0, p1, int(rng.integers(10, 70)), int(rng.integers(2, 8)))
+    img = np.clip(img.astype(np.int16) + rng.integers(-12, 13, img.shape), 0, 255).astype(np.uint8)
+    return 255 - img if invert else img
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("invert", [False, True])
+def test_image_to_bw_matches_baseline(seed, invert):
+    gray = page(seed, invert)
+    np.testing.assert_array_equal(image_to_bw(gray), baseline_bw(gray))
+
+
+@pytest.mark.parametrize("band_rows", [1, 13, 512])
+def test_binarize_bands_and_ink(band_rows):
+    gray = page(7)
+    bw = binarize(gray, band_rows=band_rows)
+    np.testing.assert_array_equal(bw, baseline_bw(gray))
+    np.testing.assert_array_equal(binarize(gray, ink=255, band_rows=band_rows), 255 - bw)
+
+
+def test_otsu_from_hist_matches_cv2():
+    for seed in range(5):
+        gray = page(seed)
+        thresh, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+        assert otsu_from_hist(hist)[0] == int(thresh)
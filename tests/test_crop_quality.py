@@ -0,0 +1,134 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+import crop_quality
+
+
+def blank(h=200, w=200):
+    return np.full((h, w), 255, np.uint8)
+
+
+def stroke(img, p0, p1, thickness=10):
+    cv2.line(img, p0, p1, 0, thickness)
+    return img
+
+
+def het(img, x, y=40, w=50, h=110):
+    # ח: גג ושתי רגליים, רכיב אחד
+    stroke(img, (x, y), (x + w, y))
+    stroke(img, (x, y), (x, y + h))
+    return stroke(img, (x + w, y), (x + w, y + h))
+
+
+def final_nun():
+    return stroke(blank(), (100, 20), (100, 180), 14)
+
+
+def vav():
+    img = stroke(blank(), (110, 30), (110, 180), 12)
+    return stroke(img, (85, 35), (110, 30), 12)
+
+
+def yod():
+    return stroke(blank(120, 120), (60, 40), (60, 75), 14)
+
+
+def he():
+    # ה: גג עם רגל ימנית, ורגל שמאלית נפרדת מתחת לגג
+    img = stroke(blank(), (30, 40), (170, 40))
+    stroke(img, (165, 40), (165, 180))
+    return stroke(img, (45, 90), (45, 180))
+
+
+@pytest.mark.parametrize("make", [final_nun, vav, yod, he, lambda: het(blank(), 60)])
+def test_letters_pass(make):
+    scores = crop_quality.score_crop(make())
+    assert scores["ok"], scores
+    assert scores["letters"] == 1
+
+
+def test_straight_stroke_is_not_solid():
+    scores = crop_quality.score_crop(final_nun())
+    assert scores["bbox_fill"] > 0.9
+    assert "solid" not in scores["reasons"]
+
+
+def test_empty_crop():
+    assert crop_quality.score_crop(blank())["reasons"] == ["empty"]
+    assert crop_quality.score_crop(np.full((200, 200), 200, np.uint8))["reasons"] == ["empty"]
+
+
+def test_speck():
+    img = blank()
+    cv2.circle(img, (100, 100), 6, 0, -1)
+    assert "speck" in crop_quality.score_crop(img)["reasons"]
+
+
+def test_noise():
+    noise = np.random.default_rng(0).integers(0, 256, (200, 200), dtype=np.uint8)
+    assert "noise" in crop_quality.score_crop(noise)["reasons"]
+
+
+@pytest.mark.parametrize("rect", [(40, 40, 160, 160), (20, 60, 180, 140)])
+def test_solid_block(rect):
+    img = blank()
+    x0, y0, x1, y1 = rect
+    img[y0:y1, x0:x1] = 0
+    assert "solid" in crop_quality.score_crop(img)["reasons"]
+
+
+def test_three_letters_rejected():
+    img = blank(200, 300)
+    for x in (20, 120, 220):
+        het(img, x)
+    scores = crop_quality.score_crop(img)
+    assert scores["letters"] == 3
+    assert "multiple_letters" in scores["reasons"]
+    assert not scores["ok"]
+
+
+def het_two_strokes():
+    # ח שנכתבה בשני קווים: רגל שמאלית נפרדת, וגג עם רגל ימנית שמתחיל קצת אחריה
+    img = stroke(blank(), (50, 50), (50, 170))
+    stroke(img, (72, 40), (150, 40))
+    return stroke(img, (150, 40), (150, 170))
+
+
+def final_pe_two_strokes():
+    # ף: קשת עליונה ורגל ארוכה שנכתבה בנפרד
+    img = stroke(blank(), (50, 60), (118, 42))
+    stroke(img, (50, 60), (50, 95))
+    return stroke(img, (135, 40), (135, 180))
+
+
+@pytest.mark.parametrize("make", [het_two_strokes, final_pe_two_strokes])
+def test_two_stroke_letter_passes(make):
+    scores = crop_quality.score_crop(make())
+    assert scores["components"] >= 2
+    assert scores["letters"] == 1 and scores["ok"], scores
+
+
+def test_two_letters_with_gap_rejected():
+    img = blank(200, 300)
+    het(img, 30)
+    het(img, 150)
+    assert "multiple_letters" in crop_quality.score_crop(img)["reasons"]
+
+
+def test_synthetic_sheet_letters_pass():
+    # אותן אותיות שדף הבנצ'מרק מצייר (כולל ף, seed 25), כך שהבנייה האוטומטית של 27 אותיות מתחילה
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+    from bench_pipeline import synthetic_glyph, LETTERS
+    rejected = {LETTERS[i]: crop_quality.score_crop(synthetic_glyph(i))["reasons"] for i in range(len(LETTERS))}
+    assert {name: reasons for name, reasons in rejected.items() if reasons} == {}
+    assert crop_quality.score_crop(synthetic_glyph(25))["ok"]
+
+
+def test_check_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(crop_quality, "CROP_QUALITY_CHECK", False)
+    scores = crop_quality.score_crop(blank())
+    assert scores["ok"] and scores["reasons"] == ["empty"]
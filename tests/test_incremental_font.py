@@ -0,0 +1,57 @@
+import os
+
+import incremental_font
+import project_store
+from conftest import letter_contours
+
+
+def build(tmp_path, store, profile=None):
+    output = str(tmp_path / "my_font.ttf")
+    return incremental_font.build_ttf_incremental(None, output, str(tmp_path / "font_model.pkl"), profile, store)
+
+
+def rebuilt(logs):
+    # "(N גליפים נבנו מחדש מתוך M)"
+    line = [line for line in logs if "נבנו מחדש" in line][-1]
+    return int(line.split("(")[-1].split()[0])
+
+
+def test_second_build_reuses_unchanged_glyphs(tmp_path, glyph_store):
+    success, logs = build(tmp_path, glyph_store)
+    assert success and rebuilt(logs) == 4
+    with open(tmp_path / "my_font.ttf", "rb") as fh:
+        first = fh.read()
+
+    success, logs = build(tmp_path, glyph_store)
+    assert success and rebuilt(logs) == 0
+    assert sum("נלקח מהבנייה הקודמת" in line for line in logs) == 4
+    with open(tmp_path / "my_font.ttf", "rb") as fh:
+        assert fh.read() == first
+
+    project_store.save_glyphs(glyph_store, [("bet", None, letter_contours(9), None)])
+    success, logs = build(tmp_path, glyph_store)
+    assert success and rebuilt(logs) == 1
+
+
+def test_model_per_profile(tmp_path, glyph_store):
+    wide = {"glyph": {"left_margin": 80}}
+    assert rebuilt(build(tmp_path, glyph_store)[1]) == 4
+    assert rebuilt(build(tmp_path, glyph_store, wide)[1]) == 4
+    # כל פרופיל שומר מודל משלו, כך שהחלפה חזרה לא בונה הכל מחדש
+    assert len([f for f in os.listdir(tmp_path) if f.startswith("font_model.")]) == 2
+    assert rebuilt(build(tmp_path, glyph_store)[1]) == 0
+    assert rebuilt(build(tmp_path, glyph_store, wide)[1]) == 0
+
+
+def test_overridden_glyph_is_not_counted(tmp_path):
+    svg = tmp_path / "finalpe.svg"
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg"><path d="M10 10 L 100 10 L 100 100 Z"/></svg>')
+    store = str(tmp_path / "project.sqlite")
+    # האות היחידה של המשתמש מוחלפת באות סופית קבועה: אין אף אות של המשתמש בפונט
+    project_store.save_glyphs(store, [("finalpe", None, letter_contours(1), None)])
+    success, logs = build(tmp_path, store, {"final_svgs": {"finalpe": str(svg)}})
+    assert not success and "לא נוצרו גליפים" in logs[-1]
+
+    project_store.save_glyphs(store, [("alef", None, letter_contours(2), None)])
+    success, logs = build(tmp_path, store, {"final_svgs": {"finalpe": str(svg)}})
+    assert success and rebuilt(logs) == 2
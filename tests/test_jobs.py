@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+import jobs
+
+
+def wait(jobs_dir, job_id, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get_job(jobs_dir, job_id)
+        if job["status"] in (jobs.STATUS_DONE, jobs.STATUS_FAILED):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    monkeypatch.setattr(jobs, "FONT_BUILD_WORKERS", 1)
+    yield
+    jobs.shutdown()
+
+
+def test_build_queued_then_done(tmp_path, glyph_store):
+    jobs_dir, output = str(tmp_path / "jobs"), str(tmp_path / "out" / "my_font.ttf")
+    job = jobs.submit_build("ws", jobs_dir, None, output, str(tmp_path / "model.pkl"), store=glyph_store)
+    assert job["status"] == jobs.STATUS_QUEUED
+    assert jobs.get_job(jobs_dir, job["id"])["status"] in (jobs.STATUS_QUEUED, jobs.STATUS_RUNNING,
+                                                            jobs.STATUS_DONE)
+
+    job = wait(jobs_dir, job["id"])
+    assert job["status"] == jobs.STATUS_DONE
+    assert os.path.exists(output)
+    assert not [f for f in os.listdir(os.path.dirname(output)) if f.endswith(".tmp")]
+    # הלוג מצביע על הקובץ הסופי ולא על הקובץ הזמני שכבר הוחלף
+    assert any(output in line for line in job["logs"])
+    assert not any(".tmp" in line for line in job["logs"])
+
+
+def test_failed_build_keeps_previous_font(tmp_path):
+    jobs_dir, output = str(tmp_path / "jobs"), str(tmp_path / "my_font.ttf")
+    with open(output, "wb") as fh:
+        fh.write(b"previous font")
+    # קובץ פרויקט ריק ובלי SVG: אין אף גליף והבנייה נכשלת
+    job = jobs.submit_build("ws", jobs_dir, None, output, str(tmp_path / "model.pkl"),
+                            store=str(tmp_path / "empty.sqlite"))
+    job = wait(jobs_dir, job["id"])
+    assert job["status"] == jobs.STATUS_FAILED
+    with open(output, "rb") as fh:
+        assert fh.read() == b"previous font"
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
+
+
+def test_unknown_job():
+    assert jobs.get_job("/nonexistent", "abc") is None
+    assert jobs.get_job("/nonexistent", "../etc") is None
+
+
+def test_pools_do_not_fork_from_server_threads():
+    import batch_trace
+    import process_pool
+    assert jobs._get_executor()._mp_context.get_start_method() == process_pool.START_METHOD == "forkserver"
+    try:
+        assert batch_trace._get_pool()._mp_context.get_start_method() == "forkserver"
+    finally:
+        batch_trace.shutdown()
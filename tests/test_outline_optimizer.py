@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+import pytest
+from defcon import Font
+from fontTools.pens.recordingPen import RecordingPen
+
+from outline_optimizer import optimize_glyphs, point_count, simplify_polyline
+
+
+def ring(n=240, r=300.0, cx=400.0, cy=400.0, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * math.pi, n, endpoint=False)
+    radius = r + rng.uniform(-noise, noise, n)
+    return [(round(cx + a * math.cos(t), 2), round(cy + a * math.sin(t), 2)) for a, t in zip(radius, angles)]
+
+
+def make_glyph(font, name, draw):
+    glyph = font.newGlyph(name)
+    draw(glyph.getPen())
+    return glyph
+
+
+def draw_polygon(points):
+    def draw(pen):
+        pen.moveTo(points[0])
+        for p in points[1:]:
+            pen.lineTo(p)
+        pen.closePath()
+    return draw
+
+
+def draw_curves(pen):
+    pen.moveTo((100, 0))
+    pen.curveTo((300, 0), (400, 100), (400, 300))
+    pen.curveTo((400, 500), (300, 600), (100, 600))
+    pen.lineTo((100, 300))
+    pen.lineTo((100, 150))
+    pen.closePath()
+
+
+def outline_points(glyph, steps=32):
+    """
+    נקודות דגימה לאורך קו המתאר (קווים, עקומות קוביות וריבועיות).
+    """
+    recording = RecordingPen()
+    glyph.draw(recording)
+    samples = []
+    t = np.linspace(0, 1, steps)[:, None]
+    for op, args in recording.value:
+        if op == "moveTo":
+            start = last = np.asarray(args[0], float)
+        elif op == "lineTo":
+            end = np.asarray(args[0], float)
+            samples.append(last + t * (end - last))
+            last = end
+        elif op == "curveTo":
+            c1, c2, end = (np.asarray(p, float) for p in args)
+            samples.append((1 - t) ** 3 * last + 3 * (1 - t) ** 2 * t * c1 + 3 * (1 - t) * t ** 2 * c2 + t ** 3 * end)
+            last = end
+        elif op == "qCurveTo":
+            pts = [np.asarray(p, float) for p in args]
+            # נקודות on משתמעות באמצע בין שתי נקודות off
+            on = [last] + [(a + b) / 2 for a, b in zip(pts[:-2], pts[1:-1])] + [pts[-1]]
+            for p0, c, p1 in zip(on[:-1], pts[:-1], on[1:]):
+                samples.append((1 - t) ** 2 * p0 + 2 * (1 - t) * t * c + t ** 2 * p1)
+            last = pts[-1]
+        elif op == "closePath":
+            samples.append(last + t * (start - last))
+    return np.concatenate(samples)
+
+
+def max_deviation(before, after):
+    """
+    המרחק הגדול ביותר מנקודה ב-before לקו השבור after (מרחק מקטעים, לא מנקודות הדגימה).
+    """
+    a, b = after[:-1], after[1:]
+    ab = b - a
+    denom = np.maximum((ab ** 2).sum(axis=1), 1e-12)
+    worst = 0.0
+    # בחלקים, כדי שמטריצת המרחקים לא תהיה גדולה מדי
+    for chunk in np.array_split(before, max(1, len(before) // 128)):
+        ap = chunk[:, None, :] - a[None]
+        t = np.clip((ap * ab[None]).sum(axis=2) / denom, 0.0, 1.0)
+        d = np.hypot(*(ap - t[..., None] * ab[None]).transpose(2, 0, 1))
+        worst = max(worst, float(d.min(axis=1).max()))
+    return worst
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 2.0, 6.0])
+def test_optimize_glyphs_within_tolerance(tolerance):
+    font = Font()
+    glyphs = {
+        "ring": make_glyph(font, "ring", draw_polygon(ring(noise=1.0))),
+        "curves": make_glyph(font, "curves", draw_curves),
+    }
+    before = {name: outline_points(g, 8) for name, g in glyphs.items()}
+    stats = optimize_glyphs(glyphs, tolerance)
+    assert set(stats) == {"ring", "curves"}
+    for name, glyph in glyphs.items():
+        # סטייה מקו המתאר המקורי חסומה ב-tolerance (ועוד שגיאת דגימה של העקומות)
+        assert max_deviation(before[name], outline_points(glyph, 64)) <= tolerance + 0.05
+        recording = RecordingPen()
+        glyph.draw(recording)
+        assert stats[name] == (stats[name][0], point_count(recording.value))
+        assert all(op != "curveTo" for op, _ in recording.value)
+    assert stats["ring"][1] < stats["ring"][0]
+
+
+def test_optimize_glyphs_merges_collinear_points():
+    font = Font()
+    square = [(0, 0), (100, 0), (200, 0), (200, 100), (200, 200), (100, 200), (0, 200), (0, 100)]
+    glyphs = {"square": make_glyph(font, "square", draw_polygon(square))}
+    assert optimize_glyphs(glyphs, 1.0) == {"square": (8, 4)}
+
+
+def test_optimize_glyphs_zero_tolerance_is_noop():
+    font = Font()
+    glyph = make_glyph(font, "ring", draw_polygon(ring()))
+    recording = RecordingPen()
+    glyph.draw(recording)
+    assert optimize_glyphs({"ring": glyph}, 0) == {}
+    after = RecordingPen()
+    glyph.draw(after)
+    assert after.value == recording.value
+
+
+def test_simplify_polyline_keeps_ends_and_bound():
+    points = np.array(ring(n=100, noise=3.0))
+    keep = simplify_polyline(points, 2.0)
+    assert keep[0] and keep[-1]
+    assert keep.sum() < len(points)
+    assert max_deviation(points, points[keep]) <= 2.0 + 1e-9
+
+
+def test_builders_skip_in_process_traced_glyphs(tmp_path, glyph_store):
+    from incremental_font import build_ttf_incremental
+    svg = tmp_path / "finalpe.svg"
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg">'
+                   '<path d="M10 10 C 60 0 90 40 100 100 L 40 120 L 30 60 L 10 10 Z"/></svg>')
+    success, logs = build_ttf_incremental(None, str(tmp_path / "font.ttf"), str(tmp_path / "model.pkl"),
+                                          {"final_svgs": {"finalpe": str(svg)}}, glyph_store)
+    assert success
+    optimized = [line.split()[1].rstrip(":") for line in logs if line.startswith("🪶 ") and "סה\"כ" not in line]
+    # קווי המתאר של המעקב בתהליך כבר מפושטים; רק אות ה-SVG עוברת את השלב
+    assert optimized == ["finalpe"]
@@ -0,0 +1,55 @@
+import numpy as np
+
+import project_store
+
+
+def contours(seed):
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(-100, 900, (n, 2)).astype(np.float32) for n in (7, 4, 12)]
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "project.sqlite")
+    alef, bet = contours(1), contours(2)
+    project_store.save_glyphs(path, [
+        ("alef", b"alef-png", alef, (610, 1000)),
+        ("bet", None, bet, None),
+        # קווי מתאר None: נשמר רק החיתוך, והאות לא נטענת מהקובץ
+        ("gimel", b"gimel-png", None, None),
+    ])
+
+    loaded = project_store.load_glyphs(path)
+    assert set(loaded) == {"alef", "bet"} == project_store.glyph_names(path)
+    loaded_alef, size, digest = loaded["alef"]
+    assert size == (610, 1000)
+    assert loaded["bet"][1] == (None, None)
+    assert len(loaded_alef) == len(alef)
+    for a, b in zip(loaded_alef, alef):
+        np.testing.assert_array_equal(a, b)
+    assert project_store.load_crop(path, "alef") == b"alef-png"
+    assert project_store.load_crop(path, "gimel") == b"gimel-png"
+    assert project_store.load_crop(path, "dalet") is None
+
+    # אותם קווי מתאר → אותה חתימה; שמירה מחדש בלי חיתוך שומרת את החיתוך הקודם
+    project_store.save_glyphs(path, [("alef", None, alef, (610, 1000))])
+    assert project_store.load_glyphs(path)["alef"][2] == digest
+    assert project_store.load_crop(path, "alef") == b"alef-png"
+
+    project_store.save_glyphs(path, [("alef", None, contours(3), (500, 1000))])
+    _, size, new_digest = project_store.load_glyphs(path)["alef"]
+    assert size == (500, 1000) and new_digest != digest
+
+
+def test_empty_contours_and_missing_store(tmp_path):
+    path = str(tmp_path / "project.sqlite")
+    project_store.save_glyphs(path, [("space", None, [], (300, 1000))])
+    assert project_store.load_glyphs(path)["space"][0] == []
+    assert project_store.load_glyphs(None) == {}
+    assert project_store.glyph_names(None) == set()
+
+
+def test_meta(tmp_path):
+    path = str(tmp_path / "project.sqlite")
+    project_store.set_meta(path, last_build={"glyphs": 27, "name": "כתב יד"}, version=2)
+    project_store.set_meta(path, version=3)
+    assert project_store.get_meta(path) == {"last_build": {"glyphs": 27, "name": "כתב יד"}, "version": 3}
@@ -0,0 +1,53 @@
+import numpy as np
+
+from fontTools.pens.recordingPen import RecordingPen
+
+from spacing import BANDS, glyph_sides, kerning_pairs, kerning_fea
+
+SETTINGS = {"strength": 0.25, "max": 80, "min": 10}
+
+
+def polygon(points):
+    pen = RecordingPen()
+    pen.moveTo(points[0])
+    for p in points[1:]:
+        pen.lineTo(p)
+    pen.closePath()
+    return pen.value
+
+
+# עמוד ב-x 100..200 עם זרוע ימינה עד 400 למעלה (y 600..700)
+TOP = polygon([(100, 0), (200, 0), (200, 600), (400, 600), (400, 700), (100, 700)])
+# עמוד ב-x 300..400 עם זרוע שמאלה עד 50 למטה (y 0..100)
+BOTTOM = polygon([(50, 0), (400, 0), (400, 700), (300, 700), (300, 100), (50, 100)])
+WIDTHS = {"top": 450, "bottom": 450, "space": 300}
+
+
+def sides():
+    return {"top": glyph_sides(TOP), "bottom": glyph_sides(BOTTOM), "space": glyph_sides([])}
+
+
+def test_glyph_sides_profile():
+    left, right = glyph_sides(TOP)
+    assert left.shape == right.shape == (BANDS,)
+    assert np.nanmin(left) == 100 and np.nanmax(right) == 400
+    left, right = glyph_sides([])
+    assert np.isinf(left).all() and np.isinf(right).all()
+
+
+def test_kerning_pairs_tightens_open_pair_only():
+    # (bottom, top): top משמאל, ובגבהים שבהם הזרועות לא נפגשות יש רווח של 300 במקום 100
+    assert kerning_pairs(sides(), WIDTHS, SETTINGS) == {("bottom", "top"): -50}
+
+
+def test_kerning_pairs_clip_and_min():
+    assert kerning_pairs(sides(), WIDTHS, dict(SETTINGS, strength=1.0)) == {("bottom", "top"): -80}
+    assert kerning_pairs(sides(), WIDTHS, dict(SETTINGS, min=51)) == {}
+    assert kerning_pairs({"space": glyph_sides([])}, WIDTHS, SETTINGS) == {}
+
+
+def test_kerning_fea_rtl():
+    fea = kerning_fea({("bottom", "top"): -50})
+    assert "languagesystem hebr dflt;" in fea
+    assert "pos bottom top <-50 0 -50 0>;" in fea
+    assert kerning_fea({}) == ""
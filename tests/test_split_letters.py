@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+import pytest
+
+from split_letters import sort_boxes_hebrew, merge_close_boxes, component_stats, _mask_bands
+
+
+def test_sort_boxes_rows_then_right_to_left():
+    boxes = [(10, 100, 20, 20), (200, 5, 20, 20), (100, 110, 20, 20), (50, 0, 20, 20), (150, 12, 20, 20)]
+    assert sort_boxes_hebrew(boxes) == [
+        (200, 5, 20, 20), (150, 12, 20, 20), (50, 0, 20, 20),
+        (100, 110, 20, 20), (10, 100, 20, 20),
+    ]
+
+
+def test_sort_boxes_row_starts_at_first_y():
+    # 0 → 14 באותה שורה, 28 רחוק מתחילת השורה (0) ולכן פותח שורה חדשה
+    boxes = [(10, 0, 5, 5), (20, 14, 5, 5), (30, 28, 5, 5)]
+    assert sort_boxes_hebrew(boxes, line_tol=15) == [(20, 14, 5, 5), (10, 0, 5, 5), (30, 28, 5, 5)]
+    assert sort_boxes_hebrew([]) == []
+
+
+def test_merge_close_boxes_chain():
+    # שלוש תיבות בשרשרת (כל אחת קרובה רק לשכנה שלה) מתאחדות לאחת
+    boxes = [(0, 0, 10, 10), (20, 2, 10, 10), (40, 4, 10, 10)]
+    assert merge_close_boxes(boxes, max_dist=15) == [(0, 0, 50, 14)]
+
+
+def test_merge_close_boxes_keeps_far_and_non_overlapping():
+    boxes = [(0, 0, 10, 10), (25, 0, 10, 10), (12, 10, 10, 10)]
+    # פער של 15 אינו < max_dist, ותיבה שרק נוגעת אנכית (חפיפה 0) לא מתאחדת
+    assert merge_close_boxes(boxes, max_dist=15) == boxes
+
+
+def test_merge_close_boxes_group_order():
+    boxes = [(100, 0, 10, 10), (0, 50, 10, 10), (112, 3, 10, 10)]
+    assert merge_close_boxes(boxes) == [(100, 0, 22, 13), (0, 50, 10, 10)]
+    assert merge_close_boxes([(1, 2, 3, 4)]) == [(1, 2, 3, 4)]
+
+
+def test_merge_close_boxes_reaches_fixpoint():
+    # A ו-B מתאחדים, והתיבה המאוחדת קרובה מספיק ל-C שלא היה קרוב לאף אחת מהן
+    boxes = [(0, 0, 10, 30), (15, 20, 10, 10), (30, 0, 10, 5)]
+    assert merge_close_boxes(boxes) == [(0, 0, 40, 30)]
+
+
+def reference_merge(boxes, max_dist=15):
+    # כל הזוגות בכל מעבר, עד שאין יותר מה לאחד
+    boxes = list(boxes)
+    while True:
+        parent = list(range(len(boxes)))
+
+        def find(i):
+            while parent[i] != i:
+                i = parent[i]
+            return i
+        for i, (ax, ay, aw, ah) in enumerate(boxes):
+            for j in range(i + 1, len(boxes)):
+                bx, by, bw, bh = boxes[j]
+                if max(bx - ax - aw, ax - bx - bw) < max_dist and min(ay + ah, by + bh) - max(ay, by) > 0:
+                    ri, rj = find(i), find(j)
+                    parent[max(ri, rj)] = min(ri, rj)
+        groups = {}
+        for i, box in enumerate(boxes):
+            groups.setdefault(find(i), []).append(box)
+        merged = []
+        for root in sorted(groups):
+            g = groups[root]
+            x0, y0 = min(b[0] for b in g), min(b[1] for b in g)
+            x1, y1 = max(b[0] + b[2] for b in g), max(b[1] + b[3] for b in g)
+            merged.append((x0, y0, x1 - x0, y1 - y0))
+        if len(merged) == len(boxes):
+            return merged
+        boxes = merged
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_merge_close_boxes_matches_all_pairs(seed):
+    rng = np.random.default_rng(seed)
+    # כמה שורות של תיבות בגדלים שונים, כולל תיבות גדולות שחוצות כמה תאי רשת
+    boxes = [(int(rng.integers(0, 600)), int(row * 80 + rng.integers(0, 30)),
+              int(rng.choice([rng.integers(2, 30), rng.integers(30, 200)])), int(rng.integers(2, 60)))
+             for row in range(6) for _ in range(40)]
+    assert merge_close_boxes(boxes) == reference_merge(boxes)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("band_rows", [1, 7, 32])
+def test_component_stats_matches_cv2(seed, band_rows):
+    rng = np.random.default_rng(seed)
+    mask = np.where(rng.random((97, 83)) < 0.35, 255, 0).astype(np.uint8)
+    mask = cv2.dilate(mask, np.ones((2, 2), np.uint8)) if seed % 2 else mask
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    banded = component_stats(_mask_bands(mask, band_rows))
+    np.testing.assert_array_equal(banded, stats[1:].astype(np.int64))
+
+
+def test_component_stats_spiral_across_bands():
+    # רכיב אחד שחוצה רצועות הרבה פעמים ומתאחד רק בסוף
+    mask = np.zeros((60, 60), np.uint8)
+    for x in range(5, 55, 10):
+        mask[5:55, x] = 255
+    mask[54, 5:46] = 255
+    mask[5, 15:56] = 255
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    np.testing.assert_array_equal(component_stats(_mask_bands(mask, 4)), stats[1:].astype(np.int64))
+    assert component_stats(_mask_bands(np.zeros((10, 10), np.uint8), 3)).shape == (0, 5)
@@ -0,0 +1,76 @@
+import io
+import os
+
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+
+os.environ.setdefault('FONT_PREWARM', '0')
+
+import upload_stream
+from upload_stream import iter_multipart_parts, PartTooLarge
+
+BOUNDARY = "glyphboundary"
+
+
+def body(parts, boundary=BOUNDARY):
+    out = b""
+    for name, data in parts:
+        out += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{name}.png\"\r\n"
+                f"Content-Type: image/png\r\n\r\n").encode() + data + b"\r\n"
+    return out + f"--{boundary}--\r\n".encode()
+
+
+def test_parts_in_order_and_streamed():
+    parts = [("alef", b"a" * 300_000), ("bet", b"b" * 100_000), ("2", b"")]
+    stream = io.BytesIO(body(parts))
+    seen = []
+    for name, data in iter_multipart_parts(stream, BOUNDARY, chunk_size=4096):
+        seen.append((name, data))
+        if name == "alef":
+            # החלק הראשון מוחזר לפני שכל הגוף נקרא (tell = כמה בתים נקראו מהזרם)
+            assert stream.tell() < len(stream.getvalue()) - 90_000
+    assert seen == parts
+
+
+def test_part_size_cap(monkeypatch):
+    monkeypatch.setattr(upload_stream, "MAX_PART_BYTES", 1000)
+    parts = iter_multipart_parts(io.BytesIO(body([("alef", b"a" * 1000), ("bet", b"b" * 1001)])), BOUNDARY)
+    assert next(parts) == ("alef", b"a" * 1000)
+    with pytest.raises(PartTooLarge):
+        next(parts)
+
+
+def test_max_parts(monkeypatch):
+    monkeypatch.setattr(upload_stream, "MAX_PARTS", 3)
+    stream = io.BytesIO(body([(str(i), b"x") for i in range(4)]))
+    with pytest.raises(RequestEntityTooLarge):
+        list(iter_multipart_parts(stream, BOUNDARY))
+
+
+def test_truncated_body():
+    with pytest.raises(ValueError):
+        list(iter_multipart_parts(io.BytesIO(body([("alef", b"a" * 100)])[:-40]), BOUNDARY))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    import server
+    import workspace
+    monkeypatch.setattr(workspace, "WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    monkeypatch.setattr(workspace, "EXPORTS_DIR", str(tmp_path / "exports"))
+    os.makedirs(workspace.WORKSPACES_DIR)
+    return server.app.test_client()
+
+
+def post(client, data):
+    return client.post('/backend/upload_glyphs', data=data,
+                       content_type=f"multipart/form-data; boundary={BOUNDARY}")
+
+
+def test_endpoint_limits(client, monkeypatch):
+    monkeypatch.setattr(upload_stream, "MAX_PART_BYTES", 1000)
+    assert post(client, body([("alef", b"a" * 1001)])).status_code == 413
+    monkeypatch.setattr(upload_stream, "MAX_PARTS", 2)
+    assert post(client, body([("alef", b"a"), ("bet", b"b"), ("gimel", b"c")])).status_code == 413
+    assert post(client, body([("nosuchletter", b"a")])).status_code == 400
+    assert client.post('/backend/upload_glyphs', data=b"x", content_type="image/png").status_code == 400
@@ -0,0 +1,61 @@
+import numpy as np
+from fontTools.ttLib import TTFont
+from fontTools.varLib.instancer import instantiateVariableFont
+from fontTools.pens.boundsPen import BoundsPen
+
+import variable_font
+from variable_font import offset_recording, build_variable_ttf, WEIGHT_MASTERS
+
+
+SQUARE = [("moveTo", ((0, 0),)), ("lineTo", ((0, 100),)), ("lineTo", ((100, 100),)),
+          ("lineTo", ((100, 0),)), ("closePath", ())]
+
+
+def bounds(value):
+    pts = np.array([p for _, args in value for p in args], dtype=float)
+    return pts.min(axis=0), pts.max(axis=0)
+
+
+def test_offset_keeps_structure_and_moves_outward():
+    for distance in (-10, 0, 10):
+        moved = offset_recording(SQUARE, distance)
+        assert [op for op, _ in moved] == [op for op, _ in SQUARE]
+        assert [len(args) for _, args in moved] == [len(args) for _, args in SQUARE]
+    low, high = bounds(offset_recording(SQUARE, 10))
+    # ריבוע עם כיוון השעון (דיו לפי PostScript) גדל ב-10 לכל צד
+    np.testing.assert_allclose(low, [-10, -10])
+    np.testing.assert_allclose(high, [110, 110])
+    low, high = bounds(offset_recording(SQUARE, -10))
+    np.testing.assert_allclose(low, [10, 10])
+
+
+def glyph_width(font, name):
+    pen = BoundsPen(font.getGlyphSet())
+    font.getGlyphSet()[name].draw(pen)
+    x0, _, x1, _ = pen.bounds
+    return x1 - x0
+
+
+def test_variable_font_masters(tmp_path, glyph_store):
+    output = str(tmp_path / "my_font_variable.ttf")
+    success, logs = build_variable_ttf(None, output, store=glyph_store)
+    assert success, logs
+    font = TTFont(output)
+    axis = font["fvar"].axes[0]
+    weights = [w for w, _ in WEIGHT_MASTERS.values()]
+    assert (axis.axisTag, axis.minValue, axis.defaultValue, axis.maxValue) == \
+        ("wght", min(weights), WEIGHT_MASTERS[variable_font.DEFAULT_MASTER][0], max(weights))
+    assert [i.coordinates["wght"] for i in font["fvar"].instances] == weights
+    assert "gvar" in font and "alef" in font.getGlyphOrder()
+
+    light = instantiateVariableFont(TTFont(output), {"wght": min(weights)})
+    bold = instantiateVariableFont(TTFont(output), {"wght": max(weights)})
+    # המאסטר העבה רחב יותר בדיוק בהפרש ההזזות משני הצדדים (בקירוב, אחרי עיגול)
+    expected = 2 * (WEIGHT_MASTERS["Bold"][1] - WEIGHT_MASTERS["Light"][1])
+    assert abs(glyph_width(bold, "alef") - glyph_width(light, "alef") - expected) <= 4
+
+
+def test_variable_font_without_glyphs(tmp_path):
+    success, logs = build_variable_ttf(None, str(tmp_path / "vf.ttf"), store=str(tmp_path / "empty.sqlite"),
+                                       profile={"final_svgs": {}})
+    assert not success and "לא נוצרו גליפים" in logs[-1]
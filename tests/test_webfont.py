@@ -0,0 +1,96 @@
+import os
+import shutil
+import threading
+
+import pytest
+from fontTools.ttLib import TTFont
+
+os.environ.setdefault('FONT_PREWARM', '0')
+
+import webfont
+from incremental_font import build_ttf_incremental
+
+
+@pytest.fixture
+def ttf(tmp_path, glyph_store):
+    path = str(tmp_path / "export" / "my_font.ttf")
+    success, logs = build_ttf_incremental(None, path, str(tmp_path / "model.pkl"), store=glyph_store)
+    assert success, logs
+    return path
+
+
+def test_web_fonts_built_once_and_rebuilt_when_stale(ttf):
+    path = webfont.ensure_web_font(ttf, "woff2")
+    assert path.endswith(".woff2") and TTFont(path).flavor == "woff2"
+    stamp = os.stat(path).st_mtime_ns
+    assert webfont.ensure_web_font(ttf, "woff2") == path and os.stat(path).st_mtime_ns == stamp
+    assert webfont.ensure_web_font(ttf, "ttf") == ttf
+
+    os.utime(path, ns=(stamp, stamp - 10 ** 9))
+    webfont.ensure_web_font(ttf, "woff2")
+    assert os.stat(path).st_mtime_ns > stamp - 10 ** 9
+
+
+def test_concurrent_web_font_writes(ttf):
+    errors = []
+
+    def run():
+        try:
+            webfont.build_web_fonts(ttf)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert TTFont(webfont.web_font_path(ttf, "woff2"))["glyf"]
+    assert not [f for f in os.listdir(os.path.dirname(ttf)) if f.endswith(".tmp")]
+
+
+def test_subset_cached_per_text_and_build(ttf, tmp_path):
+    path = webfont.subset_font(ttf, "אב")
+    stamp = os.stat(path).st_mtime_ns
+    assert webfont.subset_font(ttf, "אב") == path and os.stat(path).st_mtime_ns == stamp
+    other = webfont.subset_font(ttf, "ג")
+    assert other != path
+    assert set(TTFont(path).getBestCmap()) == {ord("א"), ord("ב")}
+
+    # TTF של פונט אחר באותה תיקייה לא מוחק את תתי-הפונטים של הראשון
+    second = os.path.join(os.path.dirname(ttf), "my_font_variable.ttf")
+    shutil.copy(ttf, second)
+    webfont.subset_font(second, "א")
+    assert os.path.exists(path) and os.path.exists(other)
+
+    # בנייה חדשה (TTF שהוחלף) מחליפה את תתי-הפונטים של הבנייה הקודמת
+    st = os.stat(ttf)
+    os.utime(ttf, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    fresh = webfont.subset_font(ttf, "אב")
+    assert fresh != path and os.path.exists(fresh)
+    assert not os.path.exists(path) and not os.path.exists(other)
+
+
+def test_subset_limit(ttf, monkeypatch):
+    monkeypatch.setattr(webfont, "MAX_SUBSETS", 2)
+    paths = [webfont.subset_font(ttf, text) for text in ("א", "ב", "ג")]
+    assert [os.path.exists(p) for p in paths] == [False, True, True]
+
+
+def test_download_etag_and_304(ttf, tmp_path, monkeypatch):
+    import server
+    import workspace
+    monkeypatch.setattr(workspace, "WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    monkeypatch.setattr(workspace, "EXPORTS_DIR", str(tmp_path / "exports"))
+    os.makedirs(workspace.WORKSPACES_DIR)
+    ws_id = workspace.create_workspace()
+    shutil.copy(ttf, workspace.workspace_paths(ws_id)["font"])
+    client = server.app.test_client()
+    client.set_cookie(server.WORKSPACE_COOKIE, ws_id)
+
+    for url in ("/download_font?format=woff2", "/font_subset?text=%D7%90"):
+        first = client.get(url)
+        assert first.status_code == 200 and first.headers["ETag"]
+        again = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        assert again.status_code == 304 and not again.data
+    assert client.get("/download_font?format=otf").status_code == 400
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+os.environ.setdefault('FONT_PREWARM', '0')
+
+import server
+import workspace
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    monkeypatch.setattr(workspace, "EXPORTS_DIR", str(tmp_path / "exports"))
+    os.makedirs(workspace.WORKSPACES_DIR)
+    return server.app.test_client()
+
+
+def test_read_only_requests_create_no_workspace(client):
+    assert client.get('/').status_code == 200
+    assert client.get('/jobs/abc').status_code == 404
+    assert client.get('/download_font').status_code == 404
+    assert client.get('/font_subset?text=a').status_code == 404
+    assert client.get('/preview?text=a').status_code == 200
+    assert os.listdir(workspace.WORKSPACES_DIR) == []
+    assert not os.path.exists(workspace.EXPORTS_DIR)
+
+
+def test_writing_request_creates_workspace_once(client):
+    response = client.post('/backend/save_crops', json={"crops": []})
+    ws_id = client.get_cookie(server.WORKSPACE_COOKIE).value
+    assert response.status_code == 200
+    assert os.listdir(workspace.WORKSPACES_DIR) == [ws_id]
+    client.post('/backend/save_crops', json={"crops": []})
+    client.get('/')
+    assert os.listdir(workspace.WORKSPACES_DIR) == [ws_id]